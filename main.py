@@ -32,8 +32,80 @@ def check_dependencies():
             
     return missing
 
+def run_export(argv):
+    """Headless bulk export: ``main.py export -f md -o out.md [--mode chat] ...``."""
+    import argparse
+    import time
+    from datetime import datetime, timedelta
+    from src.history_manager import HistoryManager
+    from src.history_export import ExportCancelled, HistoryExporter, EXPORT_FORMATS
+
+    def parse_date(value):
+        return datetime.strptime(value, "%Y-%m-%d")
+
+    parser = argparse.ArgumentParser(prog="main.py export", description="Export RoleAI history.")
+    parser.add_argument("-o", "--output", required=True, help="Output file")
+    parser.add_argument("-f", "--format", choices=EXPORT_FORMATS, default="jsonl")
+    parser.add_argument("-m", "--mode", action="append", dest="modes",
+                        help="Mode to export (repeatable; default: all)")
+    parser.add_argument("--since", type=parse_date, help="First day to include (YYYY-MM-DD)")
+    parser.add_argument("--until", type=parse_date, help="Last day to include (YYYY-MM-DD)")
+    parser.add_argument("--history", default=None,
+                        help="History database (default: history.db); a .json path "
+                             "selects the .db next to it and is migrated into it once")
+    args = parser.parse_args(argv)
+
+    since = time.mktime(args.since.timetuple()) if args.since else None
+    until = time.mktime((args.until + timedelta(days=1)).timetuple()) if args.until else None
+
+    def progress(done, total):
+        print(f"\rExported {done}/{total}", end="", file=sys.stderr, flush=True)
+
+    history_manager = HistoryManager(args.history)
+    try:
+        count = HistoryExporter(history_manager).export(
+            args.output, args.format, args.modes, since, until, progress=progress
+        )
+    except (ExportCancelled, KeyboardInterrupt):
+        print(f"\nExport cancelled; {args.output} was not written", file=sys.stderr)
+        return 130
+    finally:
+        history_manager.close()
+    print(f"\nExported {count} items to {args.output}", file=sys.stderr)
+    return 0
+
+
+def run_sse_benchmark(argv):
+    """CPU per 1k streamed tokens: ``main.py bench-sse [--tokens N] [--repeat N]``."""
+    import argparse
+    from src.api.sse_benchmark import run
+
+    parser = argparse.ArgumentParser(prog="main.py bench-sse",
+                                     description="Compare the CPU cost of the SSE transport and the OpenAI SDK.")
+    parser.add_argument("--tokens", type=int, default=20000, help="Tokens per simulated stream")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per reader (best is reported)")
+    args = parser.parse_args(argv)
+
+    results = run(args.tokens, args.repeat)
+    print(f"CPU per 1k tokens ({args.tokens} tokens, best of {args.repeat}):")
+    print(f"  OpenAI via SSE transport: {results['openai_sse']:.2f} ms")
+    if results["openai_sdk"] is None:
+        print("  OpenAI via SDK:           skipped (openai not installed)")
+    else:
+        saved = results["openai_sdk"] - results["openai_sse"]
+        print(f"  OpenAI via SDK:           {results['openai_sdk']:.2f} ms")
+        print(f"  Saved:                    {saved:.2f} ms ({saved / results['openai_sdk']:.0%})")
+    print(f"  Gemini via SSE transport: {results['gemini_sse']:.2f} ms")
+    return 0
+
+
 def main():
     """Main application entry point."""
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        sys.exit(run_export(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == "bench-sse":
+        sys.exit(run_sse_benchmark(sys.argv[2:]))
+
     missing = check_dependencies()
     if missing:
         print(f"Error: Missing required libraries: {', '.join(missing)}")
@@ -71,10 +143,24 @@ def main():
     font = QFont("Segoe UI", 10)
     app.setFont(font)
     
+    # With qasync the Qt event loop doubles as the asyncio loop, so network
+    # coroutines run between paint events; otherwise they get one thread
+    loop = None
+    if importlib.util.find_spec("qasync") is not None:
+        import asyncio
+        import qasync
+        from src.api.async_runtime import install_event_loop
+        loop = qasync.QEventLoop(app)
+        asyncio.set_event_loop(loop)
+        install_event_loop(loop)
+    
     window = MainWindow()
     window.show()
     
-    sys.exit(app.exec_())
+    if loop is None:
+        sys.exit(app.exec_())
+    with loop:
+        loop.run_forever()
 
 
 if __name__ == "__main__":
@@ -2,5 +2,10 @@
 
 from .openai_client import OpenAIClient
 from .lumaai_client import LumaAIClient
+from .http_pool import HttpPool, get_http_pool
+from .scheduler import Priority, RequestScheduler, get_request_scheduler
 
-__all__ = ["OpenAIClient", "LumaAIClient"]
+__all__ = [
+    "OpenAIClient", "LumaAIClient", "HttpPool", "get_http_pool",
+    "Priority", "RequestScheduler", "get_request_scheduler",
+]
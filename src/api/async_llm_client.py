@@ -0,0 +1,125 @@
+"""Asyncio LLM client for the registered chat providers."""
+
+from typing import AsyncIterator, Dict, List, Optional
+
+from .http_pool import HttpPool, get_http_pool
+from .providers import ProviderBackends
+from .response_cache import ResponseCache, cache_key
+from .single_flight import AsyncSingleFlight
+from .rate_limit import ProviderPolicies
+from .scheduler import Priority, RequestScheduler, get_request_scheduler
+from .context_window import ContextManager
+
+
+class AsyncLLMClient:
+    """Coroutine counterpart of LLMClient.
+
+    All methods must run on the shared loop (see ``async_runtime``); the
+    provider backends and their connections are created on first use.
+    """
+
+    def __init__(
+        self,
+        openai_api_key: str = "",
+        gemini_api_key: str = "",
+        http_pool: Optional[HttpPool] = None,
+        cache: Optional[ResponseCache] = None,
+        policies: Optional[ProviderPolicies] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        backends: Optional[ProviderBackends] = None
+    ):
+        self.http_pool = http_pool or get_http_pool()
+        self.cache = cache
+        self.flights = AsyncSingleFlight()
+        self.policies = policies or ProviderPolicies()
+        self.scheduler = scheduler or get_request_scheduler()
+        self.backends = backends or ProviderBackends(
+            self.http_pool, self.policies, {"openai": openai_api_key, "gemini": gemini_api_key}
+        )
+        # Trims history to each model's budget; summaries go through this client
+        self.context = ContextManager(self)
+
+    def set_api_keys(self, openai_key: str = "", gemini_key: str = ""):
+        """Update API keys; clients are rebuilt on the next call."""
+        self.backends.set_api_key("openai", openai_key)
+        self.backends.set_api_key("gemini", gemini_key)
+
+    async def chat_stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        provider: str = "openai",
+        max_tokens: int = 2048,
+        temperature: float = 0.7,
+        priority: Priority = Priority.INTERACTIVE,
+        flow: str = "",
+        conversation: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding text chunks.
+
+        Cached and coalesced like LLMClient.chat_stream. The upstream call
+        waits for a scheduler slot of ``priority``; ``flow`` names the
+        conversation for fair queuing within that class. ``conversation``
+        lets Gemini keep its chat session between turns.
+        """
+        key = cache_key(provider, model, messages, temperature, max_tokens)
+        cache = self.cache if self.cache is not None and self.cache.accepts(temperature) else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                for chunk in cached:
+                    yield chunk
+                return
+
+        chunks = []
+        policy = self.policies.get(provider)
+        async for chunk in self.flights.stream(key, lambda: self._scheduled(
+            provider, priority, flow,
+            lambda: policy.stream_async(
+                lambda: self._stream_upstream(messages, model, provider, max_tokens, temperature, conversation)
+            )
+        )):
+            if cache is not None:
+                chunks.append(chunk)
+            yield chunk
+        if cache is not None:
+            cache.put(key, chunks)
+
+    async def _scheduled(self, provider: str, priority: Priority, flow: str, start) -> AsyncIterator[str]:
+        """Chunks of ``start()`` while holding a scheduler slot."""
+        limit = int(self.policies.get(provider).concurrency.limit)
+        async with self.scheduler.slot(provider, priority, flow, limit=limit):
+            async for chunk in start():
+                yield chunk
+
+    def _stream_upstream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        provider: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        # The provider's SDK is imported here, on its first request
+        return self.backends.get(provider).stream_async(messages, model, max_tokens, temperature, conversation)
+
+    async def generate_image_async(
+        self,
+        prompt: str,
+        model: str = "dall-e-3",
+        size: str = "1024x1024",
+        quality: str = "standard",
+        n: int = 1,
+        priority: Priority = Priority.INTERACTIVE,
+        flow: str = ""
+    ) -> List[str]:
+        """Generate images with DALL-E and return their URLs."""
+        backend = self.backends.get("openai")
+        limit = int(self.policies.get("openai").concurrency.limit)
+        async with self.scheduler.slot("openai", priority, flow, limit=limit):
+            return await backend.generate_image_async(prompt, model, size, quality, n)
+
+    async def aclose(self) -> None:
+        """Close the async connections of every loaded backend."""
+        await self.backends.aclose()
@@ -0,0 +1,72 @@
+"""The single asyncio event loop that drives all network coroutines.
+
+With qasync installed the loop is the Qt event loop itself (see main.py),
+so coroutines run on the GUI thread between paint events. Without it one
+background thread runs the loop. Either way every stream, download and
+poll in the app shares one loop instead of one thread per request.
+"""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Coroutine, Optional
+
+
+class AsyncRunner:
+    """Schedules coroutines on the shared loop from any thread."""
+
+    def __init__(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._thread = None
+        self._owns_loop = loop is None
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._run, args=(loop,), name="AsyncRunner", daemon=True)
+            self._thread.start()
+        self.loop = loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    @property
+    def integrated(self) -> bool:
+        """Whether the loop is the Qt event loop (qasync)."""
+        return not self._owns_loop
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Run ``coro`` on the loop; the returned future can be cancelled."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run ``coro`` and wait for its result (never call from the loop thread)."""
+        return self.submit(coro).result(timeout)
+
+    def stop(self) -> None:
+        """Stop the background loop thread (no-op when integrated with Qt)."""
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+        self._thread = None
+
+
+_runner: Optional[AsyncRunner] = None
+_runner_lock = threading.Lock()
+
+
+def install_event_loop(loop: asyncio.AbstractEventLoop) -> AsyncRunner:
+    """Use an existing loop (the qasync Qt loop) for every coroutine."""
+    global _runner
+    with _runner_lock:
+        _runner = AsyncRunner(loop)
+        return _runner
+
+
+def get_async_runner() -> AsyncRunner:
+    """The shared runner, starting a loop thread if none was installed."""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncRunner()
+        return _runner
@@ -0,0 +1 @@
+"""Provider backends, imported on first use through the provider registry."""
@@ -0,0 +1,77 @@
+"""Google Gemini chat backend."""
+
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+import google.generativeai as genai
+
+from ..gemini_sessions import GeminiSessions
+from ..providers import ChatBackend
+
+
+class GeminiBackend(ChatBackend):
+    """Streams chat replies, keeping a ChatSession per conversation."""
+
+    def __init__(self, descriptor, api_key, http_pool, policy):
+        super().__init__(descriptor, api_key, http_pool, policy)
+        self.sessions = GeminiSessions()
+        if api_key:
+            genai.configure(api_key=api_key)
+
+    def set_api_key(self, api_key: str) -> None:
+        if api_key == self.api_key:
+            return
+        super().set_api_key(api_key)
+        # Cached models hold a client bound to the old key
+        self.sessions.clear()
+        if api_key:
+            genai.configure(api_key=api_key)
+
+    def _require_key(self) -> None:
+        if not self.api_key:
+            raise ValueError(f"{self.descriptor.label} API key not configured")
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> Iterator[str]:
+        self._require_key()
+        # Reuses the conversation's ChatSession when its history still matches
+        turn = self.sessions.checkout(messages, model, max_tokens, temperature, conversation)
+        response = turn.chat.send_message(turn.message, stream=True)
+        reply = []
+        for chunk in response:
+            if chunk.text:
+                reply.append(chunk.text)
+                yield chunk.text
+        self.sessions.checkin(turn, messages, "".join(reply))
+
+    async def stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        self._require_key()
+        if self.fast_streaming:
+            from ..sse_transport import to_gemini_request
+            # The REST call is stateless too; no session to keep
+            async for text in self.sse_transport().stream_gemini(
+                to_gemini_request(messages, max_tokens, temperature), self.api_key, model
+            ):
+                yield text
+            return
+
+        turn = self.sessions.checkout(messages, model, max_tokens, temperature, conversation)
+        response = await turn.chat.send_message_async(turn.message, stream=True)
+        reply = []
+        async for chunk in response:
+            if chunk.text:
+                reply.append(chunk.text)
+                yield chunk.text
+        self.sessions.checkin(turn, messages, "".join(reply))
@@ -0,0 +1,160 @@
+"""OpenAI chat and image backend, also used for OpenAI-compatible endpoints."""
+
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+
+from openai import OpenAI, AsyncOpenAI
+
+from ..providers import ChatBackend
+
+# Self-hosted servers often run without auth, but the SDK insists on a key
+KEYLESS_ENDPOINT_KEY = "EMPTY"
+
+
+class OpenAIBackend(ChatBackend):
+    """Streams chat completions and generates images with the OpenAI SDK."""
+
+    def __init__(self, descriptor, api_key, http_pool, policy):
+        super().__init__(descriptor, api_key, http_pool, policy)
+        self._client = None
+        self._client_key = None
+        self._async_client = None
+        self._async_http_client = None
+        self._async_key = None
+
+    def _key(self) -> str:
+        if self.descriptor.base_url:
+            return self.api_key or KEYLESS_ENDPOINT_KEY
+        return self.api_key
+
+    def _client_kwargs(self) -> Dict:
+        # Retries are handled by the provider policy, not the SDK
+        kwargs = {"api_key": self._key(), "max_retries": 0}
+        if self.descriptor.base_url:
+            kwargs["base_url"] = self.descriptor.base_url
+        return kwargs
+
+    def client(self) -> Optional[OpenAI]:
+        """The sync client, rebuilt when the key or the pool changed."""
+        if not self._key():
+            return None
+        key = (self._key(), self.http_pool.generation)
+        if self._client_key != key:
+            # The SDK object is cheap; its connections live in the pool
+            self._client = OpenAI(http_client=self.http_pool.httpx_client, **self._client_kwargs())
+            self._client_key = key
+        return self._client
+
+    async def async_client(self) -> Optional[AsyncOpenAI]:
+        """The AsyncOpenAI client, rebuilt when the key or the pool changed."""
+        if not self._key():
+            return None
+        key = (self._key(), self.http_pool.generation)
+        if self._async_key != key:
+            old_http_client = self._async_http_client
+            # Connections survive key changes; only a new pool generation replaces them
+            if self._async_key is None or self._async_key[1] != key[1]:
+                self._async_http_client = self.http_pool.new_async_client()
+            self._async_client = AsyncOpenAI(http_client=self._async_http_client, **self._client_kwargs())
+            self._async_key = key
+            if old_http_client is not None and old_http_client is not self._async_http_client:
+                await old_http_client.aclose()
+        return self._async_client
+
+    def _require(self, client):
+        if not client:
+            raise ValueError(f"{self.descriptor.label} API key not configured")
+        return client
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> Iterator[str]:
+        client = self._require(self.client())
+        raw = client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        self.policy.observe_headers(raw.headers)
+        for chunk in raw.parse():
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    async def stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        if self.fast_streaming:
+            from ..sse_transport import OPENAI_BASE_URL
+            self._require(self._key())
+            async for text in self.sse_transport().stream_openai(
+                {"model": model, "messages": messages, "max_tokens": max_tokens, "temperature": temperature},
+                self._key(),
+                self.descriptor.base_url or OPENAI_BASE_URL,
+                on_headers=self.policy.observe_headers
+            ):
+                yield text
+            return
+
+        client = self._require(await self.async_client())
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True
+        )
+        self.policy.observe_headers(raw.headers)
+        async for chunk in raw.parse():
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    def generate_image(self, prompt: str, model: str, size: str, quality: str, n: int) -> List[str]:
+        """Generate images and return their URLs, retried under the policy."""
+        client = self._require(self.client())
+
+        def request():
+            raw = client.images.with_raw_response.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=n
+            )
+            self.policy.observe_headers(raw.headers)
+            return raw.parse()
+
+        return [image.url for image in self.policy.call(request).data]
+
+    async def generate_image_async(self, prompt: str, model: str, size: str, quality: str, n: int) -> List[str]:
+        client = self._require(await self.async_client())
+
+        async def request():
+            raw = await client.images.with_raw_response.generate(
+                model=model,
+                prompt=prompt,
+                size=size,
+                quality=quality,
+                n=n
+            )
+            self.policy.observe_headers(raw.headers)
+            return raw.parse()
+
+        return [image.url for image in (await self.policy.call_async(request)).data]
+
+    async def aclose(self) -> None:
+        await super().aclose()
+        if self._async_http_client is not None:
+            await self._async_http_client.aclose()
+            self._async_http_client = None
+            self._async_key = None
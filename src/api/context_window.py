@@ -0,0 +1,233 @@
+"""Fit conversation history into a per-model prompt budget.
+
+Policies:
+
+- ``full``: send everything (the old behaviour).
+- ``window``: keep the leading system prompt and as many of the newest
+  messages as fit.
+- ``summary``: like ``window``, but messages that fell out of the window
+  are folded into a rolling summary, produced in the background at batch
+  priority and sent as a system message after the pinned prompt.
+
+Token counts are a fast local estimate (about four UTF-8 bytes per
+token), cached per message text, so re-fitting a long conversation every
+turn only measures the new messages.
+"""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from .scheduler import Priority
+
+CONTEXT_POLICIES = ("full", "window", "summary")
+
+# Context windows in tokens; unknown models get DEFAULT_CONTEXT_TOKENS
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5-turbo": 16385,
+    "gemini-2.0-flash": 1048576,
+    "gemini-1.5-pro": 2097152,
+    "gemini-1.5-flash": 1048576,
+    "gemini-1.0-pro": 30720,
+}
+DEFAULT_CONTEXT_TOKENS = 8192
+MESSAGE_OVERHEAD_TOKENS = 4  # role and separators per message
+SAFETY_MARGIN = 0.9  # the estimate is rough; leave headroom
+SUMMARY_MAX_TOKENS = 512
+SUMMARY_PROMPT = (
+    "Summarize the conversation below for your own future reference. Keep names, "
+    "decisions, facts and open questions; drop pleasantries. Reply with the summary only."
+)
+MAX_TRACKED_CONVERSATIONS = 64
+
+
+@lru_cache(maxsize=8192)
+def _estimate_text(text: str) -> int:
+    return (len(text.encode("utf-8")) + 3) // 4
+
+
+def estimate_tokens(message: Dict) -> int:
+    """Estimated prompt tokens of one chat message."""
+    return MESSAGE_OVERHEAD_TOKENS + _estimate_text(str(message.get("content", "")))
+
+
+def _fingerprint(messages: List[Dict]) -> str:
+    """Identifies a conversation prefix by its last message."""
+    if not messages:
+        return ""
+    last = messages[-1]
+    return hashlib.sha1(f"{len(messages)}:{last.get('role')}:{last.get('content')}".encode("utf-8")).hexdigest()
+
+
+class _Summary:
+    __slots__ = ("covered", "fingerprint", "text", "task")
+
+    def __init__(self):
+        self.covered = 0  # messages (after the pinned prompt) folded into text
+        self.fingerprint = ""
+        self.text = ""
+        self.task: Optional[asyncio.Task] = None
+
+
+class ContextManager:
+    """Trims or summarizes history before each request.
+
+    ``client`` is the AsyncLLMClient used for background summaries.
+    """
+
+    def __init__(self, client, policy: str = "window", max_prompt_tokens: int = 0):
+        self.client = client
+        self.policy = policy
+        self.max_prompt_tokens = max_prompt_tokens
+        self._summaries: "OrderedDict[str, _Summary]" = OrderedDict()
+
+    def configure(self, policy: str, max_prompt_tokens: int = 0) -> None:
+        """Apply settings; ``max_prompt_tokens`` 0 means the model's window."""
+        self.policy = policy if policy in CONTEXT_POLICIES else "window"
+        self.max_prompt_tokens = max_prompt_tokens
+
+    def budget(self, model: str, max_tokens: int) -> int:
+        """Prompt tokens available for ``model`` when ``max_tokens`` are reserved for the reply."""
+        window = MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+        budget = int(window * SAFETY_MARGIN) - max_tokens
+        if self.max_prompt_tokens:
+            budget = min(budget, self.max_prompt_tokens)
+        return max(budget, 0)
+
+    def fit(
+        self,
+        messages: List[Dict],
+        model: str,
+        provider: str,
+        max_tokens: int,
+        conversation: Optional[str] = None,
+    ) -> List[Dict]:
+        """The messages to send for this turn.
+
+        Must run on the shared loop when the summary policy is active and
+        ``conversation`` is given, as it may schedule a summary update.
+        """
+        if self.policy == "full":
+            return messages
+
+        pinned_count = 0
+        while pinned_count < len(messages) and messages[pinned_count].get("role") == "system":
+            pinned_count += 1
+        pinned, rest = messages[:pinned_count], messages[pinned_count:]
+        budget = self.budget(model, max_tokens) - sum(estimate_tokens(m) for m in pinned)
+
+        start = self._window_start(rest, budget)
+        if start == 0:
+            return messages
+        if self.policy != "summary" or conversation is None:
+            return pinned + rest[start:]
+
+        summary = self._summary(conversation, rest)
+        self._refresh_summary(conversation, summary, rest[:start], model, provider)
+        if not summary.text:
+            return pinned + rest[start:]
+        summary_message = {
+            "role": "system",
+            "content": f"Summary of the earlier conversation:\n{summary.text}",
+        }
+        start = max(start, self._window_start(rest, budget - estimate_tokens(summary_message)))
+        return pinned + [summary_message] + rest[start:]
+
+    @staticmethod
+    def _window_start(rest: List[Dict], budget: int) -> int:
+        """Index of the oldest message that still fits; the newest always does."""
+        used = 0
+        start = len(rest)
+        for index in range(len(rest) - 1, -1, -1):
+            used += estimate_tokens(rest[index])
+            if used > budget and index < len(rest) - 1:
+                break
+            start = index
+        return start
+
+    def _summary(self, conversation: str, rest: List[Dict]) -> _Summary:
+        summary = self._summaries.get(conversation)
+        if summary is None or summary.covered > len(rest) or (
+            summary.covered and summary.fingerprint != _fingerprint(rest[:summary.covered])
+        ):
+            # New conversation, or the history was edited under the summary
+            if summary is not None and summary.task is not None:
+                summary.task.cancel()
+            summary = _Summary()
+        self._summaries[conversation] = summary
+        self._summaries.move_to_end(conversation)
+        while len(self._summaries) > MAX_TRACKED_CONVERSATIONS:
+            _, dropped = self._summaries.popitem(last=False)
+            if dropped.task is not None:
+                dropped.task.cancel()
+        return summary
+
+    def _refresh_summary(
+        self, conversation: str, summary: _Summary, dropped: List[Dict], model: str, provider: str
+    ) -> None:
+        """Fold newly dropped messages into the summary in the background."""
+        if len(dropped) <= summary.covered or (summary.task is not None and not summary.task.done()):
+            return
+        summary.task = asyncio.ensure_future(
+            self._summarize(conversation, summary, list(dropped), model, provider)
+        )
+
+    async def _summarize(
+        self, conversation: str, summary: _Summary, dropped: List[Dict], model: str, provider: str
+    ) -> None:
+        lines = []
+        if summary.text:
+            lines.append(f"Earlier summary:\n{summary.text}\n")
+        for msg in dropped[summary.covered:]:
+            lines.append(f"{msg.get('role', 'user')}: {msg.get('content', '')}")
+        request = [
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": "\n".join(lines)},
+        ]
+        request = self.fit_plain(request, model, SUMMARY_MAX_TOKENS)
+        try:
+            chunks = []
+            async for chunk in self.client.chat_stream_async(
+                messages=request,
+                model=model,
+                provider=provider,
+                max_tokens=SUMMARY_MAX_TOKENS,
+                temperature=0.2,
+                priority=Priority.BATCH,
+                flow=f"summary:{conversation}",
+            ):
+                chunks.append(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # The window alone still keeps requests within budget
+            print(f"Context summary failed: {e}")
+            return
+        summary.text = "".join(chunks).strip()
+        summary.covered = len(dropped)
+        summary.fingerprint = _fingerprint(dropped)
+
+    def fit_plain(self, messages: List[Dict], model: str, max_tokens: int) -> List[Dict]:
+        """Cut the last message's text so a one-off request fits the budget."""
+        budget = self.budget(model, max_tokens) - sum(estimate_tokens(m) for m in messages[:-1])
+        last = messages[-1]
+        excess = estimate_tokens(last) - budget
+        if excess <= 0:
+            return messages
+        content = str(last.get("content", ""))
+        # Keep the newest text; four bytes per token, measured on the encoded form
+        encoded = content.encode("utf-8")[excess * 4:]
+        return messages[:-1] + [dict(last, content=encoded.decode("utf-8", "ignore"))]
+
+    def stats(self) -> Dict[str, Tuple[int, int]]:
+        """Per tracked conversation: messages summarized and summary tokens."""
+        return {
+            conversation: (summary.covered, _estimate_text(summary.text))
+            for conversation, summary in self._summaries.items()
+        }
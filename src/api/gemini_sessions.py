@@ -0,0 +1,136 @@
+"""Reusable Gemini model objects and chat sessions.
+
+``GenerativeModel`` instances are cached per (model name, generation
+config). A ``ChatSession`` is kept per conversation id, so a follow-up
+turn reuses the session that already holds the history and only the new
+user message has to be converted. Whenever the history a caller sends no
+longer matches what the session has seen (edited, trimmed by the context
+window, or a turn that failed), the session is rebuilt from scratch.
+
+Only the Gemini backend imports this module, once the SDK is needed.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import google.generativeai as genai
+
+from .messages import to_gemini_history
+
+MAX_MODELS = 16
+MAX_SESSIONS = 64
+
+
+def _signature(messages: List[Dict]) -> Tuple:
+    """Cheap identity of a message prefix: its length and both ends.
+
+    Catches a window that slid (first message changes) as well as a new
+    or different last turn without walking the whole conversation.
+    """
+    if not messages:
+        return (0,)
+    first, last = messages[0], messages[-1]
+    return (len(messages), first.get("role"), first.get("content"), last.get("role"), last.get("content"))
+
+
+class GeminiTurn:
+    """A checked-out session plus the message to send on it."""
+
+    __slots__ = ("conversation", "model_key", "chat", "message", "reusable")
+
+    def __init__(self, conversation, model_key, chat, message, reusable):
+        self.conversation = conversation
+        self.model_key = model_key
+        self.chat = chat
+        self.message = message
+        self.reusable = reusable
+
+
+class GeminiSessions:
+    """LRU caches of models and per-conversation chat sessions.
+
+    A session is removed while a turn runs on it and only put back once
+    the reply completed, so a failed or cancelled turn never leaves a
+    half-updated session behind.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: "OrderedDict[Tuple, object]" = OrderedDict()
+        # conversation -> (model_key, prefix signature, ChatSession)
+        self._sessions: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._counters = {"reused": 0, "rebuilt": 0}
+
+    def model(self, name: str, max_tokens: int, temperature: float):
+        """The cached GenerativeModel for this name and generation config."""
+        key = (name, max_tokens, round(float(temperature), 3))
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+        model = genai.GenerativeModel(name, generation_config=genai.types.GenerationConfig(
+            max_output_tokens=max_tokens,
+            temperature=temperature
+        ))
+        with self._lock:
+            self._models[key] = model
+            while len(self._models) > MAX_MODELS:
+                self._models.popitem(last=False)
+        return model
+
+    def checkout(
+        self,
+        messages: List[Dict[str, str]],
+        name: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> GeminiTurn:
+        """A session ready to send ``messages[-1]`` after ``messages[:-1]``."""
+        model_key = (name, max_tokens, round(float(temperature), 3))
+        prefix = _signature(messages[:-1])
+        # Only a plain user turn leaves the session history in the same
+        # shape as the conversation, so only those sessions are kept
+        reusable = conversation is not None and bool(messages) and messages[-1]["role"] == "user"
+
+        entry = None
+        if conversation is not None:
+            with self._lock:
+                entry = self._sessions.pop(conversation, None)
+        if entry is not None and entry[0] == model_key and entry[1] == prefix:
+            self._counters["reused"] += 1
+            return GeminiTurn(conversation, model_key, entry[2], messages[-1]["content"], reusable)
+
+        self._counters["rebuilt"] += 1
+        history, last_message = to_gemini_history(messages)
+        chat = self.model(name, max_tokens, temperature).start_chat(history=history)
+        return GeminiTurn(conversation, model_key, chat, last_message, reusable)
+
+    def checkin(self, turn: GeminiTurn, messages: List[Dict[str, str]], reply: str) -> None:
+        """Keep the session after ``reply`` to ``messages`` completed."""
+        if not turn.reusable:
+            return
+        # What the next turn will send before its new user message
+        following = (len(messages) + 1,) + (
+            (messages[0].get("role"), messages[0].get("content")) if messages else ()
+        ) + ("assistant", reply)
+        with self._lock:
+            self._sessions[turn.conversation] = (turn.model_key, following, turn.chat)
+            self._sessions.move_to_end(turn.conversation)
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every model and session (after an API key change)."""
+        with self._lock:
+            self._models.clear()
+            self._sessions.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._counters)
+            stats["models"] = len(self._models)
+            stats["sessions"] = len(self._sessions)
+        return stats
@@ -0,0 +1,183 @@
+"""Shared keep-alive HTTP connection pool.
+
+One ``requests.Session`` serves plain downloads (images, videos, update
+checks) and one ``httpx.Client`` is handed to the OpenAI and LumaAI SDKs,
+so every component reuses warm TCP/TLS connections instead of opening its
+own. Both are rebuilt only when the proxy changes.
+"""
+
+import importlib.util
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+    httpx = None
+
+# HTTP/2 in httpx needs the optional h2 package
+HTTP2_AVAILABLE = HTTPX_AVAILABLE and importlib.util.find_spec("h2") is not None
+
+DEFAULT_POOL_CONNECTIONS = 10  # hosts kept in the requests pool
+DEFAULT_POOL_MAXSIZE = 20  # connections kept per host
+DEFAULT_KEEPALIVE_EXPIRY = 60.0  # seconds an idle httpx connection stays open
+DEFAULT_TIMEOUT = 600.0  # SDK default for long completions
+
+
+class HttpPool:
+    """Lazily built, shared HTTP transports with usage statistics."""
+
+    def __init__(
+        self,
+        proxy: str = "",
+        pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    ):
+        self.proxy = proxy
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        # Bumped whenever the transports are rebuilt; clients holding an
+        # SDK instance compare it to know when to recreate theirs
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._httpx_client = None
+        self._counters = {"requests": 0, "httpx_requests": 0, "http2_responses": 0}
+
+    @property
+    def session(self) -> requests.Session:
+        """Pooled session for plain downloads."""
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                if self.proxy:
+                    session.proxies = {"http": self.proxy, "https": self.proxy}
+                self._session = session
+            return self._session
+
+    @property
+    def httpx_client(self):
+        """Pooled httpx client for the SDKs, or None without httpx."""
+        if not HTTPX_AVAILABLE:
+            return None
+        with self._lock:
+            if self._httpx_client is None:
+                self._httpx_client = self._build_httpx(httpx.Client, self._count_httpx_response)
+            return self._httpx_client
+
+    def new_async_client(self):
+        """An httpx.AsyncClient with the pool's settings, or None without httpx.
+
+        Async clients are bound to the loop that uses them, so the caller
+        owns the returned client (one per async SDK wrapper) and closes it.
+        """
+        if not HTTPX_AVAILABLE:
+            return None
+        return self._build_httpx(httpx.AsyncClient, self._count_async_response)
+
+    def _build_httpx(self, client_class, response_hook):
+        kwargs = {
+            "http2": HTTP2_AVAILABLE,
+            "limits": httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_maxsize,
+                keepalive_expiry=DEFAULT_KEEPALIVE_EXPIRY,
+            ),
+            "timeout": httpx.Timeout(DEFAULT_TIMEOUT, connect=10.0),
+            "follow_redirects": True,
+            "event_hooks": {"response": [response_hook]},
+        }
+        if self.proxy:
+            kwargs["proxy"] = self.proxy
+        try:
+            return client_class(**kwargs)
+        except TypeError:
+            if "proxy" not in kwargs:
+                raise
+            # httpx < 0.26 only knows ``proxies``
+            kwargs["proxies"] = kwargs.pop("proxy")
+            return client_class(**kwargs)
+
+    def _count_httpx_response(self, response) -> None:
+        self._counters["httpx_requests"] += 1
+        if response.http_version == "HTTP/2":
+            self._counters["http2_responses"] += 1
+
+    async def _count_async_response(self, response) -> None:
+        self._count_httpx_response(response)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """GET through the shared session."""
+        self._counters["requests"] += 1
+        return self.session.get(url, **kwargs)
+
+    def configure(self, proxy: str = "") -> bool:
+        """Apply a new proxy; transports are only rebuilt if it changed."""
+        if proxy == self.proxy:
+            return False
+        self.proxy = proxy
+        self._reset()
+        return True
+
+    def stats(self) -> Dict:
+        """Connection and request counters of both transports."""
+        stats = dict(self._counters)
+        stats["generation"] = self.generation
+        stats["http2_enabled"] = HTTP2_AVAILABLE
+
+        hosts = []
+        with self._lock:
+            session, client = self._session, self._httpx_client
+        if session is not None:
+            pools = session.get_adapter("https://").poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                hosts.append({
+                    "host": pool.host,
+                    "connections_opened": pool.num_connections,
+                    "requests": pool.num_requests,
+                    "idle": pool.pool.qsize() if pool.pool else 0,
+                })
+        stats["requests_pools"] = hosts
+
+        # httpx keeps its pool internals private; report them when reachable
+        connections = getattr(getattr(getattr(client, "_transport", None), "_pool", None), "connections", None)
+        stats["httpx_connections"] = len(connections) if connections is not None else 0
+        return stats
+
+    def close(self) -> None:
+        """Close every pooled connection."""
+        self._reset()
+
+    def _reset(self) -> None:
+        with self._lock:
+            session, self._session = self._session, None
+            client, self._httpx_client = self._httpx_client, None
+            self.generation += 1
+        if session is not None:
+            session.close()
+        if client is not None:
+            client.close()
+
+
+_shared_pool: Optional[HttpPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpPool:
+    """The process-wide pool used by default."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = HttpPool()
+        return _shared_pool
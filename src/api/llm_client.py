@@ -1,108 +1,122 @@
-"""Unified LLM Client for OpenAI and Gemini."""
+"""Unified LLM Client for OpenAI, Gemini and other registered providers."""
 
 from typing import Optional, List, Dict, Generator
-import time
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None
-
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+from .http_pool import HttpPool, get_http_pool
+from .async_llm_client import AsyncLLMClient
+from .providers import ProviderBackends
+from .response_cache import ResponseCache, cache_key
+from .single_flight import SingleFlight
+from .rate_limit import ProviderPolicies
 
 class LLMClient:
-    """Client for interacting with OpenAI and Gemini APIs."""
+    """Client for the chat providers in the provider registry.
+    
+    Provider SDKs are imported when a provider is first used, not when
+    the client is built.
+    """
     
-    def __init__(self, openai_api_key: str = "", gemini_api_key: str = ""):
+    def __init__(
+        self,
+        openai_api_key: str = "",
+        gemini_api_key: str = "",
+        http_pool: Optional[HttpPool] = None,
+        cache: Optional[ResponseCache] = None
+    ):
         self.openai_key = openai_api_key
         self.gemini_key = gemini_api_key
-        
-        self.openai_client = None
-        if openai_api_key and OPENAI_AVAILABLE:
-            self.openai_client = OpenAI(api_key=openai_api_key)
-            
-        if gemini_api_key and GEMINI_AVAILABLE:
-            genai.configure(api_key=gemini_api_key)
+        self.http_pool = http_pool or get_http_pool()
+        self.cache = cache
+        # Identical concurrent requests share one upstream stream
+        self.flights = SingleFlight()
+        # Retry, pacing and concurrency per provider, shared with the async path
+        self.policies = ProviderPolicies()
+        # One backend per provider, loaded on first use
+        self.backends = ProviderBackends(
+            self.http_pool, self.policies, {"openai": openai_api_key, "gemini": gemini_api_key}
+        )
+        # Coroutine twin sharing the pool, the cache, the policies and the backends
+        self.aio = AsyncLLMClient(
+            http_pool=self.http_pool, cache=cache, policies=self.policies, backends=self.backends
+        )
     
     def set_api_keys(self, openai_key: str = "", gemini_key: str = ""):
         """Update API keys."""
         self.openai_key = openai_key
         self.gemini_key = gemini_key
+        self.backends.set_api_key("openai", openai_key)
+        self.backends.set_api_key("gemini", gemini_key)
+    
+    def set_endpoints(self, endpoints: List[Dict]):
+        """Register OpenAI-compatible endpoints (``AppConfig.custom_endpoints``).
         
-        if openai_key and OPENAI_AVAILABLE:
-            self.openai_client = OpenAI(api_key=openai_key)
-            
-        if gemini_key and GEMINI_AVAILABLE:
-            genai.configure(api_key=gemini_key)
-
+        Each becomes an ``endpoint:<name>`` provider with its own pool.
+        """
+        self.backends.set_endpoints(endpoints)
+    
+    def set_fast_streaming(self, enabled: bool) -> bool:
+        """Stream async replies over the aiohttp SSE transport instead of the SDKs.
+        
+        Returns whether it is on, which needs aiohttp.
+        """
+        return self.backends.set_fast_streaming(enabled)
+    
+    def set_cache(self, cache: Optional[ResponseCache]):
+        """Enable (or with None, disable) the response cache."""
+        self.cache = cache
+        self.aio.cache = cache
+    
+    def set_context_policy(self, policy: str, max_prompt_tokens: int = 0):
+        """Choose how history is fitted into the prompt (see ``context_window``)."""
+        self.aio.context.configure(policy, max_prompt_tokens)
+    
     def chat_stream(
         self,
         messages: List[Dict[str, str]],
         model: str,
         provider: str = "openai",
         max_tokens: int = 2048,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        conversation: Optional[str] = None
     ) -> Generator[str, None, None]:
-        """Send a streaming chat completion request."""
+        """Send a streaming chat completion request.
         
-        if provider == "openai":
-            if not self.openai_client:
-                raise ValueError("OpenAI API key not configured")
-            
-            stream = self.openai_client.chat.completions.create(
-                model=model,
-                messages=messages,
-                max_tokens=max_tokens,
-                temperature=temperature,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content:
-                    yield chunk.choices[0].delta.content
-                    
-        elif provider == "gemini":
-            if not self.gemini_key or not GEMINI_AVAILABLE:
-                raise ValueError("Gemini API key not configured or package missing")
-            
-            # Convert messages to Gemini format
-            # Gemini expects history as list of contents, and a final message
-            # But simple chat API: model.generate_content(stream=True)
-            
-            g_model = genai.GenerativeModel(model)
-            
-            # Simple conversion for now: Concatenate or use chat session
-            # For strict role adherence, chat session is better.
-            
-            history = []
-            last_message = ""
-            
-            for msg in messages:
-                role = "user" if msg["role"] == "user" else "model"
-                if msg == messages[-1] and msg["role"] == "user":
-                    last_message = msg["content"]
-                else:
-                    history.append({"role": role, "parts": [msg["content"]]})
-            
-            if not last_message and messages:
-                 # Handle case where last message wasn't user (e.g. continue) - unlikely for this app
-                 last_message = messages[-1]["content"]
-
-            chat = g_model.start_chat(history=history)
-            response = chat.send_message(last_message, stream=True, generation_config=genai.types.GenerationConfig(
-                max_output_tokens=max_tokens,
-                temperature=temperature
-            ))
-            
-            for chunk in response:
-                if chunk.text:
-                    yield chunk.text
+        ``conversation`` identifies the chat so Gemini can keep its session.
+        With a cache set, reproducible requests are answered from it by
+        replaying the stored chunks; complete live replies are stored.
+        A request identical to one still streaming joins that stream.
+        """
+        key = cache_key(provider, model, messages, temperature, max_tokens)
+        cache = self.cache if self.cache is not None and self.cache.accepts(temperature) else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                yield from cached
+                return
+        
+        chunks = []
+        policy = self.policies.get(provider)
+        for chunk in self.flights.stream(key, lambda: policy.stream(
+            lambda: self._stream_upstream(messages, model, provider, max_tokens, temperature, conversation)
+        )):
+            if cache is not None:
+                chunks.append(chunk)
+            yield chunk
+        # Only reached when the stream ran to completion
+        if cache is not None:
+            cache.put(key, chunks)
+    
+    def _stream_upstream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        provider: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> Generator[str, None, None]:
+        # The provider's SDK is imported here, on its first request
+        return self.backends.get(provider).stream(messages, model, max_tokens, temperature, conversation)
 
     def generate_image(
         self,
@@ -114,14 +128,4 @@ class LLMClient:
     ) -> List[str]:
         """Generate images using DALL-E (Gemini image gen not requested explicitly but possible)."""
         # Assuming OpenAI for image generation as per requirements
-        if not self.openai_client:
-             raise ValueError("OpenAI API key not configured")
-             
-        response = self.openai_client.images.generate(
-            model=model,
-            prompt=prompt,
-            size=size,
-            quality=quality,
-            n=n
-        )
-        return [image.url for image in response.data]
+        return self.backends.get("openai").generate_image(prompt, model, size, quality, n)
@@ -1,16 +1,14 @@
 """LumaAI API client wrapper for video generation."""
 
+import asyncio
 import time
 from typing import Optional
 from dataclasses import dataclass
 from enum import Enum
 
-try:
-    from lumaai import LumaAI
-    LUMAAI_AVAILABLE = True
-except ImportError:
-    LUMAAI_AVAILABLE = False
-    LumaAI = None
+from .http_pool import HttpPool, get_http_pool
+from .providers import registry
+from .scheduler import Priority, RequestScheduler, get_request_scheduler
 
 
 class VideoStatus(Enum):
@@ -33,19 +31,35 @@ class VideoResult:
 class LumaAIClient:
     """Client for interacting with LumaAI API."""
     
-    def __init__(self, api_key: str):
-        if not LUMAAI_AVAILABLE:
+    def __init__(
+        self,
+        api_key: str,
+        http_pool: Optional[HttpPool] = None,
+        scheduler: Optional[RequestScheduler] = None
+    ):
+        if not registry.is_available("lumaai"):
             raise ImportError("LumaAI package is not installed. Run: pip install lumaai")
-        self.api_key = api_key
-        self.client = LumaAI(auth_token=api_key) if api_key else None
+        self.http_pool = http_pool or get_http_pool()
+        self.scheduler = scheduler or get_request_scheduler()
+        self._async_client = None
+        self._async_http_client = None
+        self._async_key = None
+        self.set_api_key(api_key)
     
     def set_api_key(self, api_key: str) -> None:
         """Update the API key."""
         self.api_key = api_key
-        self.client = LumaAI(auth_token=api_key) if api_key else None
+        # Built, and the SDK imported, on the first request
+        self.client = None
+        self._pool_generation = None
     
     def is_configured(self) -> bool:
         """Check if API key is configured."""
+        if self.api_key and self._pool_generation != self.http_pool.generation:
+            # First use, or the pool was rebuilt after a proxy change
+            lumaai = registry.import_sdk("lumaai")
+            self.client = lumaai.LumaAI(auth_token=self.api_key, http_client=self.http_pool.httpx_client)
+            self._pool_generation = self.http_pool.generation
         return bool(self.api_key and self.client)
     
     def generate_video(
@@ -83,24 +97,7 @@ class LumaAIClient:
         
         try:
             generation = self.client.generations.get(id=generation_id)
-            
-            if generation.state == "completed":
-                return VideoResult(
-                    id=generation_id,
-                    status=VideoStatus.COMPLETED,
-                    url=generation.assets.video if generation.assets else None
-                )
-            elif generation.state == "failed":
-                return VideoResult(
-                    id=generation_id,
-                    status=VideoStatus.FAILED,
-                    error=generation.failure_reason
-                )
-            else:
-                return VideoResult(
-                    id=generation_id,
-                    status=VideoStatus.PROCESSING
-                )
+            return self._status_result(generation_id, generation)
         except Exception as e:
             return VideoResult(
                 id=generation_id,
@@ -134,3 +131,97 @@ class LumaAIClient:
             status=VideoStatus.FAILED,
             error="Timeout waiting for video generation"
         )
+    
+    @staticmethod
+    def _status_result(generation_id: str, generation) -> VideoResult:
+        if generation.state == "completed":
+            return VideoResult(
+                id=generation_id,
+                status=VideoStatus.COMPLETED,
+                url=generation.assets.video if generation.assets else None
+            )
+        elif generation.state == "failed":
+            return VideoResult(
+                id=generation_id,
+                status=VideoStatus.FAILED,
+                error=generation.failure_reason
+            )
+        return VideoResult(
+            id=generation_id,
+            status=VideoStatus.PROCESSING
+        )
+    
+    async def _aclient(self):
+        """AsyncLumaAI on the shared loop, rebuilt when the key or pool changed."""
+        key = (self.api_key, self.http_pool.generation)
+        if self._async_key != key:
+            if self._async_http_client is not None:
+                await self._async_http_client.aclose()
+            self._async_http_client = self.http_pool.new_async_client()
+            lumaai = registry.import_sdk("lumaai")
+            self._async_client = lumaai.AsyncLumaAI(auth_token=self.api_key, http_client=self._async_http_client)
+            self._async_key = key
+        return self._async_client
+    
+    async def generate_video_async(
+        self,
+        prompt: str,
+        aspect_ratio: str = "16:9",
+        loop: bool = False
+    ) -> VideoResult:
+        """Start video generation on the shared event loop."""
+        if not self.is_configured():
+            raise ValueError("LumaAI API key not configured")
+        
+        try:
+            client = await self._aclient()
+            async with self.scheduler.slot("lumaai", Priority.INTERACTIVE, flow="video"):
+                generation = await client.generations.create(
+                    prompt=prompt,
+                    aspect_ratio=aspect_ratio,
+                    loop=loop
+                )
+            return VideoResult(id=generation.id, status=VideoStatus.PENDING)
+        except Exception as e:
+            return VideoResult(id="", status=VideoStatus.FAILED, error=str(e))
+    
+    async def get_video_status_async(self, generation_id: str) -> VideoResult:
+        """Check status of video generation on the shared event loop."""
+        if not self.is_configured():
+            raise ValueError("LumaAI API key not configured")
+        
+        try:
+            client = await self._aclient()
+            # Polls are background work; each video is its own flow
+            async with self.scheduler.slot("lumaai", Priority.BATCH, flow=generation_id):
+                generation = await client.generations.get(id=generation_id)
+            return self._status_result(generation_id, generation)
+        except Exception as e:
+            return VideoResult(id=generation_id, status=VideoStatus.FAILED, error=str(e))
+    
+    async def wait_for_completion_async(
+        self,
+        generation_id: str,
+        timeout: int = 300,
+        poll_interval: int = 5,
+        callback=None
+    ) -> VideoResult:
+        """Poll until the video is done without holding a thread."""
+        start_time = time.time()
+        
+        while time.time() - start_time < timeout:
+            result = await self.get_video_status_async(generation_id)
+            
+            if callback:
+                callback(result)
+            
+            if result.status in (VideoStatus.COMPLETED, VideoStatus.FAILED):
+                return result
+            
+            await asyncio.sleep(poll_interval)
+        
+        return VideoResult(
+            id=generation_id,
+            status=VideoStatus.FAILED,
+            error="Timeout waiting for video generation"
+        )
@@ -0,0 +1,19 @@
+"""Conversions between the app's chat messages and provider formats."""
+
+from typing import Dict, List
+
+
+def to_gemini_history(messages: List[Dict[str, str]]):
+    """Split chat messages into Gemini chat history and the message to send."""
+    if not messages:
+        return [], ""
+
+    history = [
+        {"role": "user" if msg["role"] == "user" else "model", "parts": [msg["content"]]}
+        for msg in messages[:-1]
+    ]
+    last = messages[-1]
+    if last["role"] != "user":
+        # Last message wasn't from the user (e.g. continue): keep it and send it again
+        history.append({"role": "model", "parts": [last["content"]]})
+    return history, last["content"]
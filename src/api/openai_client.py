@@ -3,12 +3,8 @@
 from typing import Optional, List, Dict, Generator
 from dataclasses import dataclass
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
-    OpenAI = None
+from .http_pool import HttpPool, get_http_pool
+from .providers import registry
 
 
 @dataclass
@@ -21,16 +17,20 @@ class ChatMessage:
 class OpenAIClient:
     """Client for interacting with OpenAI API."""
     
-    def __init__(self, api_key: str):
-        if not OPENAI_AVAILABLE:
+    def __init__(self, api_key: str, http_pool: Optional[HttpPool] = None):
+        if not registry.is_available("openai"):
             raise ImportError("OpenAI package is not installed. Run: pip install openai")
-        self.client = OpenAI(api_key=api_key) if api_key else None
-        self.api_key = api_key
+        self.http_pool = http_pool or get_http_pool()
+        self.set_api_key(api_key)
     
     def set_api_key(self, api_key: str) -> None:
         """Update the API key."""
         self.api_key = api_key
-        self.client = OpenAI(api_key=api_key) if api_key else None
+        if api_key:
+            openai = registry.import_sdk("openai")
+            self.client = openai.OpenAI(api_key=api_key, http_client=self.http_pool.httpx_client)
+        else:
+            self.client = None
     
     def is_configured(self) -> bool:
         """Check if API key is configured."""
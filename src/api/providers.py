@@ -0,0 +1,327 @@
+"""Registry of AI providers with lazily imported SDKs.
+
+Each provider is described by a ProviderDescriptor: plain data naming the
+SDK module and, for chat providers, the backend class as a dotted path.
+Nothing provider-specific is imported until a backend is first used, so
+starting the app does not pay for SDKs the user never touches. A new
+provider plugs in by registering a descriptor and a ChatBackend subclass.
+
+Self-hosted OpenAI-compatible servers (vLLM, llama.cpp server, ...) are
+registered from the settings as ``endpoint:<name>`` providers served by
+the OpenAI backend, each with its own connection pool and concurrency
+limit.
+"""
+
+import importlib
+import importlib.util
+import threading
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from .http_pool import HttpPool
+
+ENDPOINT_PREFIX = "endpoint:"
+DEFAULT_ENDPOINT_CONCURRENCY = 4
+
+
+@dataclass(frozen=True)
+class ProviderDescriptor:
+    """What the app needs to know about a provider before loading it."""
+
+    name: str
+    label: str
+    kind: str  # "chat" or "video"
+    sdk_module: str  # imported on first use
+    pip_name: str  # shown when the SDK is missing
+    backend: str = ""  # "module:Class" relative to this package, chat providers only
+    models: Tuple[str, ...] = field(default_factory=tuple)
+    base_url: str = ""  # OpenAI-compatible endpoints only
+    max_concurrency: int = 0  # requests and pooled connections; 0 = shared pool
+
+
+def endpoint_descriptor(endpoint: Dict) -> ProviderDescriptor:
+    """Descriptor for one ``AppConfig.custom_endpoints`` entry."""
+    models = endpoint.get("models") or ()
+    if isinstance(models, str):
+        models = [m.strip() for m in models.split(",")]
+    return ProviderDescriptor(
+        name=ENDPOINT_PREFIX + endpoint["name"],
+        label=endpoint["name"],
+        kind="chat",
+        sdk_module="openai",
+        pip_name="openai",
+        backend="backends.openai_backend:OpenAIBackend",
+        models=tuple(m for m in models if m),
+        base_url=endpoint.get("base_url", "").rstrip("/"),
+        max_concurrency=max(1, int(endpoint.get("max_concurrency") or DEFAULT_ENDPOINT_CONCURRENCY)),
+    )
+
+
+BUILTIN_PROVIDERS = (
+    ProviderDescriptor(
+        name="openai",
+        label="OpenAI",
+        kind="chat",
+        sdk_module="openai",
+        pip_name="openai",
+        backend="backends.openai_backend:OpenAIBackend",
+        models=("gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"),
+    ),
+    ProviderDescriptor(
+        name="gemini",
+        label="Google Gemini",
+        kind="chat",
+        sdk_module="google.generativeai",
+        pip_name="google-generativeai",
+        backend="backends.gemini_backend:GeminiBackend",
+        models=("gemini-2.0-flash", "gemini-1.5-pro", "gemini-1.5-flash", "gemini-1.0-pro"),
+    ),
+    ProviderDescriptor(
+        name="lumaai",
+        label="Luma AI",
+        kind="video",
+        sdk_module="lumaai",
+        pip_name="lumaai",
+    ),
+)
+
+
+class ProviderRegistry:
+    """Descriptors by name, plus lazy loading of SDKs and backend classes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._descriptors: Dict[str, ProviderDescriptor] = {}
+        self._backend_classes: Dict[str, type] = {}
+
+    def register(self, descriptor: ProviderDescriptor) -> None:
+        """Add or replace a provider."""
+        with self._lock:
+            self._descriptors[descriptor.name] = descriptor
+            self._backend_classes.pop(descriptor.name, None)
+
+    def unregister(self, name: str) -> None:
+        with self._lock:
+            self._descriptors.pop(name, None)
+            self._backend_classes.pop(name, None)
+
+    def get(self, name: str) -> ProviderDescriptor:
+        with self._lock:
+            descriptor = self._descriptors.get(name)
+        if descriptor is None:
+            raise ValueError(f"Unknown provider: {name}")
+        return descriptor
+
+    def set_endpoints(self, endpoints: List[Dict]) -> List[ProviderDescriptor]:
+        """Replace the registered OpenAI-compatible endpoints.
+
+        Entries without a name or base URL are skipped.
+        """
+        descriptors = [endpoint_descriptor(e) for e in endpoints if e.get("name") and e.get("base_url")]
+        with self._lock:
+            for name in [n for n in self._descriptors if n.startswith(ENDPOINT_PREFIX)]:
+                del self._descriptors[name]
+                self._backend_classes.pop(name, None)
+            for descriptor in descriptors:
+                self._descriptors[descriptor.name] = descriptor
+        return descriptors
+
+    def names(self, kind: Optional[str] = None) -> List[str]:
+        """Registered provider names, optionally only those of ``kind``."""
+        with self._lock:
+            return [d.name for d in self._descriptors.values() if kind is None or d.kind == kind]
+
+    def is_available(self, name: str) -> bool:
+        """Whether the provider's SDK is installed, without importing it."""
+        module = self.get(name).sdk_module
+        try:
+            return importlib.util.find_spec(module) is not None
+        except (ImportError, ValueError):
+            # find_spec imports parent packages; a broken one counts as missing
+            return False
+
+    def import_sdk(self, name: str):
+        """Import and return the provider's SDK module."""
+        descriptor = self.get(name)
+        try:
+            return importlib.import_module(descriptor.sdk_module)
+        except ImportError as e:
+            raise ImportError(
+                f"{descriptor.label} package is not installed. Run: pip install {descriptor.pip_name}"
+            ) from e
+
+    def backend_class(self, name: str) -> type:
+        """The provider's ChatBackend subclass, importing it on first use."""
+        with self._lock:
+            cls = self._backend_classes.get(name)
+        if cls is not None:
+            return cls
+        descriptor = self.get(name)
+        if not descriptor.backend:
+            raise ValueError(f"{descriptor.label} does not support chat")
+        self.import_sdk(name)
+        module_name, _, class_name = descriptor.backend.partition(":")
+        module = importlib.import_module(f"{__package__}.{module_name}")
+        cls = getattr(module, class_name)
+        with self._lock:
+            self._backend_classes[name] = cls
+        return cls
+
+
+registry = ProviderRegistry()
+for _descriptor in BUILTIN_PROVIDERS:
+    registry.register(_descriptor)
+
+
+class ChatBackend:
+    """Chat (and optionally image) requests for one provider.
+
+    One instance serves both the threaded and the asyncio client; the
+    ``policy`` is the provider's ProviderPolicy, whose headers hook the
+    backend feeds with rate-limit information.
+    """
+
+    def __init__(self, descriptor: ProviderDescriptor, api_key: str, http_pool: HttpPool, policy):
+        self.descriptor = descriptor
+        self.api_key = api_key
+        self.http_pool = http_pool
+        self.policy = policy
+        # Async streams skip the SDK and use the SSE transport (see ``sse_transport``)
+        self.fast_streaming = False
+        self._sse = None
+
+    def sse_transport(self):
+        """The backend's SSE transport, created (importing aiohttp) on first use."""
+        if self._sse is None:
+            from .sse_transport import SSETransport
+            self._sse = SSETransport(self.http_pool)
+        return self._sse
+
+    def set_api_key(self, api_key: str) -> None:
+        self.api_key = api_key
+
+    def stream(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> Iterator[str]:
+        """Stream a chat completion from a worker thread."""
+        raise NotImplementedError
+
+    def stream_async(
+        self,
+        messages: List[Dict[str, str]],
+        model: str,
+        max_tokens: int,
+        temperature: float,
+        conversation: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion on the shared loop."""
+        raise NotImplementedError
+
+    async def aclose(self) -> None:
+        """Close connections owned by the async side."""
+        if self._sse is not None:
+            await self._sse.aclose()
+            self._sse = None
+
+
+class ProviderBackends:
+    """The backends of one client, created when a provider is first used.
+
+    Providers with a ``max_concurrency`` get a connection pool of their
+    own (following the shared pool's proxy) and a concurrency ceiling on
+    their rate policy, which also caps their scheduler slots.
+    """
+
+    def __init__(self, http_pool: HttpPool, policies, api_keys: Optional[Dict[str, str]] = None):
+        self.http_pool = http_pool
+        self.policies = policies
+        self.api_keys: Dict[str, str] = dict(api_keys or {})
+        self._lock = threading.Lock()
+        self._backends: Dict[str, ChatBackend] = {}
+        # Replaced backends whose async connections are closed with the rest
+        self._retired: List[ChatBackend] = []
+        self.fast_streaming = False
+
+    def set_api_key(self, name: str, api_key: str) -> None:
+        with self._lock:
+            self.api_keys[name] = api_key
+            backend = self._backends.get(name)
+        if backend is not None:
+            backend.set_api_key(api_key)
+
+    def set_fast_streaming(self, enabled: bool) -> bool:
+        """Stream over the SSE transport where a backend supports it.
+
+        Returns whether it is on, which needs aiohttp.
+        """
+        self.fast_streaming = enabled and importlib.util.find_spec("aiohttp") is not None
+        for backend in self.loaded():
+            backend.fast_streaming = self.fast_streaming
+        return self.fast_streaming
+
+    def set_endpoints(self, endpoints: List[Dict]) -> None:
+        """Register ``endpoints`` and drop backends built for stale settings."""
+        descriptors = {d.name: d for d in registry.set_endpoints(endpoints)}
+        keys = {ENDPOINT_PREFIX + e["name"]: e.get("api_key", "") for e in endpoints if e.get("name")}
+        with self._lock:
+            for name in [n for n in self.api_keys if n.startswith(ENDPOINT_PREFIX)]:
+                del self.api_keys[name]
+            self.api_keys.update((name, keys.get(name, "")) for name in descriptors)
+            for name, backend in list(self._backends.items()):
+                if name.startswith(ENDPOINT_PREFIX) and backend.descriptor != descriptors.get(name):
+                    del self._backends[name]
+                    self._retired.append(backend)
+            current = {name: b for name, b in self._backends.items() if name in descriptors}
+        for name, backend in current.items():
+            backend.set_api_key(self.api_keys[name])
+        for descriptor in descriptors.values():
+            self._apply_limit(descriptor)
+
+    def _apply_limit(self, descriptor: ProviderDescriptor) -> None:
+        if descriptor.max_concurrency:
+            self.policies.get(descriptor.name).concurrency.set_maximum(descriptor.max_concurrency)
+
+    def get(self, name: str) -> ChatBackend:
+        with self._lock:
+            backend = self._backends.get(name)
+        if backend is None:
+            cls = registry.backend_class(name)
+            descriptor = registry.get(name)
+            with self._lock:
+                backend = self._backends.get(name)
+                if backend is None:
+                    backend = self._backends[name] = cls(
+                        descriptor, self.api_keys.get(name, ""), self._pool_for(descriptor), self.policies.get(name)
+                    )
+                    backend.fast_streaming = self.fast_streaming
+            self._apply_limit(descriptor)
+        if backend.http_pool is not self.http_pool:
+            # Own pools follow proxy changes of the shared one
+            backend.http_pool.configure(self.http_pool.proxy)
+        return backend
+
+    def _pool_for(self, descriptor: ProviderDescriptor) -> HttpPool:
+        if not descriptor.max_concurrency:
+            return self.http_pool
+        return HttpPool(
+            proxy=self.http_pool.proxy,
+            pool_connections=1,
+            pool_maxsize=descriptor.max_concurrency,
+        )
+
+    def loaded(self) -> List[ChatBackend]:
+        with self._lock:
+            return list(self._backends.values())
+
+    async def aclose(self) -> None:
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for backend in self.loaded() + retired:
+            await backend.aclose()
+            if backend.http_pool is not self.http_pool:
+                backend.http_pool.close()
@@ -0,0 +1,386 @@
+"""Per-provider retry, rate limiting and adaptive concurrency.
+
+Every upstream call goes through a ProviderPolicy, which:
+
+- retries 429s, 5xx and connection errors with exponential backoff and
+  full jitter, waiting at least as long as ``Retry-After`` asks;
+- paces requests with a token bucket sized from the provider's
+  ``x-ratelimit-*`` headers once it has seen them;
+- caps concurrent requests with an AIMD limit that grows by about one per
+  round of successes and halves whenever the provider throttles.
+
+A stream is only retried before its first chunk, so replies are never
+duplicated.
+"""
+
+import asyncio
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Callable, Dict, Iterator, Mapping, Optional, Tuple
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+RETRYABLE_ERRORS: Tuple[type, ...] = (ConnectionError, TimeoutError)
+if HTTPX_AVAILABLE:
+    RETRYABLE_ERRORS += (httpx.TransportError,)
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+@dataclass
+class RetryPolicy:
+    """Backoff settings for one provider."""
+
+    max_retries: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential delay before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Seconds in an OpenAI reset header such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    parts = _DURATION_PART.findall(value or "")
+    if not parts:
+        return None
+    return sum(float(number) * _DURATION_UNITS[unit] for number, unit in parts)
+
+
+def parse_retry_after(headers: Optional[Mapping]) -> Optional[float]:
+    """Seconds to wait according to ``retry-after-ms`` or ``retry-after``."""
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _is_sdk_connection_error(exc: BaseException) -> bool:
+    # Looked up only once the SDK is loaded; importing it here would undo
+    # the lazy provider imports
+    openai = sys.modules.get("openai")
+    connection_error = getattr(openai, "APIConnectionError", None)
+    return connection_error is not None and isinstance(exc, connection_error)
+
+
+def classify_error(exc: BaseException) -> Tuple[bool, bool, Optional[float]]:
+    """``(retryable, throttled, retry_after)`` for an exception from an SDK.
+
+    OpenAI errors carry ``status_code`` and the response; google-api-core
+    errors carry the HTTP status as ``code``.
+    """
+    if isinstance(exc, RETRYABLE_ERRORS) or _is_sdk_connection_error(exc):
+        return True, False, None
+    status = getattr(exc, "status_code", None)
+    if status is None:
+        status = getattr(exc, "code", None)
+    if not isinstance(status, int):
+        return False, False, None
+    response = getattr(exc, "response", None)
+    retry_after = parse_retry_after(getattr(response, "headers", None))
+    return status in RETRYABLE_STATUS, status == 429, retry_after
+
+
+class TokenBucket:
+    """Request pacing; unlimited until ``resize`` is given a rate."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.rate = 0.0  # tokens per second, 0 = unlimited
+        self.capacity = 0.0
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+
+    def resize(self, limit: int, window: float, remaining: Optional[int] = None) -> None:
+        """Size the bucket for ``limit`` requests per ``window`` seconds."""
+        with self._lock:
+            self._refill_locked(time.monotonic())
+            self.rate = limit / window
+            self.capacity = float(limit)
+            if remaining is not None:
+                # The provider's own count wins over our estimate
+                self._tokens = min(self._tokens, float(remaining))
+            self._tokens = min(self._tokens, self.capacity)
+
+    def block(self, seconds: float) -> None:
+        """Hold every request back for ``seconds`` (after a Retry-After)."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def _refill_locked(self, now: float) -> None:
+        if self.rate:
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._blocked_until - now)
+            if not self.rate:
+                return delay
+            self._refill_locked(now)
+            self._tokens -= 1
+            if self._tokens < 0:
+                delay = max(delay, -self._tokens / self.rate)
+            return delay
+
+
+class AdaptiveConcurrency:
+    """AIMD limit on concurrent requests, usable from threads and coroutines."""
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._async_waiters: deque = deque()
+
+    def set_maximum(self, maximum: int) -> None:
+        """Change the ceiling, e.g. to an endpoint's configured limit."""
+        with self._lock:
+            self.maximum = max(self.minimum, maximum)
+            self.limit = min(self.limit, float(self.maximum))
+
+    def _try_acquire_locked(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self) -> None:
+        with self._cond:
+            while not self._try_acquire_locked():
+                self._cond.wait()
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire_locked():
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, throttled: bool = False, succeeded: bool = False) -> None:
+        """Free a slot; grow the limit after a success, halve it on throttling."""
+        with self._lock:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.minimum), self.limit / 2)
+            elif succeeded:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+            # Waiters re-check the limit themselves
+            while self._async_waiters:
+                loop, waiter = self._async_waiters.popleft()
+                loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ProviderPolicy:
+    """Retry, pacing and concurrency for one provider."""
+
+    def __init__(self, name: str, retry: Optional[RetryPolicy] = None):
+        self.name = name
+        self.retry = retry or RetryPolicy()
+        self.bucket = TokenBucket()
+        self.concurrency = AdaptiveConcurrency()
+        self._counters = {"requests": 0, "retries": 0, "throttled": 0, "failures": 0}
+
+    def observe_headers(self, headers: Optional[Mapping]) -> None:
+        """Size the token bucket from a response's request-rate headers."""
+        if not headers:
+            return
+        try:
+            limit = int(headers.get("x-ratelimit-limit-requests") or 0)
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            remaining = int(remaining) if remaining is not None else None
+        except ValueError:
+            return
+        if limit <= 0:
+            return
+        # OpenAI's request limits are per minute; the reset header tells how
+        # long until the window refills, which bounds it for smaller tiers
+        window = 60.0
+        reset = parse_duration(headers.get("x-ratelimit-reset-requests", ""))
+        if reset and remaining is not None and remaining < limit:
+            window = min(window, reset * limit / (limit - remaining))
+        self.bucket.resize(limit, window, remaining)
+
+    def _retry_delay(self, exc: BaseException, attempt: int) -> Optional[float]:
+        """Delay before retrying after ``exc``, or None to give up."""
+        retryable, throttled, retry_after = classify_error(exc)
+        if throttled:
+            self._counters["throttled"] += 1
+        if not retryable or attempt >= self.retry.max_retries:
+            self._counters["failures"] += 1
+            return None
+        delay = self.retry.backoff(attempt)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+            self.bucket.block(retry_after)
+        self._counters["retries"] += 1
+        return delay
+
+    def call(self, fn: Callable):
+        """Run ``fn()`` under the policy, retrying transient failures."""
+        attempt = 0
+        while True:
+            time.sleep(self.bucket.reserve())
+            self.concurrency.acquire()
+            self._counters["requests"] += 1
+            try:
+                result = fn()
+            except Exception as e:
+                self.concurrency.release(throttled=classify_error(e)[1])
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self.concurrency.release(succeeded=True)
+            return result
+
+    def stream(self, start: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Chunks of ``start()``, retried as a whole until the first chunk arrives."""
+        attempt = 0
+        while True:
+            time.sleep(self.bucket.reserve())
+            self.concurrency.acquire()
+            self._counters["requests"] += 1
+            started = False
+            throttled = succeeded = False
+            try:
+                for chunk in start():
+                    started = True
+                    yield chunk
+                succeeded = True
+                return
+            except Exception as e:
+                throttled = classify_error(e)[1]
+                if started:
+                    self._counters["failures"] += 1
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release(throttled=throttled, succeeded=succeeded)
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: Callable):
+        """Await ``fn()`` under the policy, retrying transient failures."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.bucket.reserve())
+            await self.concurrency.acquire_async()
+            self._counters["requests"] += 1
+            try:
+                result = await fn()
+            except Exception as e:
+                self.concurrency.release(throttled=classify_error(e)[1])
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            except BaseException:
+                self.concurrency.release()
+                raise
+            self.concurrency.release(succeeded=True)
+            return result
+
+    async def stream_async(self, start: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Async counterpart of ``stream``."""
+        attempt = 0
+        while True:
+            await asyncio.sleep(self.bucket.reserve())
+            await self.concurrency.acquire_async()
+            self._counters["requests"] += 1
+            started = False
+            throttled = succeeded = False
+            try:
+                async for chunk in start():
+                    started = True
+                    yield chunk
+                succeeded = True
+                return
+            except Exception as e:
+                throttled = classify_error(e)[1]
+                if started:
+                    self._counters["failures"] += 1
+                    raise
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                self.concurrency.release(throttled=throttled, succeeded=succeeded)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def stats(self) -> Dict:
+        stats = dict(self._counters)
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        stats["requests_per_second"] = self.bucket.rate
+        return stats
+
+
+class ProviderPolicies:
+    """One ProviderPolicy per provider name, created on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._policies: Dict[str, ProviderPolicy] = {}
+
+    def get(self, provider: str) -> ProviderPolicy:
+        with self._lock:
+            policy = self._policies.get(provider)
+            if policy is None:
+                policy = self._policies[provider] = ProviderPolicy(provider)
+            return policy
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            policies = dict(self._policies)
+        return {name: policy.stats() for name, policy in policies.items()}
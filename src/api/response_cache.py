@@ -0,0 +1,199 @@
+"""Response cache for deterministic chat completions.
+
+Replies are stored as the list of streamed chunks, so a hit replays
+through the same streaming path as a live reply. A small in-memory LRU
+sits in front of a SQLite file that expires entries after a TTL and
+evicts the least recently used ones past a size limit.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+RESPONSE_CACHE_DB = "response_cache.db"
+DEFAULT_MEMORY_ITEMS = 128
+DEFAULT_TTL_HOURS = 24 * 7
+DEFAULT_MAX_DISK_MB = 50
+# Only replies sampled at or below this temperature are reproducible
+DEFAULT_MAX_TEMPERATURE = 0.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    chunks TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed);
+"""
+
+
+def cache_key(provider: str, model: str, messages: List[Dict], temperature: float, max_tokens: int) -> str:
+    """Hash of everything that determines a completion.
+
+    Messages are reduced to role and content with surrounding whitespace
+    stripped, so UI-only fields and stray newlines do not split entries.
+    """
+    normalized = [
+        [msg.get("role", ""), str(msg.get("content", "")).strip()]
+        for msg in messages
+    ]
+    payload = json.dumps(
+        [provider, model, normalized, round(float(temperature), 3), int(max_tokens)],
+        ensure_ascii=False, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier cache of streamed replies keyed by ``cache_key``."""
+
+    def __init__(
+        self,
+        path: Optional[str] = RESPONSE_CACHE_DB,
+        memory_items: int = DEFAULT_MEMORY_ITEMS,
+        ttl_hours: float = DEFAULT_TTL_HOURS,
+        max_disk_mb: float = DEFAULT_MAX_DISK_MB,
+        max_temperature: float = DEFAULT_MAX_TEMPERATURE,
+    ):
+        self.path = path
+        self.memory_items = memory_items
+        self.ttl = ttl_hours * 3600
+        self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+        self.max_temperature = max_temperature
+        # key -> (created, chunks), least recently used first
+        self._memory: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    def accepts(self, temperature: float) -> bool:
+        """Whether a request at ``temperature`` may be served from the cache."""
+        return temperature <= self.max_temperature
+
+    def _disk(self) -> Optional[sqlite3.Connection]:
+        # Opened on first use; callers hold self._lock
+        if self._conn is None and self.path:
+            conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """The cached chunks for ``key``, or None on a miss."""
+        with self._lock:
+            now = time.time()
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+
+            conn = self._disk()
+            row = None
+            if conn is not None:
+                row = conn.execute("SELECT chunks, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._counters["misses"] += 1
+                return None
+
+            conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            chunks = json.loads(row[0])
+            self._remember(key, chunks, row[1])
+            self._counters["disk_hits"] += 1
+            return chunks
+
+    def put(self, key: str, chunks: List[str]) -> None:
+        """Store a complete reply."""
+        if not chunks:
+            return
+        with self._lock:
+            now = time.time()
+            self._remember(key, chunks, now)
+            self._counters["stores"] += 1
+            conn = self._disk()
+            if conn is None:
+                return
+            text = json.dumps(chunks, ensure_ascii=False)
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, chunks, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, text, len(text.encode("utf-8")), now, now),
+            )
+            self._evict_locked(now)
+
+    def _remember(self, key: str, chunks: List[str], created: float) -> None:
+        self._memory[key] = (created, chunks)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _evict_locked(self, now: float) -> None:
+        """Drop expired entries, then least recently used rows over the size limit."""
+        expired = [key for key, (created, _) in self._memory.items() if created < now - self.ttl]
+        for key in expired:
+            del self._memory[key]
+        conn = self._conn
+        if conn is None:
+            return
+        evicted = conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_disk_bytes:
+            doomed = []
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed"):
+                if total <= self.max_disk_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            for (key,) in doomed:
+                self._memory.pop(key, None)
+            evicted += len(doomed)
+        self._counters["evictions"] += evicted
+
+    def configure(self, ttl_hours: float, max_disk_mb: float) -> None:
+        """Apply new limits, evicting right away if they shrank."""
+        with self._lock:
+            self.ttl = ttl_hours * 3600
+            self.max_disk_bytes = int(max_disk_mb * 1024 * 1024)
+            self._disk()
+            self._evict_locked(time.time())
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and current tier sizes."""
+        with self._lock:
+            stats = dict(self._counters)
+            stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+            stats["memory_items"] = len(self._memory)
+            conn = self._disk()
+            if conn is not None:
+                count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+            else:
+                count, size = 0, 0
+            stats["disk_items"] = count
+            stats["disk_bytes"] = size
+        return stats
+
+    def clear(self) -> None:
+        """Forget every cached reply."""
+        with self._lock:
+            self._memory.clear()
+            conn = self._disk()
+            if conn is not None:
+                conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
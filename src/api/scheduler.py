@@ -0,0 +1,188 @@
+"""Priority scheduler for upstream requests from every page.
+
+Requests wait for a per-provider slot. Free slots go to the highest
+priority class first and, within a class, round-robin across flows (one
+flow per conversation or compare side), so one long run cannot starve
+another. While more than one slot is available, one is always kept free
+for interactive work, so a background AI-to-AI run never delays a live
+chat reply by more than the request already holding a slot.
+
+The scheduler lives on the shared asyncio loop; use it from coroutines
+running there only.
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import AsyncIterator, Dict, Optional
+
+DEFAULT_PROVIDER_CAP = 8
+INTERACTIVE_RESERVE = 1  # slots only interactive requests may take
+
+
+class Priority(IntEnum):
+    """Request classes, most urgent first."""
+
+    INTERACTIVE = 0  # chat replies, image and video requests the user waits on
+    BACKGROUND = 1  # AI-to-AI runs
+    BATCH = 2  # Compare AI runs, video status polling
+
+
+class _Waiter:
+    __slots__ = ("future", "priority", "flow", "enqueued")
+
+    def __init__(self, future: asyncio.Future, priority: Priority, flow: str):
+        self.future = future
+        self.priority = priority
+        self.flow = flow
+        self.enqueued = time.monotonic()
+
+
+class _ProviderQueue:
+    def __init__(self, cap: int):
+        self.cap = cap
+        self.limit = cap  # adaptive limit reported by the rate policy
+        self.in_flight = 0
+        # Per priority: flow -> waiters, ordered for round-robin
+        self.queues = [OrderedDict() for _ in Priority]
+        self.max_queued = 0
+        self.served = [0 for _ in Priority]
+        self.wait_total = [0.0 for _ in Priority]
+
+    def queued(self, priority: Priority) -> int:
+        return sum(len(waiters) for waiters in self.queues[priority].values())
+
+    def admits(self, priority: Priority) -> bool:
+        slots = max(1, min(self.cap, self.limit))
+        if priority != Priority.INTERACTIVE and slots > INTERACTIVE_RESERVE:
+            slots -= INTERACTIVE_RESERVE
+        return self.in_flight < slots
+
+
+class RequestScheduler:
+    """Grants per-provider request slots by priority with fair queuing."""
+
+    def __init__(self, default_cap: int = DEFAULT_PROVIDER_CAP):
+        self.default_cap = default_cap
+        self._providers: Dict[str, _ProviderQueue] = {}
+
+    def _queue(self, provider: str) -> _ProviderQueue:
+        queue = self._providers.get(provider)
+        if queue is None:
+            queue = self._providers[provider] = _ProviderQueue(self.default_cap)
+        return queue
+
+    def set_cap(self, provider: str, cap: int) -> None:
+        """Limit concurrent requests to ``provider``."""
+        queue = self._queue(provider)
+        queue.cap = max(1, cap)
+        self._dispatch(queue)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        provider: str,
+        priority: Priority = Priority.INTERACTIVE,
+        flow: str = "",
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[None]:
+        """Hold one of ``provider``'s slots for the duration of the block.
+
+        ``limit`` passes on the provider's current adaptive concurrency so
+        the scheduler never admits more than the rate policy would.
+        """
+        queue = self._queue(provider)
+        if limit is not None:
+            queue.limit = max(1, limit)
+        waiter = _Waiter(asyncio.get_running_loop().create_future(), priority, flow)
+        queue.queues[priority].setdefault(flow, deque()).append(waiter)
+        queue.max_queued = max(queue.max_queued, sum(queue.queued(p) for p in Priority))
+        self._dispatch(queue)
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # Granted just as the caller was cancelled
+                self._release(queue)
+            else:
+                self._forget(queue, waiter)
+            raise
+        try:
+            yield
+        finally:
+            self._release(queue)
+
+    def _release(self, queue: _ProviderQueue) -> None:
+        queue.in_flight -= 1
+        self._dispatch(queue)
+
+    @staticmethod
+    def _forget(queue: _ProviderQueue, waiter: _Waiter) -> None:
+        flows = queue.queues[waiter.priority]
+        waiters = flows.get(waiter.flow)
+        if waiters is not None and waiter in waiters:
+            waiters.remove(waiter)
+            if not waiters:
+                del flows[waiter.flow]
+
+    def _dispatch(self, queue: _ProviderQueue) -> None:
+        """Grant free slots, most urgent class first, round-robin across flows."""
+        while True:
+            waiter = None
+            for priority in Priority:
+                flows = queue.queues[priority]
+                if not flows:
+                    continue
+                if not queue.admits(priority):
+                    # Lower classes have even fewer slots
+                    return
+                flow, waiters = next(iter(flows.items()))
+                waiter = waiters.popleft()
+                if waiters:
+                    flows.move_to_end(flow)
+                else:
+                    del flows[flow]
+                break
+            if waiter is None:
+                return
+            if waiter.future.done():
+                continue
+            queue.in_flight += 1
+            queue.served[waiter.priority] += 1
+            queue.wait_total[waiter.priority] += time.monotonic() - waiter.enqueued
+            waiter.future.set_result(None)
+
+    def stats(self) -> Dict[str, Dict]:
+        """Queue depth, slot use and waiting time per provider."""
+        stats = {}
+        for provider, queue in self._providers.items():
+            stats[provider] = {
+                "cap": queue.cap,
+                "limit": queue.limit,
+                "in_flight": queue.in_flight,
+                "queued": {p.name.lower(): queue.queued(p) for p in Priority},
+                "max_queued": queue.max_queued,
+                "served": {p.name.lower(): queue.served[p] for p in Priority},
+                "avg_wait_ms": {
+                    p.name.lower(): (queue.wait_total[p] / queue.served[p] * 1000) if queue.served[p] else 0.0
+                    for p in Priority
+                },
+            }
+        return stats
+
+
+_shared_scheduler: Optional[RequestScheduler] = None
+_shared_lock = threading.Lock()
+
+
+def get_request_scheduler() -> RequestScheduler:
+    """The scheduler shared by all clients."""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
@@ -0,0 +1,148 @@
+"""Coalescing of identical in-flight streaming requests.
+
+The first caller for a key starts the upstream stream; callers arriving
+while it runs attach to it, first receiving the chunks already streamed
+and then the live ones. The upstream is abandoned once every caller has
+stopped listening.
+"""
+
+import asyncio
+import threading
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
+
+
+class _Flight:
+    def __init__(self, cond):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.cond = cond
+        self.task = None
+
+
+class SingleFlight:
+    """Shares one upstream stream between identical requests from any thread.
+
+    The upstream runs on its own pump thread so that no caller's early
+    exit cuts the stream short for the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    def stream(self, key: str, start: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Chunks of the stream for ``key``, starting it with ``start()`` if needed."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(threading.Condition(self._lock))
+                threading.Thread(
+                    target=self._pump, args=(key, flight, start), name="SingleFlight", daemon=True
+                ).start()
+            else:
+                self.coalesced += 1
+            flight.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                with self._lock:
+                    while index == len(flight.chunks) and not flight.done:
+                        flight.cond.wait()
+                    new = flight.chunks[index:]
+                    index += len(new)
+                    finished = flight.done and index == len(flight.chunks)
+                yield from new
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            with self._lock:
+                flight.subscribers -= 1
+                if flight.subscribers == 0 and self._flights.get(key) is flight:
+                    # Nobody listens any more; the pump stops at its next chunk
+                    del self._flights[key]
+
+    def _pump(self, key: str, flight: _Flight, start: Callable[[], Iterator[str]]) -> None:
+        upstream = None
+        try:
+            upstream = start()
+            for chunk in upstream:
+                with self._lock:
+                    if flight.subscribers == 0:
+                        break
+                    flight.chunks.append(chunk)
+                    flight.cond.notify_all()
+        except Exception as e:
+            flight.error = e
+        finally:
+            if hasattr(upstream, "close"):
+                upstream.close()
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.done = True
+                flight.cond.notify_all()
+
+
+class AsyncSingleFlight:
+    """Asyncio counterpart of SingleFlight; use from the shared loop only."""
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.coalesced = 0
+
+    async def stream(self, key: str, start: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Chunks of the stream for ``key``, starting it with ``start()`` if needed."""
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = _Flight(asyncio.Condition())
+            flight.task = asyncio.ensure_future(self._pump(key, flight, start))
+        else:
+            self.coalesced += 1
+        flight.subscribers += 1
+
+        index = 0
+        try:
+            while True:
+                async with flight.cond:
+                    await flight.cond.wait_for(lambda: index < len(flight.chunks) or flight.done)
+                new = flight.chunks[index:]
+                index += len(new)
+                finished = flight.done and index == len(flight.chunks)
+                for chunk in new:
+                    yield chunk
+                if finished:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                if not flight.done:
+                    flight.task.cancel()
+
+    async def _pump(self, key: str, flight: _Flight, start: Callable[[], AsyncIterator[str]]) -> None:
+        upstream = start()
+        try:
+            async for chunk in upstream:
+                flight.chunks.append(chunk)
+                async with flight.cond:
+                    flight.cond.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            flight.error = e
+        finally:
+            await upstream.aclose()
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            flight.done = True
+            async with flight.cond:
+                flight.cond.notify_all()
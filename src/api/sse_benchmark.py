@@ -0,0 +1,102 @@
+"""CPU cost of reading streamed replies: SSE transport versus the OpenAI SDK.
+
+Both paths parse the same synthetic chat-completions stream, one chunk per
+token as the API sends it, entirely in memory, so only parsing and object
+construction are measured. Run it with ``python main.py bench-sse``.
+"""
+
+import json
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .sse_transport import gemini_delta, iter_deltas, openai_delta
+
+SAMPLE_TOKENS = ("The", " quick", " brown", " fox", " jumps", " over", " the", " lazy", " dog", ".")
+
+
+def openai_stream(tokens: int) -> List[bytes]:
+    """Body lines of a chat-completions stream of ``tokens`` single-token chunks."""
+    lines = []
+    for index in range(tokens):
+        chunk = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 1700000000,
+            "model": "gpt-4o-mini",
+            "system_fingerprint": "fp_bench",
+            "choices": [{
+                "index": 0,
+                "delta": {"content": SAMPLE_TOKENS[index % len(SAMPLE_TOKENS)]},
+                "logprobs": None,
+                "finish_reason": None,
+            }],
+        }
+        lines += [b"data: " + json.dumps(chunk).encode() + b"\n", b"\n"]
+    usage = {
+        "id": "chatcmpl-bench", "object": "chat.completion.chunk", "created": 1700000000,
+        "model": "gpt-4o-mini", "choices": [],
+        "usage": {"prompt_tokens": 20, "completion_tokens": tokens, "total_tokens": tokens + 20},
+    }
+    lines += [b"data: " + json.dumps(usage).encode() + b"\n", b"\n", b"data: [DONE]\n", b"\n"]
+    return lines
+
+
+def gemini_stream(tokens: int, tokens_per_event: int = 8) -> List[bytes]:
+    """Body lines of a Gemini ``alt=sse`` stream; Gemini batches several tokens per event."""
+    lines = []
+    for start in range(0, tokens, tokens_per_event):
+        text = "".join(SAMPLE_TOKENS[i % len(SAMPLE_TOKENS)] for i in range(start, min(start + tokens_per_event, tokens)))
+        event = {
+            "candidates": [{"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}],
+            "usageMetadata": {"promptTokenCount": 20, "candidatesTokenCount": min(start + tokens_per_event, tokens)},
+            "modelVersion": "gemini-2.0-flash",
+        }
+        lines += [b"data: " + json.dumps(event).encode() + b"\r\n", b"\r\n"]
+    return lines
+
+
+def _sdk_openai_reader() -> Optional[Callable[[Iterable[bytes]], List[str]]]:
+    """What ``openai.AsyncStream`` does per chunk, or None without the SDK."""
+    try:
+        from openai._models import construct_type
+        from openai._streaming import SSEDecoder
+        from openai.types.chat import ChatCompletionChunk
+    except ImportError:
+        return None
+
+    def read(lines):
+        texts = []
+        for sse in SSEDecoder().iter_bytes(iter(lines)):
+            if sse.data.startswith("[DONE]"):
+                break
+            chunk = construct_type(type_=ChatCompletionChunk, value=sse.json())
+            if chunk.choices and chunk.choices[0].delta.content:
+                texts.append(chunk.choices[0].delta.content)
+        return texts
+
+    return read
+
+
+def _cpu_per_1k(read: Callable[[], object], tokens: int, repeat: int) -> float:
+    """CPU milliseconds per 1,000 tokens, best of ``repeat`` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.process_time()
+        read()
+        best = min(best, time.process_time() - started)
+    return best * 1000 / (tokens / 1000)
+
+
+def run(tokens: int = 20000, repeat: int = 5) -> Dict[str, Optional[float]]:
+    """CPU ms per 1k tokens for each reader; None where the SDK is missing."""
+    openai_lines = openai_stream(tokens)
+    gemini_lines = gemini_stream(tokens)
+    results: Dict[str, Optional[float]] = {
+        "openai_sse": _cpu_per_1k(lambda: list(iter_deltas(openai_lines, openai_delta)), tokens, repeat),
+        "gemini_sse": _cpu_per_1k(lambda: list(iter_deltas(gemini_lines, gemini_delta)), tokens, repeat),
+        "openai_sdk": None,
+    }
+    sdk_read = _sdk_openai_reader()
+    if sdk_read is not None:
+        results["openai_sdk"] = _cpu_per_1k(lambda: sdk_read(openai_lines), tokens, repeat)
+    return results
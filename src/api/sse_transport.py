@@ -0,0 +1,229 @@
+"""Lightweight SSE streaming over aiohttp.
+
+The SDKs turn every streamed chunk into a pydantic object before the
+client reads ``delta.content`` out of it. This transport speaks the
+OpenAI chat-completions and Gemini ``streamGenerateContent`` event
+streams directly: each ``data:`` line is decoded with ``json.loads`` and
+only the text delta and, at the end, the token usage are read from it.
+
+It is an optional fast path for the async backends; the SDKs remain the
+default. Errors are raised with ``status_code`` and ``response`` like the
+SDK errors, so the provider policies retry and throttle them the same way.
+"""
+
+import json
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .http_pool import DEFAULT_KEEPALIVE_EXPIRY, DEFAULT_TIMEOUT, HttpPool
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    aiohttp = None
+
+OPENAI_BASE_URL = "https://api.openai.com/v1"
+GEMINI_BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
+
+
+@dataclass
+class StreamUsage:
+    """Token counts reported at the end of a stream."""
+
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+
+class SSEStatusError(Exception):
+    """Non-200 reply; shaped like the SDK errors for ``classify_error``."""
+
+    def __init__(self, status_code: int, message: str, response=None):
+        super().__init__(f"HTTP {status_code}: {message}")
+        self.status_code = status_code
+        self.response = response
+
+
+class SSEDecoder:
+    """Collects the ``data:`` lines of one server-sent event at a time."""
+
+    __slots__ = ("_data",)
+
+    def __init__(self):
+        self._data: List[bytes] = []
+
+    def feed(self, line: bytes) -> Optional[bytes]:
+        """Take one line; return the event's data when a blank line ends it."""
+        line = line.rstrip(b"\r\n")
+        if not line:
+            if not self._data:
+                return None
+            data = self._data[0] if len(self._data) == 1 else b"\n".join(self._data)
+            self._data = []
+            return data
+        if line.startswith(b"data:"):
+            value = line[5:]
+            self._data.append(value[1:] if value.startswith(b" ") else value)
+        # Comments, ids and event names carry nothing the app uses
+        return None
+
+    def flush(self) -> Optional[bytes]:
+        """Data of a final event the server did not terminate."""
+        return self.feed(b"")
+
+
+def openai_delta(data: bytes) -> Tuple[str, Optional[StreamUsage]]:
+    """Text and usage of one chat-completions chunk."""
+    chunk = json.loads(data)
+    text = ""
+    choices = chunk.get("choices")
+    if choices:
+        text = (choices[0].get("delta") or {}).get("content") or ""
+    usage = chunk.get("usage")
+    if usage:
+        return text, StreamUsage(usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0))
+    return text, None
+
+
+def gemini_delta(data: bytes) -> Tuple[str, Optional[StreamUsage]]:
+    """Text and usage of one ``streamGenerateContent`` event."""
+    chunk = json.loads(data)
+    text = ""
+    candidates = chunk.get("candidates")
+    if candidates:
+        parts = (candidates[0].get("content") or {}).get("parts") or ()
+        text = "".join(part.get("text", "") for part in parts)
+    usage = chunk.get("usageMetadata")
+    if usage:
+        return text, StreamUsage(usage.get("promptTokenCount", 0), usage.get("candidatesTokenCount", 0))
+    return text, None
+
+
+def iter_deltas(lines: Iterable[bytes], parse: Callable) -> Iterator[Tuple[str, Optional[StreamUsage]]]:
+    """Deltas of an SSE byte-line stream; used by the benchmark and tests."""
+    decoder = SSEDecoder()
+    for line in lines:
+        data = decoder.feed(line)
+        if data is None:
+            continue
+        if data == b"[DONE]":
+            return
+        yield parse(data)
+    data = decoder.flush()
+    if data is not None and data != b"[DONE]":
+        yield parse(data)
+
+
+def to_gemini_request(messages: List[Dict[str, str]], max_tokens: int, temperature: float) -> Dict:
+    """REST body for ``streamGenerateContent``; system messages become the instruction."""
+    system = [m["content"] for m in messages if m["role"] == "system"]
+    body = {
+        "contents": [
+            {"role": "user" if m["role"] == "user" else "model", "parts": [{"text": m["content"]}]}
+            for m in messages if m["role"] != "system"
+        ],
+        "generationConfig": {"maxOutputTokens": max_tokens, "temperature": temperature},
+    }
+    if system:
+        body["systemInstruction"] = {"parts": [{"text": "\n\n".join(system)}]}
+    return body
+
+
+class SSETransport:
+    """One aiohttp session streaming chat replies for a backend.
+
+    Like the async httpx clients, the session is bound to the shared loop:
+    it is created there on first use and closed with ``aclose``.
+    """
+
+    def __init__(self, http_pool: HttpPool):
+        self.http_pool = http_pool
+        self._session = None
+        self._counters = {"streams": 0, "chunks": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=self.http_pool.pool_maxsize,
+                    keepalive_timeout=DEFAULT_KEEPALIVE_EXPIRY,
+                ),
+                timeout=aiohttp.ClientTimeout(total=None, sock_connect=10.0, sock_read=DEFAULT_TIMEOUT),
+            )
+        return self._session
+
+    async def stream_openai(
+        self,
+        payload: Dict,
+        api_key: str,
+        base_url: str = OPENAI_BASE_URL,
+        on_headers: Optional[Callable] = None,
+        on_usage: Optional[Callable[[StreamUsage], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Text deltas of a streamed chat completion."""
+        payload = dict(payload, stream=True, stream_options={"include_usage": True})
+        headers = {"Authorization": f"Bearer {api_key}", "Accept": "text/event-stream"}
+        async for text in self._stream(
+            f"{base_url.rstrip('/')}/chat/completions", payload, headers, openai_delta, on_headers, on_usage
+        ):
+            yield text
+
+    async def stream_gemini(
+        self,
+        payload: Dict,
+        api_key: str,
+        model: str,
+        base_url: str = GEMINI_BASE_URL,
+        on_headers: Optional[Callable] = None,
+        on_usage: Optional[Callable[[StreamUsage], None]] = None,
+    ) -> AsyncIterator[str]:
+        """Text deltas of a Gemini ``streamGenerateContent`` call."""
+        url = f"{base_url.rstrip('/')}/models/{model}:streamGenerateContent?alt=sse"
+        headers = {"x-goog-api-key": api_key, "Accept": "text/event-stream"}
+        async for text in self._stream(url, payload, headers, gemini_delta, on_headers, on_usage):
+            yield text
+
+    async def _stream(self, url, payload, headers, parse, on_headers, on_usage) -> AsyncIterator[str]:
+        self._counters["streams"] += 1
+        usage = None
+        try:
+            async with self._get_session().post(
+                url, json=payload, headers=headers, proxy=self.http_pool.proxy or None
+            ) as response:
+                if on_headers is not None:
+                    on_headers(response.headers)
+                if response.status != 200:
+                    raise SSEStatusError(response.status, (await response.text())[:500], response)
+
+                decoder = SSEDecoder()
+                # aiohttp splits the body on newlines as it arrives
+                async for line in response.content:
+                    data = decoder.feed(line)
+                    if data is None:
+                        continue
+                    if data == b"[DONE]":
+                        break
+                    text, chunk_usage = parse(data)
+                    if chunk_usage is not None:
+                        usage = chunk_usage
+                    if text:
+                        self._counters["chunks"] += 1
+                        yield text
+        except aiohttp.ClientConnectionError as e:
+            # Retried by the provider policy like any dropped connection
+            raise ConnectionError(str(e)) from e
+
+        if usage is not None:
+            self._counters["prompt_tokens"] += usage.prompt_tokens
+            self._counters["completion_tokens"] += usage.completion_tokens
+            if on_usage is not None:
+                on_usage(usage)
+
+    def stats(self) -> Dict:
+        return dict(self._counters)
+
+    async def aclose(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
@@ -3,7 +3,9 @@
 import json
 import os
 from dataclasses import dataclass, field, asdict
-from typing import Optional
+from typing import Dict, List, Optional
+
+from .storage import PersistenceWorker, atomic_write_json
 
 
 CONFIG_FILE = "config.json"
@@ -44,13 +46,34 @@ class AppConfig:
     ai2_name: str = "AI-2"
     ai1_system_prompt: str = "You are the first AI in a conversation. Be creative and engaging."
     ai2_system_prompt: str = "You are the second AI in a conversation. Respond thoughtfully."
+    save_window_ms: int = 500  # write-behind window for history/config saves
+    http_proxy: str = ""  # e.g. "http://127.0.0.1:8080"; empty for a direct connection
+    # History retention; older items move to the archive (0 = unlimited)
+    history_max_items_per_mode: int = 0
+    history_max_age_days: int = 0
+    history_max_total_mb: int = 0
+    # How chat history is fitted into the prompt: "full", "window" or "summary"
+    context_policy: str = "window"
+    context_max_tokens: int = 0  # prompt budget; 0 = the model's context window
+    # Replay identical temperature-0 chat requests from a local cache
+    response_cache_enabled: bool = False
+    response_cache_ttl_hours: int = 168
+    response_cache_max_mb: int = 50
+    # OpenAI-compatible servers: name, base_url, api_key, models (list) and
+    # max_concurrency (0 = default); offered as extra providers on the pages
+    custom_endpoints: List[Dict] = field(default_factory=list)
+    # Stream replies over plain aiohttp SSE instead of the SDKs (less CPU per token)
+    fast_streaming: bool = False
+    # Most streamed-text repaints per second; extra tokens are batched per frame
+    stream_max_fps: int = 60
 
 
 class ConfigManager:
     """Manages application configuration persistence."""
     
-    def __init__(self, config_path: Optional[str] = None):
+    def __init__(self, config_path: Optional[str] = None, persistence: Optional[PersistenceWorker] = None):
         self.config_path = config_path or CONFIG_FILE
+        self.persistence = persistence
         self.config = self.load()
     
     def load(self) -> AppConfig:
@@ -65,9 +88,16 @@ class ConfigManager:
         return AppConfig()
     
     def save(self) -> None:
-        """Save configuration to file."""
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(asdict(self.config), f, indent=2)
+        """Save configuration to file.
+        
+        The snapshot is taken now; with a persistence worker the write itself
+        happens in the background.
+        """
+        data = asdict(self.config)
+        if self.persistence:
+            self.persistence.mark_dirty("config", lambda: atomic_write_json(self.config_path, data))
+        else:
+            atomic_write_json(self.config_path, data)
     
     def update(self, **kwargs) -> None:
         """Update configuration values."""
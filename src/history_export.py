@@ -0,0 +1,224 @@
+"""Bulk export of history to JSONL, Markdown and HTML."""
+
+import html
+import json
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+EXPORT_FORMATS = ("jsonl", "md", "html")
+FORMAT_EXTENSIONS = {"jsonl": ".jsonl", "md": ".md", "html": ".html"}
+
+# Rendered items kept in flight per pool worker while streaming HTML
+RENDER_WINDOW_PER_WORKER = 8
+
+HTML_HEAD = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>RoleAI History</title>
+<style>
+body { font-family: 'Segoe UI', sans-serif; max-width: 900px; margin: 2em auto; color: #222; }
+article { border-bottom: 1px solid #ddd; padding-bottom: 1.5em; margin-bottom: 1.5em; }
+pre { background: #f4f4f4; padding: 0.8em; overflow-x: auto; }
+img { max-width: 100%; }
+</style>
+</head>
+<body>
+"""
+HTML_TAIL = "</body>\n</html>\n"
+
+Message = Tuple[str, str]  # (speaker, content)
+Section = Tuple[Optional[str], List[Message]]  # (title, messages)
+
+
+class ExportCancelled(Exception):
+    """Raised by ``HistoryExporter.export`` when ``cancelled()`` stopped it."""
+
+
+def describe_item(mode: str, data: Dict) -> Tuple[List[Tuple[str, str]], List[Section], List[str]]:
+    """Normalize a payload of any mode for rendering.
+
+    Returns ``(fields, sections, media)``: labelled header fields, titled
+    message lists of ``(speaker, content)`` pairs and media URLs.
+    """
+    fields: List[Tuple[str, str]] = []
+    for key, label in (
+        ("topic", "Topic"),
+        ("ai1_system_prompt", "AI 1 system prompt"),
+        ("ai2_system_prompt", "AI 2 system prompt"),
+        ("prompt", "Prompt"),
+        ("provider", "Provider"),
+        ("model", "Model"),
+    ):
+        value = data.get(key)
+        if isinstance(value, str) and value:
+            fields.append((label, value))
+
+    sections: List[Section] = []
+    if "messages" in data:
+        sections.append((None, [_speaker(msg) for msg in data.get("messages", [])]))
+    for index in (1, 2):
+        if f"messages{index}" in data:
+            model = data.get(f"model{index}") or {}
+            title = " / ".join(part for part in (model.get("provider"), model.get("model")) if part)
+            sections.append((title or f"Model {index}", [_speaker(msg) for msg in data[f"messages{index}"]]))
+
+    media: List[str] = [img["url"] for img in data.get("images", []) if isinstance(img, dict) and img.get("url")]
+    for key in ("url", "video_url"):
+        if isinstance(data.get(key), str) and data[key]:
+            media.append(data[key])
+    return fields, sections, media
+
+
+def _speaker(msg: Dict) -> Message:
+    # Chat and compare messages carry a role, AI-to-AI messages a sender name
+    if "sender" in msg:
+        speaker = msg["sender"] or "AI"
+    else:
+        speaker = msg.get("role", "unknown").capitalize()
+    return speaker, msg.get("content", "")
+
+
+def _format_date(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+
+
+def format_text(mode: str, item: Dict) -> str:
+    """Render one item as plain text (the sidebar's "Export to TXT")."""
+    fields, sections, media = describe_item(mode, item["data"])
+    lines = [f"# {item['name']}", f"Mode: {mode}", f"Date: {_format_date(item['timestamp'])}"]
+    lines += [f"{label}: {value}" for label, value in fields]
+    lines += ["=" * 80, ""]
+    for title, messages in sections:
+        if title:
+            lines += [f"## {title}", ""]
+        for speaker, content in messages:
+            lines += [f"[{speaker.upper()}]", content, "", "-" * 80, ""]
+    lines += [f"Media: {url}" for url in media]
+    return "\n".join(lines) + "\n"
+
+
+def format_markdown(mode: str, item: Dict) -> str:
+    """Render one item as a Markdown section."""
+    fields, sections, media = describe_item(mode, item["data"])
+    lines = [f"## {item['name']}", "", f"*{mode} · {_format_date(item['timestamp'])}*", ""]
+    for label, value in fields:
+        lines += [f"**{label}:** {value}", ""]
+    for title, messages in sections:
+        if title:
+            lines += [f"### {title}", ""]
+        for speaker, content in messages:
+            lines += [f"**{speaker}:**", "", content, ""]
+    for url in media:
+        # Data URLs would bloat the export; link everything else inline
+        lines += [f"![media]({url})" if not url.startswith("data:") else "*(embedded image omitted)*", ""]
+    return "\n".join(lines) + "\n"
+
+
+def format_jsonl(mode: str, item: Dict) -> str:
+    """Render one item as a JSON line."""
+    record = {"mode": mode, "id": item["id"], "name": item["name"], "timestamp": item["timestamp"], "data": item["data"]}
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def render_markdown_html(text: str) -> str:
+    """Markdown to HTML; module-level so pool workers can unpickle it."""
+    import markdown
+    return markdown.markdown(text, extensions=["fenced_code", "nl2br"])
+
+
+def _render_html_item(args: Tuple[str, str]) -> str:
+    item_id, body = args
+    return f'<article id="{html.escape(item_id)}">\n{render_markdown_html(body)}\n</article>\n'
+
+
+def _bounded_map(executor: ProcessPoolExecutor, fn: Callable, iterable: Iterable, window: int) -> Iterator:
+    """Like ``executor.map`` but only ``window`` tasks are queued at once."""
+    pending: deque = deque()
+    for args in iterable:
+        pending.append(executor.submit(fn, args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+class HistoryExporter:
+    """Streams history items from a HistoryManager into one export file.
+
+    ``progress(done, total)`` is called after each item; ``cancelled()``
+    is polled between items and stops the export early, leaving any
+    existing file at the target path untouched.
+    """
+
+    def __init__(self, history_manager, workers: Optional[int] = None):
+        self.history_manager = history_manager
+        self.workers = workers or max(1, min(4, os.cpu_count() or 1))
+
+    def export(
+        self,
+        path: str,
+        fmt: str,
+        modes: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        progress: Optional[Callable[[int, int], None]] = None,
+        cancelled: Optional[Callable[[], bool]] = None,
+    ) -> int:
+        """Write the export and return the number of items written.
+
+        Raises ExportCancelled when ``cancelled()`` returned True.
+        """
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        total = self.history_manager.count_range(modes, since, until)
+        items = self.history_manager.iter_items(modes, since, until)
+        done = 0
+
+        tmp_path = path + ".part"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                if fmt == "html":
+                    f.write(HTML_HEAD)
+                    # Spawned (not forked) workers: the GUI process runs Qt threads
+                    context = multiprocessing.get_context("spawn")
+                    with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as executor:
+                        sources = (
+                            (item["id"], format_markdown(item["mode"], item))
+                            for item in items
+                        )
+                        for chunk in _bounded_map(executor, _render_html_item, sources,
+                                                  self.workers * RENDER_WINDOW_PER_WORKER):
+                            f.write(chunk)
+                            done += 1
+                            if progress:
+                                progress(done, total)
+                            if cancelled and cancelled():
+                                raise ExportCancelled(f"Export cancelled after {done} of {total} items")
+                    f.write(HTML_TAIL)
+                else:
+                    formatter = format_jsonl if fmt == "jsonl" else format_markdown
+                    if fmt == "md":
+                        f.write("# RoleAI History\n\n")
+                    for item in items:
+                        f.write(formatter(item["mode"], item))
+                        done += 1
+                        if progress:
+                            progress(done, total)
+                        if cancelled and cancelled():
+                            raise ExportCancelled(f"Export cancelled after {done} of {total} items")
+            os.replace(tmp_path, path)
+        except BaseException:
+            # Failed or cancelled: drop the partial file, never rename it
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+        return done
@@ -1,101 +1,762 @@
 """History management for RoleAI."""
 
+import copy
 import json
 import os
+import sqlite3
+import threading
 import uuid
 import time
-from typing import List, Dict, Any
+from contextlib import ExitStack
+from dataclasses import dataclass
+from itertools import chain
+from typing import List, Dict, Any, Iterator, Optional
+
+from .storage import (
+    SQLiteHistoryStore, migrate_json_history, MessageJournal, fold_records, PersistenceWorker,
+    render_highlight
+)
+from .history_export import format_text
 
 HISTORY_FILE = "history.json"
+HISTORY_DB = "history.db"
+HISTORY_PAGE_SIZE = 100
+JOURNAL_COMPACT_INTERVAL = 30.0  # seconds between background compactions
+JOURNAL_COMPACT_THRESHOLD = 200  # records that trigger an early compaction
+PARTIAL_CHECKPOINT_INTERVAL = 1.0  # seconds between streaming checkpoints
+IDLE_MAINTENANCE_DELAY = 120.0  # seconds without changes before retention/vacuum run
+ARCHIVE_BATCH_SIZE = 100  # items moved to the archive per transaction
+
+# Change notifications passed to listeners as (event, mode, fields)
+ITEM_ADDED = "added"
+ITEM_UPDATED = "updated"
+ITEM_RENAMED = "renamed"
+ITEM_DELETED = "deleted"
+ITEM_ARCHIVED = "archived"
+
+
+@dataclass
+class RetentionPolicy:
+    """Limits past which items move to the cold archive (0 = unlimited)."""
+    
+    max_items_per_mode: int = 0
+    max_age_days: int = 0
+    max_total_mb: int = 0
+    
+    @property
+    def enabled(self) -> bool:
+        return bool(self.max_items_per_mode or self.max_age_days or self.max_total_mb)
+
 
 class HistoryManager:
-    """Manages application history."""
+    """Manages application history.
+    
+    With a ``persistence`` worker, changes are kept in an in-memory overlay
+    and committed in batches on the worker thread; without one they are
+    written through immediately.
+    
+    Items past the retention policy move to a separate archive database
+    that is only opened for search, export or when an archived item is
+    used again (which moves it back).
+    """
     
-    def __init__(self, history_path: str = None):
-        self.history_path = history_path or HISTORY_FILE
-        self.history = self.load()
+    def __init__(self, history_path: str = None, persistence: Optional[PersistenceWorker] = None):
+        self.history_path = history_path or HISTORY_DB
+        self.persistence = persistence
+        legacy_path = HISTORY_FILE
+        if self.history_path.endswith(".json"):
+            # Old-style path: keep the database next to it
+            legacy_path = self.history_path
+            self.history_path = os.path.splitext(self.history_path)[0] + ".db"
+        
+        self.store = SQLiteHistoryStore(self.history_path)
+        migrate_json_history(legacy_path, self.store)
+        
+        # Item changes not committed to the store yet, keyed by (mode, item_id).
+        # _inflight holds the batch the worker is committing right now.
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._dirty = {}
+        self._inflight = {}
+        # Restored archive items whose archive copy goes with the next flush
+        self._archive_deletes = set()
+        
+        # Messages appended through the journal but not yet compacted into
+        # the store, keyed by (mode, item_id)
+        self.journal = MessageJournal(os.path.splitext(self.history_path)[0] + ".journal.jsonl")
+        self._pending = {}
+        self._partials = {}
+        self._generations = {}
+        self._recover_journal()
         
-    def load(self) -> Dict[str, List[Dict]]:
-        """Load history from file."""
-        if os.path.exists(self.history_path):
+        # Cold archive, opened on first use
+        self.archive_path = os.path.splitext(self.history_path)[0] + ".archive.db"
+        self._archive = None
+        self.retention = RetentionPolicy()
+        self._last_activity = time.monotonic()
+        self._maintenance_due = True
+        
+        self._compact_requested = threading.Event()
+        self._compactor_stop = threading.Event()
+        self._compactor = threading.Thread(
+            target=self._compaction_loop, name="HistoryCompactor", daemon=True
+        )
+        self._compactor.start()
+        
+        self._listeners = []
+        
+    def add_listener(self, callback) -> None:
+        """Register ``callback(event, mode, fields)`` for item changes.
+        
+        ``fields`` always holds the item ``id`` plus whatever changed
+        (``name`` and/or ``timestamp``). Callbacks run on the thread that
+        made the change.
+        """
+        self._listeners.append(callback)
+        
+    def remove_listener(self, callback) -> None:
+        """Unregister a change callback."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+        
+    def _notify(self, event: str, mode: str, fields: Dict) -> None:
+        for callback in list(self._listeners):
             try:
-                with open(self.history_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, OSError):
-                pass
-        
-        # Default structure
-        return {
-            "chat": [],
-            "ai_to_ai": [],
-            "compare_ai": [],
-            "image": [],
-            "video": []
-        }
+                callback(event, mode, fields)
+            except Exception as e:
+                print(f"Error in history listener: {e}")
         
     def save(self) -> None:
-        """Save history to file."""
+        """Save history to file.
+        
+        Schedules a write-behind flush, or writes immediately when no
+        persistence worker is attached.
+        """
+        self._last_activity = time.monotonic()
+        self._maintenance_due = True
+        if self.persistence:
+            self.persistence.mark_dirty("history", self.flush_pending_writes)
+        else:
+            self.flush_pending_writes()
+        
+    def flush_pending_writes(self) -> None:
+        """Commit the overlay and the journal buffer to disk."""
+        with self._flush_lock:
+            self._flush_dirty_locked()
+            self.journal.flush()
+        
+    def close(self) -> None:
+        """Flush pending writes, compact the journal and close the store."""
+        self._compactor_stop.set()
+        self._compact_requested.set()
+        self._compactor.join()
         try:
-            with open(self.history_path, 'w', encoding='utf-8') as f:
-                json.dump(self.history, f, indent=2)
-        except OSError as e:
+            self.flush_pending_writes()
+            self.compact_journal()
+            if self.store.blobs_dirty:
+                self.store.collect_garbage()
+        except (OSError, sqlite3.Error) as e:
             print(f"Error saving history: {e}")
+        self.journal.close()
+        self.store.close()
+        if self._archive is not None:
+            self._archive.close()
             
     def add_item(self, mode: str, name: str, data: Any) -> Dict:
         """Add a new history item."""
-        if mode not in self.history:
-            self.history[mode] = []
-            
         item = {
             "id": str(uuid.uuid4()),
             "name": name,
             "timestamp": time.time(),
             "data": data
         }
-        self.history[mode].insert(0, item)
+        with self._lock:
+            self._dirty[(mode, item["id"])] = {"item": copy.deepcopy(item), "patch": {}, "deleted": False}
         self.save()
+        self._notify(ITEM_ADDED, mode, {"id": item["id"], "name": name, "timestamp": item["timestamp"]})
         return item
         
     def get_items(self, mode: str) -> List[Dict]:
         """Get all items for a mode."""
-        return self.history.get(mode, [])
+        with self._lock:
+            items = {item["id"]: item for item in self.store.get_items(mode)}
+            for item_id in self._overlay_keys(mode):
+                items.setdefault(item_id, None)
+            result = []
+            for item_id, item in items.items():
+                item = self._with_pending(mode, self._with_overlay(mode, item_id, item))
+                if item:
+                    result.append(item)
+        result.sort(key=lambda item: item["timestamp"], reverse=True)
+        return result
+        
+    def list_items(self, mode: str, offset: int = 0, limit: int = HISTORY_PAGE_SIZE) -> List[Dict]:
+        """List one page of items for a mode as ``{id, name, timestamp}``.
+        
+        Message bodies are never loaded; use ``get_item`` for the full item.
+        """
+        with self._lock:
+            overlay = self._overlay_keys(mode)
+            pending = []
+            for item_id in overlay:
+                row = self._meta_with_overlay(mode, item_id, self.store.get_item_meta(mode, item_id))
+                if row:
+                    pending.append(row)
+            # Each pending row shifts the stored ones by one place at most,
+            # so the page lies within this window of the other stored rows
+            base = max(0, offset - len(pending))
+            stored = self.store.list_items(mode, base, offset + limit - base, exclude=overlay)
+        
+        pending.sort(key=lambda row: (-row["timestamp"], row["id"]))
+        if not stored:
+            # Past the stored rows, the page can only hold pending ones
+            return pending[offset:offset + limit] if base == 0 else []
+        # Only the pending rows falling inside the window are merged; on
+        # equal timestamps they go after the stored rows
+        newest, oldest = stored[0]["timestamp"], stored[-1]["timestamp"]
+        before = [row for row in pending if row["timestamp"] > newest]
+        exhausted = len(stored) < offset + limit - base
+        inside = [
+            row for row in pending[len(before):]
+            if exhausted or row["timestamp"] > oldest
+        ]
+        # sorted() is stable: stored rows keep their order among equal timestamps
+        window = sorted(stored + inside, key=lambda row: -row["timestamp"])
+        if base == 0:
+            # No stored row comes before the window, so it starts at row 0
+            window = before + window
+            start = offset
+        else:
+            start = offset - base - len(before)
+        return window[start:start + limit]
+    
+    def search(self, query: str, mode: str = None, limit: int = 50) -> List[Dict]:
+        """Full-text search over titles, messages and prompts.
+        
+        Returns ranked ``{id, mode, name, timestamp, name_html, snippet_html}``
+        hits; the HTML has the matched words in ``<b>`` tags. Changes still
+        waiting for the write-behind flush show up once they are committed.
+        """
+        with self._lock:
+            hits = [
+                hit for hit in self.store.search(query, mode, limit)
+                if self._exists(hit["mode"], hit["id"])
+            ]
+        for hit in hits:
+            hit["name_html"] = render_highlight(hit.pop("name_highlight"))
+            hit["snippet_html"] = render_highlight(hit.pop("snippet"))
+        
+        # Archived items rank below live ones
+        archive = self._archive_store()
+        if archive is not None and len(hits) < limit:
+            for hit in archive.search(query, mode, limit - len(hits)):
+                hit["name_html"] = render_highlight(hit.pop("name_highlight"))
+                hit["snippet_html"] = render_highlight(hit.pop("snippet"))
+                # A restored item keeps its archive copy until the next flush
+                if (hit["mode"], hit["id"]) not in self._archive_deletes:
+                    hit["name_html"] += " <i>(archived)</i>"
+                    hit["archived"] = True
+                hits.append(hit)
+        return hits
+    
+    def count_items(self, mode: str) -> int:
+        """Count the items of a mode."""
+        with self._lock:
+            count = self.store.count(mode)
+            for item_id in self._overlay_keys(mode):
+                stored = self.store.has_item(mode, item_id)
+                exists = self._exists(mode, item_id)
+                count += int(exists) - int(stored)
+        return count
         
     def get_item(self, mode: str, item_id: str) -> Dict:
         """Get a specific item."""
-        for item in self.history.get(mode, []):
-            if item['id'] == item_id:
-                return item
-        return None
+        with self._lock:
+            key = (mode, item_id)
+            overlay = self._dirty.get(key) or self._inflight.get(key)
+            item = None
+            restored = False
+            if not overlay or not overlay["item"] and not overlay["deleted"]:
+                item = self.store.get_item(mode, item_id)
+                restored = item is None and not overlay and self._restore_archived(mode, item_id)
+            item = self._with_pending(mode, self._with_overlay(mode, item_id, item))
+        if restored:
+            self.save()
+        return item
+        
+    def iter_items(
+        self,
+        modes: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> Iterator[Dict]:
+        """Stream full items (with ``mode``) for bulk export.
+        
+        Pending writes and journaled messages are committed first so the
+        stream sees everything, then rows are read from the store in batches.
+        """
+        self.flush_pending_writes()
+        self.compact_journal()
+        archive = self._archive_store()
+        if archive is None:
+            return self.store.iter_items(modes, since, until)
+        return chain(self.store.iter_items(modes, since, until), archive.iter_items(modes, since, until))
+        
+    def count_range(
+        self,
+        modes: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> int:
+        """Count the items ``iter_items`` would yield."""
+        self.flush_pending_writes()
+        archive = self._archive_store()
+        archived = archive.count_range(modes, since, until) if archive is not None else 0
+        return self.store.count_range(modes, since, until) + archived
         
     def rename_item(self, mode: str, item_id: str, new_name: str) -> bool:
         """Rename an item."""
-        for item in self.history.get(mode, []):
-            if item['id'] == item_id:
-                item['name'] = new_name
-                self.save()
-                return True
-        return False
+        with self._lock:
+            if not self._exists(mode, item_id) and not self._restore_archived(mode, item_id):
+                return False
+            self._patch(mode, item_id, {"name": new_name})
+        self.save()
+        self._notify(ITEM_RENAMED, mode, {"id": item_id, "name": new_name})
+        return True
         
     def delete_item(self, mode: str, item_id: str) -> bool:
         """Delete an item."""
-        items = self.history.get(mode, [])
-        for i, item in enumerate(items):
-            if item['id'] == item_id:
-                items.pop(i)
-                self.save()
-                return True
-        return False
+        with self._lock:
+            if not self._exists(mode, item_id) and not self._restore_archived(mode, item_id):
+                return False
+            self._discard_pending(mode, item_id)
+            self._dirty[(mode, item_id)] = {"item": None, "patch": {}, "deleted": True}
+        self.save()
+        self._notify(ITEM_DELETED, mode, {"id": item_id})
+        return True
         
     def update_item_data(self, mode: str, item_id: str, data: Any) -> bool:
         """Update data for an item."""
-        for item in self.history.get(mode, []):
-            if item['id'] == item_id:
-                item['data'] = data
-                item['timestamp'] = time.time()
-                self.save()
-                return True
-        return False
+        with self._lock:
+            if not self._exists(mode, item_id) and not self._restore_archived(mode, item_id):
+                return False
+            self._discard_pending(mode, item_id)
+            timestamp = time.time()
+            self._patch(mode, item_id, {"data": copy.deepcopy(data), "timestamp": timestamp})
+        self.save()
+        self._notify(ITEM_UPDATED, mode, {"id": item_id, "timestamp": timestamp})
+        return True
+    
+    def append_message(self, mode: str, item_id: str, message: Dict) -> bool:
+        """Append one message to an item's ``messages`` list.
+        
+        The message goes to the journal only, so the cost does not depend on
+        how long the conversation already is.
+        """
+        key = (mode, item_id)
+        timestamp = time.time()
+        with self._lock:
+            if not self._exists(mode, item_id) and not self._restore_archived(mode, item_id):
+                return False
+            self.journal.append({"op": "append", "mode": mode, "id": item_id, "message": message, "ts": timestamp})
+            self._pending.setdefault(key, []).append(copy.deepcopy(message))
+            self._partials.pop(key, None)
+            # Keep the listing order right before the journal is compacted
+            self._patch(mode, item_id, {"timestamp": timestamp})
+        self.save()
+        if self.journal.record_count >= JOURNAL_COMPACT_THRESHOLD:
+            self._compact_requested.set()
+        self._notify(ITEM_UPDATED, mode, {"id": item_id, "timestamp": timestamp})
+        return True
+    
+    def partial_checkpoint_due(self, mode: str, item_id: str) -> bool:
+        """Whether ``checkpoint_partial`` would write now.
+        
+        Lets a streaming page skip joining the partial text in between.
+        """
+        with self._lock:
+            state = self._partials.get((mode, item_id))
+        return not state or time.time() - state["time"] >= PARTIAL_CHECKPOINT_INTERVAL
+    
+    def checkpoint_partial(self, mode: str, item_id: str, message: Dict) -> None:
+        """Checkpoint a message that is still being streamed.
+        
+        Only the text added since the previous checkpoint is written. If the
+        app dies before ``append_message`` is called for the final message,
+        the partial text is restored as a regular message on next start.
+        """
+        key = (mode, item_id)
+        content = message.get("content", "")
+        now = time.time()
+        with self._lock:
+            state = self._partials.get(key)
+            if state and now - state["time"] < PARTIAL_CHECKPOINT_INTERVAL:
+                return
+            
+            template = {k: v for k, v in message.items() if k != "content"}
+            record = {"op": "partial", "mode": mode, "id": item_id, "message": template, "ts": now}
+            if state and content.startswith(state["content"]):
+                record["delta"] = content[len(state["content"]):]
+            else:
+                record["delta"] = content
+                record["reset"] = True
+            if not record["delta"] and state:
+                return
+            
+            self.journal.append(record)
+            self._partials[key] = {"message": template, "content": content, "time": now}
+        self.save()
     
+    def discard_partial(self, mode: str, item_id: str) -> None:
+        """Forget the checkpointed text of a stream that will not complete.
+        
+        Messages already appended to the item are kept.
+        """
+        key = (mode, item_id)
+        with self._lock:
+            if key not in self._partials:
+                return
+            self.journal.append({"op": "abort", "mode": mode, "id": item_id})
+            del self._partials[key]
+        self.save()
+    
+    def compact_journal(self) -> None:
+        """Fold the journal into the store (runs on the compactor thread)."""
+        with self._flush_lock:
+            self._flush_dirty_locked()
+            
+            with self._lock:
+                if not self.journal.rotate():
+                    return
+                generations = dict(self._generations)
+                # Streams still in progress carry over to the fresh log
+                for (mode, item_id), state in self._partials.items():
+                    self.journal.append({
+                        "op": "partial", "mode": mode, "id": item_id,
+                        "message": state["message"], "delta": state["content"], "reset": True,
+                        "ts": state["time"],
+                    })
+            
+            records = self.journal.read_rotated()
+            appends, timestamps = fold_records(records)
+            batch = MessageJournal.batch_id(records)
+            now = time.time()
+            
+            with self._lock:
+                applied = {
+                    key: messages for key, messages in appends.items()
+                    if self._generations.get(key, 0) == generations.get(key, 0)
+                }
+            
+            missing = set()
+            with ExitStack() as held:
+                # The writes run without the lock so readers are not held up;
+                # only the commit takes it, so the messages never show up both
+                # in the store and in _pending
+                with self.store.transaction():
+                    for (mode, item_id), messages in applied.items():
+                        if not self.store.append_messages(mode, item_id, messages, timestamps.get((mode, item_id), now)):
+                            missing.add((mode, item_id))
+                    self.store.set_meta("journal_applied", json.dumps([batch]))
+                    held.enter_context(self._lock)
+                
+                for key, messages in applied.items():
+                    if self._generations.get(key, 0) != generations.get(key, 0):
+                        # Rewritten meanwhile; the rewrite supersedes these messages
+                        continue
+                    entry = self._dirty.get(key) if key in missing else None
+                    if entry and entry["item"] is not None:
+                        # Created after the flush above: extend the overlay copy
+                        entry["item"]["data"].setdefault("messages", []).extend(messages)
+                    pending = self._pending.get(key)
+                    if pending:
+                        del pending[:len(messages)]
+                        if not pending:
+                            del self._pending[key]
+            
+            self.journal.discard_rotated()
+    
+    def _compaction_loop(self) -> None:
+        while not self._compactor_stop.is_set():
+            self._compact_requested.wait(JOURNAL_COMPACT_INTERVAL)
+            self._compact_requested.clear()
+            if self._compactor_stop.is_set():
+                break
+            try:
+                self.compact_journal()
+                if self._maintenance_due and time.monotonic() - self._last_activity >= IDLE_MAINTENANCE_DELAY:
+                    self.run_maintenance()
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error compacting history journal: {e}")
+    
+    def set_retention(self, policy: RetentionPolicy) -> None:
+        """Change the retention limits; they apply at the next idle maintenance."""
+        self.retention = policy
+        self._maintenance_due = True
+    
+    def run_maintenance(self) -> int:
+        """Apply retention, drop unreferenced blobs and reclaim disk space.
+        
+        Runs on the compactor thread once no change has been made for
+        IDLE_MAINTENANCE_DELAY seconds. Returns the number of archived items.
+        """
+        self._maintenance_due = False
+        self.compact_journal()
+        archived = self.apply_retention()
+        if self.store.blobs_dirty:
+            self.store.collect_garbage()
+        self.store.compact_fts()
+        self.store.vacuum()
+        self.store.checkpoint()
+        return archived
+    
+    def apply_retention(self) -> int:
+        """Move items past the retention limits to the archive, oldest first."""
+        policy = self.retention
+        if not policy.enabled:
+            return 0
+        
+        keys = set()
+        if policy.max_age_days:
+            keys.update(self.store.ids_older_than(time.time() - policy.max_age_days * 86400))
+        if policy.max_items_per_mode:
+            for mode in self.store.modes():
+                keys.update((mode, item_id) for item_id in self.store.ids_beyond_count(mode, policy.max_items_per_mode))
+        if policy.max_total_mb:
+            sizes = list(self.store.iter_item_sizes())
+            total = sum(size for mode, item_id, size in sizes if (mode, item_id) not in keys)
+            limit = policy.max_total_mb * 1024 * 1024
+            for mode, item_id, size in sizes:
+                if total <= limit:
+                    break
+                if (mode, item_id) not in keys:
+                    keys.add((mode, item_id))
+                    total -= size
+        
+        return self._archive_items(sorted(keys))
+    
+    def _archive_items(self, keys: List) -> int:
+        moved = 0
+        archive = self._archive_store(create=True)
+        with self._flush_lock:
+            for start in range(0, len(keys), ARCHIVE_BATCH_SIZE):
+                with self._lock:
+                    # Items with uncommitted changes are in use; leave them
+                    batch = [key for key in keys[start:start + ARCHIVE_BATCH_SIZE] if not self._is_active(key)]
+                    items = [(mode, self.store.get_item(mode, item_id)) for mode, item_id in batch]
+                    items = [(mode, item) for mode, item in items if item is not None]
+                
+                # Committed to the archive first: a crash leaves a copy in both
+                with archive.transaction():
+                    for mode, item in items:
+                        archive.insert_item(mode, item)
+                with ExitStack() as held:
+                    with self.store.transaction():
+                        for mode, item in items:
+                            self.store.delete_item(mode, item["id"])
+                        # Commit under the lock, keeping the items that were
+                        # used while they were being deleted
+                        held.enter_context(self._lock)
+                        busy = [(mode, item) for mode, item in items if self._is_active((mode, item["id"]))]
+                        for mode, item in busy:
+                            self.store.insert_item(mode, item)
+                if busy:
+                    with archive.transaction():
+                        for mode, item in busy:
+                            archive.delete_item(mode, item["id"])
+                    busy_keys = {(mode, item["id"]) for mode, item in busy}
+                    items = [(mode, item) for mode, item in items if (mode, item["id"]) not in busy_keys]
+                for mode, item in items:
+                    self._notify(ITEM_ARCHIVED, mode, {"id": item["id"]})
+                moved += len(items)
+        return moved
+    
+    def _is_active(self, key) -> bool:
+        return any(key in layer for layer in (self._dirty, self._inflight, self._pending, self._partials))
+    
+    def _archive_store(self, create: bool = False) -> Optional[SQLiteHistoryStore]:
+        with self._lock:
+            if self._archive is None and (create or os.path.exists(self.archive_path)):
+                self._archive = SQLiteHistoryStore(self.archive_path)
+            return self._archive
+    
+    def _restore_archived(self, mode: str, item_id: str) -> bool:
+        """Move an archived item back into the live store (caller holds _lock).
+        
+        The item goes into the overlay; the next flush writes it to the store
+        and then drops the archive copy.
+        """
+        archive = self._archive_store()
+        if archive is None:
+            return False
+        item = archive.get_item(mode, item_id)
+        if item is None:
+            return False
+        self._dirty[(mode, item_id)] = {"item": item, "patch": {}, "deleted": False}
+        self._archive_deletes.add((mode, item_id))
+        self._notify(ITEM_ADDED, mode, {"id": item_id, "name": item["name"], "timestamp": item["timestamp"]})
+        return True
+    
+    def _recover_journal(self) -> None:
+        """Replay whatever the journal holds from a previous run."""
+        applied = json.loads(self.store.get_meta("journal_applied") or "[]")
+        records = []
+        batches = []
+        for chunk in (self.journal.read_rotated(), self.journal.read_live()):
+            batch = MessageJournal.batch_id(chunk)
+            if chunk and batch not in applied:
+                records.extend(chunk)
+                batches.append(batch)
+        
+        if records:
+            appends, timestamps = fold_records(records, finalize_partials=True)
+            now = time.time()
+            with self.store.transaction():
+                for (mode, item_id), messages in appends.items():
+                    self.store.append_messages(mode, item_id, messages, timestamps.get((mode, item_id), now))
+                self.store.set_meta("journal_applied", json.dumps(batches))
+        self.journal.clear()
+    
+    def _flush_dirty_locked(self) -> None:
+        """Commit the overlay in one transaction (caller holds _flush_lock)."""
+        with self._lock:
+            if not self._dirty and not self._archive_deletes:
+                return
+            self._inflight, self._dirty = self._dirty, {}
+            batch = self._inflight
+            archive_deletes, self._archive_deletes = self._archive_deletes, set()
+        
+        try:
+            with self.store.transaction():
+                for (mode, item_id), entry in batch.items():
+                    if entry["deleted"]:
+                        self.store.delete_item(mode, item_id)
+                        continue
+                    if entry["item"] is not None:
+                        self.store.insert_item(mode, entry["item"])
+                    patch = entry["patch"]
+                    if "name" in patch:
+                        self.store.rename_item(mode, item_id, patch["name"])
+                    if "data" in patch:
+                        self.store.update_item_data(mode, item_id, patch["data"], patch["timestamp"])
+                    elif "timestamp" in patch:
+                        self.store.touch_item(mode, item_id, patch["timestamp"])
+        except BaseException:
+            # Keep the batch so the next flush retries it
+            with self._lock:
+                for key, entry in batch.items():
+                    newer = self._dirty.get(key)
+                    self._dirty[key] = entry if newer is None else self._merge_entries(entry, newer)
+                self._inflight = {}
+                self._archive_deletes |= archive_deletes
+            raise
+        
+        with self._lock:
+            self._inflight = {}
+        
+        if archive_deletes:
+            # Only after the store commit: a crash leaves a copy in both
+            try:
+                archive = self._archive_store()
+                with archive.transaction():
+                    for mode, item_id in archive_deletes:
+                        archive.delete_item(mode, item_id)
+            except BaseException:
+                with self._lock:
+                    self._archive_deletes |= archive_deletes
+                raise
+    
+    @staticmethod
+    def _merge_entries(older: Dict, newer: Dict) -> Dict:
+        """Combine two overlay entries for the same item."""
+        if newer["deleted"] or newer["item"] is not None or older["deleted"]:
+            return newer
+        if older["item"] is not None:
+            older["item"].update(newer["patch"])
+        else:
+            older["patch"].update(newer["patch"])
+        return older
+    
+    def _with_overlay(self, mode: str, item_id: str, item: Optional[Dict]) -> Optional[Dict]:
+        """Apply uncommitted changes on top of a stored item."""
+        touched = False
+        for layer in (self._inflight, self._dirty):
+            entry = layer.get((mode, item_id))
+            if not entry:
+                continue
+            touched = True
+            if entry["deleted"]:
+                item = None
+                continue
+            if entry["item"] is not None:
+                item = entry["item"]
+            if item is not None and entry["patch"]:
+                item = dict(item)
+                item.update(entry["patch"])
+        # Never hand out references into the overlay
+        return copy.deepcopy(item) if touched else item
+    
+    def _overlay_keys(self, mode: str) -> List[str]:
+        """Ids of the items of a mode with uncommitted changes."""
+        ids = dict.fromkeys(key[1] for key in list(self._inflight) + list(self._dirty) if key[0] == mode)
+        return list(ids)
+    
+    def _meta_with_overlay(self, mode: str, item_id: str, row: Optional[Dict]) -> Optional[Dict]:
+        """Like ``_with_overlay`` but only for id, name and timestamp."""
+        for layer in (self._inflight, self._dirty):
+            entry = layer.get((mode, item_id))
+            if not entry:
+                continue
+            if entry["deleted"]:
+                row = None
+                continue
+            if entry["item"] is not None:
+                row = entry["item"]
+            if row is not None:
+                row = {
+                    "id": item_id,
+                    "name": entry["patch"].get("name", row["name"]),
+                    "timestamp": entry["patch"].get("timestamp", row["timestamp"]),
+                }
+        return row
+    
+    def _exists(self, mode: str, item_id: str) -> bool:
+        key = (mode, item_id)
+        for layer in (self._dirty, self._inflight):
+            entry = layer.get(key)
+            if entry:
+                return not entry["deleted"]
+        return self.store.has_item(mode, item_id)
+    
+    def _patch(self, mode: str, item_id: str, fields: Dict) -> None:
+        key = (mode, item_id)
+        entry = self._dirty.get(key)
+        if entry is None:
+            entry = {"item": None, "patch": {}, "deleted": False}
+            self._dirty[key] = entry
+        if entry["item"] is not None:
+            entry["item"].update(fields)
+        else:
+            entry["patch"].update(fields)
+    
+    def _with_pending(self, mode: str, item: Dict) -> Dict:
+        """Overlay journaled messages that are not compacted yet."""
+        if not item:
+            return item
+        pending = self._pending.get((mode, item["id"]))
+        if pending and isinstance(item["data"], dict):
+            item["data"]["messages"] = item["data"].get("messages", []) + pending
+        return item
+    
+    def _discard_pending(self, mode: str, item_id: str) -> None:
+        """Forget journaled messages that a full rewrite supersedes."""
+        key = (mode, item_id)
+        if key in self._pending or key in self._partials:
+            self.journal.append({"op": "drop", "mode": mode, "id": item_id})
+            self._pending.pop(key, None)
+            self._partials.pop(key, None)
+            self._generations[key] = self._generations.get(key, 0) + 1
+        
     def export_to_txt(self, mode: str, item_id: str, file_path: str) -> bool:
         """Export history item to a text file."""
         item = self.get_item(mode, item_id)
@@ -104,20 +765,7 @@ class HistoryManager:
         
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(f"# {item['name']}\n")
-                f.write(f"Mode: {mode}\n")
-                f.write(f"Date: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(item['timestamp']))}\n")
-                f.write("=" * 80 + "\n\n")
-                
-                data = item['data']
-                messages = data.get('messages', [])
-                
-                for msg in messages:
-                    role = msg.get('role', 'unknown').upper()
-                    content = msg.get('content', '')
-                    f.write(f"[{role}]\n{content}\n\n")
-                    f.write("-" * 80 + "\n\n")
-            
+                f.write(format_text(mode, item))
             return True
         except Exception as e:
             print(f"Error exporting to text: {e}")
@@ -0,0 +1,19 @@
+"""Storage backends for RoleAI."""
+
+from .sqlite_store import SQLiteHistoryStore, migrate_json_history
+from .journal import MessageJournal, fold_records
+from .persistence import PersistenceWorker, atomic_write_json
+from .search import render_highlight
+from .blobs import pack_payload, unpack_payload
+
+__all__ = [
+    "SQLiteHistoryStore",
+    "migrate_json_history",
+    "MessageJournal",
+    "fold_records",
+    "PersistenceWorker",
+    "atomic_write_json",
+    "render_highlight",
+    "pack_payload",
+    "unpack_payload",
+]
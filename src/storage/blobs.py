@@ -0,0 +1,86 @@
+"""Content-addressed blobs for history payloads.
+
+Long strings in a payload (message bodies, system prompts, image prompts)
+are replaced by ``{"$blob": <sha256>}`` references. The text itself is
+stored once per unique hash, zlib-compressed, so repeated prompts and
+copied conversations only cost a reference each.
+"""
+
+import hashlib
+import zlib
+from typing import Any, Callable, Dict, Iterable, Set
+
+
+BLOB_KEY = "$blob"
+BLOB_MIN_SIZE = 256  # characters; shorter strings stay inline
+COMPRESS_LEVEL = 6
+
+
+def blob_hash(text: str) -> str:
+    """Content address of a string."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def compress_text(text: str) -> bytes:
+    return zlib.compress(text.encode("utf-8"), COMPRESS_LEVEL)
+
+
+def decompress_text(data: bytes) -> str:
+    return zlib.decompress(data).decode("utf-8")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and BLOB_KEY in value
+
+
+def pack_payload(data: Any, blobs: Dict[str, str]) -> Any:
+    """Return a copy of ``data`` with long strings swapped for references.
+
+    The referenced texts are collected into ``blobs`` (hash -> text) for the
+    caller to store.
+    """
+    if isinstance(data, dict):
+        if is_blob_ref(data):
+            return data
+        return {key: pack_payload(value, blobs) for key, value in data.items()}
+    if isinstance(data, list):
+        return [pack_payload(value, blobs) for value in data]
+    if isinstance(data, str) and len(data) >= BLOB_MIN_SIZE:
+        digest = blob_hash(data)
+        blobs[digest] = data
+        return {BLOB_KEY: digest}
+    return data
+
+
+def collect_refs(data: Any, refs: Set[str]) -> Set[str]:
+    """Add every blob hash referenced by ``data`` to ``refs``."""
+    if isinstance(data, dict):
+        if is_blob_ref(data):
+            refs.add(data[BLOB_KEY])
+        else:
+            for value in data.values():
+                collect_refs(value, refs)
+    elif isinstance(data, list):
+        for value in data:
+            collect_refs(value, refs)
+    return refs
+
+
+def unpack_payload(data: Any, load: Callable[[Iterable[str]], Dict[str, str]]) -> Any:
+    """Resolve references in ``data``; ``load(hashes)`` returns hash -> text."""
+    refs = collect_refs(data, set())
+    if not refs:
+        return data
+    texts = load(refs)
+    return _resolve(data, texts)
+
+
+def _resolve(data: Any, texts: Dict[str, str]) -> Any:
+    if isinstance(data, dict):
+        if is_blob_ref(data):
+            # A missing blob degrades to an empty string rather than failing the load
+            return texts.get(data[BLOB_KEY], "")
+        return {key: _resolve(value, texts) for key, value in data.items()}
+    if isinstance(data, list):
+        return [_resolve(value, texts) for value in data]
+    return data
@@ -0,0 +1,182 @@
+"""Append-only JSONL journal for incremental history writes."""
+
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+
+class MessageJournal:
+    """Write-ahead log of history records, one JSON object per line.
+
+    Appending costs one short write no matter how long the conversation is.
+    Records are buffered in memory until ``flush`` so a write-behind thread
+    can batch them. ``rotate`` hands the current log over for compaction
+    while new records keep going to a fresh file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.rotated_path = path + ".compacting"
+        self._lock = threading.Lock()
+        self._file = None
+        self._buffer = []
+        self.record_count = 0
+
+    def _open(self):
+        if self._file is None:
+            fresh = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, "a", encoding="utf-8")
+            if fresh:
+                # Tag every log file so a compaction that already made it
+                # into the store is never replayed twice
+                header = {"op": "batch", "batch": str(uuid.uuid4())}
+                self._file.write(json.dumps(header) + "\n")
+        return self._file
+
+    def append(self, record: Dict) -> None:
+        """Queue a single record; it reaches the file on ``flush``."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self.record_count += 1
+
+    def flush(self) -> None:
+        """Write queued records and flush them to the OS."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self) -> None:
+        if not self._buffer:
+            return
+        f = self._open()
+        f.write("".join(self._buffer))
+        f.flush()
+        self._buffer.clear()
+
+    def rotate(self) -> bool:
+        """Move the live log aside for compaction.
+
+        Returns False when there is nothing to compact or a previous
+        rotation has not been discarded yet.
+        """
+        with self._lock:
+            if self.record_count == 0 or os.path.exists(self.rotated_path):
+                return False
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            os.replace(self.path, self.rotated_path)
+            self.record_count = 0
+            return True
+
+    def read_rotated(self) -> List[Dict]:
+        """Read the records of the rotated log."""
+        return self._read(self.rotated_path)
+
+    @staticmethod
+    def batch_id(records: List[Dict]) -> Optional[str]:
+        """Return the batch tag of a log read with ``read_*``."""
+        if records and records[0].get("op") == "batch":
+            return records[0].get("batch")
+        return None
+
+    def discard_rotated(self) -> None:
+        """Delete the rotated log once it has been folded into the store."""
+        try:
+            os.remove(self.rotated_path)
+        except FileNotFoundError:
+            pass
+
+    def read_live(self) -> List[Dict]:
+        """Read the records of the live log."""
+        with self._lock:
+            self._flush_locked()
+            return self._read(self.path)
+
+    def clear(self) -> None:
+        """Drop both the live and the rotated log."""
+        with self._lock:
+            self._buffer.clear()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            for path in (self.rotated_path, self.path):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self.record_count = 0
+
+    def close(self) -> None:
+        """Flush queued records and close the log file handle."""
+        with self._lock:
+            self._flush_locked()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    @staticmethod
+    def _read(path: str) -> List[Dict]:
+        records = []
+        if not os.path.exists(path):
+            return records
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A torn final line from a crash mid-write
+                    break
+        return records
+
+
+def fold_records(records: List[Dict], finalize_partials: bool = False) -> Tuple[Dict, Dict]:
+    """Collapse journal records into the messages to append per item.
+
+    Returns ``({(mode, item_id): [message, ...]}, {(mode, item_id): ts})``,
+    the second mapping holding the time of each item's last folded record
+    (absent for records written before timestamps were journaled). With
+    ``finalize_partials`` an interrupted streaming response is kept as a
+    regular message.
+    """
+    appends: Dict = {}
+    partials: Dict = {}
+    timestamps: Dict = {}
+    partial_timestamps: Dict = {}
+    for record in records:
+        key = (record.get("mode"), record.get("id"))
+        op = record.get("op")
+        if op == "append":
+            appends.setdefault(key, []).append(record["message"])
+            partials.pop(key, None)
+            if "ts" in record:
+                timestamps[key] = record["ts"]
+        elif op == "partial":
+            partial = partials.get(key)
+            if partial is None or record.get("reset"):
+                partial = dict(record.get("message", {}))
+                partial["content"] = ""
+                partials[key] = partial
+            partial["content"] += record.get("delta", "")
+            if "ts" in record:
+                partial_timestamps[key] = record["ts"]
+        elif op == "drop":
+            appends.pop(key, None)
+            partials.pop(key, None)
+            timestamps.pop(key, None)
+        elif op == "abort":
+            # The stream was abandoned; appends already journaled stay
+            partials.pop(key, None)
+    if finalize_partials:
+        for key, partial in partials.items():
+            if partial["content"]:
+                appends.setdefault(key, []).append(partial)
+                if key in partial_timestamps:
+                    timestamps[key] = partial_timestamps[key]
+    return appends, timestamps
@@ -0,0 +1,111 @@
+"""Write-behind persistence for history and configuration."""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+
+DEFAULT_WRITE_WINDOW = 0.5  # seconds
+
+
+def atomic_write_json(path: str, data: Any, indent: int = 2) -> None:
+    """Write JSON via temp file + fsync + rename so readers never see a torn file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", suffix="-" + os.path.basename(path), dir=directory)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    # Persist the rename itself (not supported on Windows)
+    if hasattr(os, "O_DIRECTORY"):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+class PersistenceWorker:
+    """Background thread that coalesces bursts of saves.
+
+    Callers mark a key dirty together with the function that writes it.
+    All keys marked within ``window`` seconds of the first one are written
+    together, and only the latest writer of each key runs.
+    """
+
+    def __init__(self, window: float = DEFAULT_WRITE_WINDOW):
+        self.window = window
+        self.writes = 0
+        self.coalesced = 0
+        self._cond = threading.Condition()
+        self._pending: Dict[str, Callable[[], None]] = {}
+        self._deadline: Optional[float] = None
+        self._busy = False
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name="PersistenceWorker", daemon=True)
+        self._thread.start()
+
+    def mark_dirty(self, key: str, writer: Callable[[], None]) -> None:
+        """Schedule ``writer`` for ``key``, replacing any writer not yet run."""
+        with self._cond:
+            if self._stopped:
+                raise RuntimeError("Persistence worker is stopped")
+            if key in self._pending:
+                self.coalesced += 1
+            self._pending[key] = writer
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.window
+            self._cond.notify()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Write everything pending right away and wait for it to finish."""
+        with self._cond:
+            if self._pending:
+                self._deadline = time.monotonic()
+                self._cond.notify_all()
+            return self._cond.wait_for(lambda: not self._pending and not self._busy, timeout)
+
+    def stop(self) -> None:
+        """Flush pending writes and stop the thread (call on exit)."""
+        self.flush()
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopped and (
+                    self._deadline is None or time.monotonic() < self._deadline
+                ):
+                    timeout = None if self._deadline is None else self._deadline - time.monotonic()
+                    self._cond.wait(timeout)
+                if self._stopped and not self._pending:
+                    return
+                batch, self._pending = self._pending, {}
+                self._deadline = None
+                self._busy = True
+
+            for key, writer in batch.items():
+                try:
+                    writer()
+                    self.writes += 1
+                except Exception as e:
+                    print(f"Error persisting {key}: {e}")
+
+            with self._cond:
+                self._busy = False
+                self._cond.notify_all()
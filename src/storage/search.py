@@ -0,0 +1,152 @@
+"""Helpers for the full-text history index."""
+
+import html
+import re
+import unicodedata
+from itertools import islice
+from typing import Any, List, Optional
+
+
+# Payload keys whose text is worth indexing
+TEXT_KEYS = ("content", "prompt", "topic", "ai1_system_prompt", "ai2_system_prompt")
+
+HIGHLIGHT_START = "\x02"
+HIGHLIGHT_END = "\x03"
+SNIPPET_WORDS = 12
+SNIPPET_LOOKBEHIND = 80  # characters searched for context before a match
+ELLIPSIS = "…"
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def extract_text(data: Any) -> str:
+    """Collect the searchable text of a history payload.
+
+    Works for every mode: chat and AI-to-AI ``messages``, compare
+    ``messages1``/``messages2`` and image/video ``prompt`` fields.
+    """
+    parts: List[str] = []
+    _collect(data, parts)
+    return "\n".join(parts)
+
+
+def extract_messages_text(messages: List[Any]) -> str:
+    """Collect the searchable text of appended messages."""
+    parts: List[str] = []
+    _collect(messages, parts)
+    return "\n".join(parts)
+
+
+def _collect(value: Any, parts: List[str]) -> None:
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key in TEXT_KEYS and isinstance(item, str):
+                if item:
+                    parts.append(item)
+            else:
+                _collect(item, parts)
+    elif isinstance(value, list):
+        for item in value:
+            _collect(item, parts)
+
+
+def search_terms(text: str) -> List[str]:
+    """Words of a search query; the last one is matched as a prefix."""
+    return _WORD.findall(text)
+
+
+def build_match_query(text: str) -> str:
+    """Turn free text into an FTS5 query; the last word matches as a prefix."""
+    terms = search_terms(text)
+    if not terms:
+        return ""
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def render_highlight(text: str) -> str:
+    """Escape text for rich-text labels and turn match markers into <b> tags."""
+    escaped = html.escape(text or "")
+    return escaped.replace(HIGHLIGHT_START, "<b>").replace(HIGHLIGHT_END, "</b>")
+
+
+def _fold(word: str) -> str:
+    # Same folding as the index tokenizer (unicode61, remove_diacritics)
+    if word.isascii():
+        return word.lower()
+    decomposed = unicodedata.normalize("NFKD", word)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).casefold()
+
+
+class _Matcher:
+    """Tells whether a word of the text matches one of the query terms."""
+
+    def __init__(self, terms: List[str]):
+        folded = [_fold(term) for term in terms]
+        self.exact = set(folded[:-1])
+        self.prefix = folded[-1] if folded else None
+        alternatives = [re.escape(term) + r"\b" for term in self.exact] + [re.escape(self.prefix or "")]
+        self.pattern = re.compile(r"\b(?:" + "|".join(alternatives) + ")", re.IGNORECASE)
+
+    def __call__(self, word: str) -> bool:
+        word = _fold(word)
+        return word in self.exact or (self.prefix is not None and word.startswith(self.prefix))
+
+    def find(self, text: str) -> Optional[int]:
+        """Offset of the first matching word of ``text``."""
+        if self.prefix is None:
+            return None
+        if text.isascii():
+            # Folding ASCII only lowercases, which the regex does for us
+            match = self.pattern.search(text)
+            return match.start() if match else None
+        for word in _WORD.finditer(text):
+            if self(word.group()):
+                return word.start()
+        return None
+
+
+def _mark(text: str, words: List[re.Match], matches: _Matcher) -> str:
+    parts = []
+    last = words[0].start() if words else 0
+    for word in words:
+        parts.append(text[last:word.start()])
+        if matches(word.group()):
+            parts.append(HIGHLIGHT_START + word.group() + HIGHLIGHT_END)
+        else:
+            parts.append(word.group())
+        last = word.end()
+    return "".join(parts)
+
+
+def highlight(text: str, terms: List[str]) -> str:
+    """``text`` with the words matching ``terms`` wrapped in highlight markers."""
+    words = list(_WORD.finditer(text))
+    if not words:
+        return text
+    return text[:words[0].start()] + _mark(text, words, _Matcher(terms)) + text[words[-1].end():]
+
+
+def make_snippet(text: str, terms: List[str], size: int = SNIPPET_WORDS) -> str:
+    """About ``size`` words of ``text`` around the first match, highlighted.
+
+    Only the words near the match are tokenized, so long bodies stay cheap.
+    """
+    matches = _Matcher(terms)
+    offset = matches.find(text) or 0
+    # A little context before the match, the rest of the window after it
+    lookbehind = max(0, offset - SNIPPET_LOOKBEHIND)
+    before = list(_WORD.finditer(text, lookbehind, offset))
+    if lookbehind and before:
+        before.pop(0)  # may start mid-word
+    before = before[len(before) - size // 4:] if len(before) > size // 4 else before
+    window = before + list(islice(_WORD.finditer(text, offset), size - len(before)))
+    if not window:
+        return ""
+    snippet = _mark(text, window, matches)
+    if _WORD.search(text, 0, window[0].start()):
+        snippet = ELLIPSIS + snippet
+    if _WORD.search(text, window[-1].end()):
+        snippet += ELLIPSIS
+    return snippet
@@ -0,0 +1,623 @@
+"""SQLite storage engine for history items."""
+
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .blobs import collect_refs, compress_text, decompress_text, pack_payload, unpack_payload
+from .search import (
+    build_match_query, extract_messages_text, extract_text, highlight, make_snippet, search_terms
+)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    mode TEXT NOT NULL,
+    name TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_mode_timestamp ON items (mode, timestamp DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Hashes per SELECT ... IN (...) when resolving blob references
+BLOB_FETCH_BATCH = 500
+
+# Full-text index kept in sync by every write. An item owns several index
+# rows (its title, its payload and one per appended batch of messages),
+# mapped to it by fts_rows; search ranks them and keeps each item's best.
+# The index is contentless: it stores no copy of the text, so highlights
+# and snippets are built from the decoded items of the top hits.
+FTS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fts_rows (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    item INTEGER NOT NULL,
+    kind TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_fts_rows_item ON fts_rows (item);
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    name,
+    body,
+    content = '',{delete_option}
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+# Bumped whenever FTS_SCHEMA changes; older indexes are dropped and rebuilt
+FTS_VERSION = "3"
+
+# Without contentless_delete (SQLite < 3.43) rows of deleted items stay in
+# the index, unreachable through fts_rows, until maintenance rebuilds it
+FTS_MAX_STALE_RATIO = 0.25
+
+
+class SQLiteHistoryStore:
+    """Row-level history storage backed by SQLite in WAL mode.
+
+    Every thread gets its own connection, so the UI thread can keep reading
+    while a background thread commits.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+        # Set whenever a write may have left blobs unreferenced
+        self.blobs_dirty = False
+        self._pack_legacy_rows()
+        self.fts_deletes = self._fts_supports_delete()
+        self.fts_enabled = self._init_fts()
+
+    def _pack_legacy_rows(self) -> None:
+        """Move long strings of rows written before the blob table into it."""
+        if self.get_meta("blobs_packed") == "1":
+            return
+        with self.transaction() as conn:
+            for row in conn.execute("SELECT rowid, data FROM items").fetchall():
+                conn.execute(
+                    "UPDATE items SET data = ? WHERE rowid = ?",
+                    (self._encode(conn, json.loads(row["data"])), row["rowid"]),
+                )
+            self.set_meta("blobs_packed", "1")
+
+    def _fts_supports_delete(self) -> bool:
+        conn = self._conn()
+        try:
+            conn.execute("CREATE VIRTUAL TABLE temp.fts_probe USING fts5(x, content = '', contentless_delete = 1)")
+        except sqlite3.OperationalError:
+            return False
+        conn.execute("DROP TABLE temp.fts_probe")
+        return True
+
+    def _fts_version(self) -> str:
+        # An index built without deletes is rebuilt once SQLite supports them
+        return FTS_VERSION if self.fts_deletes else FTS_VERSION + "-nodelete"
+
+    def _fts_schema(self) -> str:
+        return FTS_SCHEMA.format(delete_option=" contentless_delete = 1," if self.fts_deletes else "")
+
+    def _init_fts(self) -> bool:
+        """Create the FTS5 index, backfilling it for older databases."""
+        try:
+            if self.get_meta("fts_indexed") != self._fts_version():
+                self._rebuild_fts()
+            else:
+                self._conn().executescript(self._fts_schema())
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            return False
+        return True
+
+    def _rebuild_fts(self) -> None:
+        conn = self._conn()
+        conn.executescript("DROP TABLE IF EXISTS items_fts; DROP TABLE IF EXISTS fts_rows;")
+        conn.executescript(self._fts_schema())
+        with self.transaction() as conn:
+            for row in conn.execute("SELECT rowid, name, data FROM items").fetchall():
+                self._index_name(conn, row["rowid"], row["name"])
+                self._index_body(conn, row["rowid"], extract_text(self._decode(row["data"])))
+            self.set_meta("fts_indexed", self._fts_version())
+
+    def _add_fts_row(self, conn: sqlite3.Connection, rowid: int, kind: str, name: str, body: str) -> None:
+        cur = conn.execute("INSERT INTO fts_rows (item, kind) VALUES (?, ?)", (rowid, kind))
+        conn.execute(
+            "INSERT INTO items_fts (rowid, name, body) VALUES (?, ?, ?)", (cur.lastrowid, name, body)
+        )
+
+    def _index_name(self, conn: sqlite3.Connection, rowid: int, name: str) -> None:
+        self._add_fts_row(conn, rowid, "name", name, "")
+
+    def _index_body(self, conn: sqlite3.Connection, rowid: int, body: str) -> None:
+        if body:
+            self._add_fts_row(conn, rowid, "body", "", body)
+
+    def _unindex(self, conn: sqlite3.Connection, rowid: int, kind: Optional[str] = None) -> None:
+        """Drop the index rows of an item, or only those of one kind."""
+        where, params = "item = ?", [rowid]
+        if kind is not None:
+            where += " AND kind = ?"
+            params.append(kind)
+        if self.fts_deletes:
+            conn.execute(f"DELETE FROM items_fts WHERE rowid IN (SELECT id FROM fts_rows WHERE {where})", params)
+        conn.execute(f"DELETE FROM fts_rows WHERE {where}", params)
+
+    def _rowid(self, conn: sqlite3.Connection, mode: str, item_id: str) -> Optional[int]:
+        row = conn.execute("SELECT rowid FROM items WHERE id = ? AND mode = ?", (item_id, mode)).fetchone()
+        return row[0] if row else None
+
+    def _conn(self) -> sqlite3.Connection:
+        """Get the connection owned by the calling thread."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block of statements as one atomic write."""
+        conn = self._conn()
+        if conn.in_transaction:
+            # Nested use joins the outer transaction
+            yield conn
+            return
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _encode(self, conn: sqlite3.Connection, data: Any) -> str:
+        """Serialize a payload, storing its long strings as shared blobs."""
+        blobs: Dict[str, str] = {}
+        packed = pack_payload(data, blobs)
+        if blobs:
+            conn.executemany(
+                "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                ((digest, compress_text(text)) for digest, text in blobs.items()),
+            )
+        return json.dumps(packed)
+
+    def _load_blobs(self, hashes: Iterable[str]) -> Dict[str, str]:
+        hashes = list(hashes)
+        texts: Dict[str, str] = {}
+        conn = self._conn()
+        for start in range(0, len(hashes), BLOB_FETCH_BATCH):
+            batch = hashes[start:start + BLOB_FETCH_BATCH]
+            placeholders = ",".join("?" * len(batch))
+            for row in conn.execute(f"SELECT hash, data FROM blobs WHERE hash IN ({placeholders})", batch):
+                texts[row["hash"]] = decompress_text(row["data"])
+        return texts
+
+    def _decode(self, text: str) -> Any:
+        return unpack_payload(json.loads(text), self._load_blobs)
+
+    def _row_to_item(self, row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "timestamp": row["timestamp"],
+            "data": self._decode(row["data"]),
+        }
+
+    def insert_item(self, mode: str, item: Dict) -> None:
+        """Insert (or replace) a single item."""
+        with self.transaction() as conn:
+            old_rowid = self._rowid(conn, mode, item["id"])
+            if old_rowid is not None:
+                self.blobs_dirty = True
+                if self.fts_enabled:
+                    self._unindex(conn, old_rowid)
+            cur = conn.execute(
+                "INSERT OR REPLACE INTO items (id, mode, name, timestamp, data) VALUES (?, ?, ?, ?, ?)",
+                (item["id"], mode, item["name"], item["timestamp"], self._encode(conn, item["data"])),
+            )
+            if self.fts_enabled:
+                self._index_name(conn, cur.lastrowid, item["name"])
+                self._index_body(conn, cur.lastrowid, extract_text(item["data"]))
+
+    def get_item(self, mode: str, item_id: str) -> Optional[Dict]:
+        """Fetch one item by id."""
+        row = self._conn().execute(
+            "SELECT id, name, timestamp, data FROM items WHERE id = ? AND mode = ?",
+            (item_id, mode),
+        ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def list_items(
+        self, mode: str, offset: int = 0, limit: int = 100, exclude: Iterable[str] = ()
+    ) -> List[Dict]:
+        """Fetch one page of item metadata (no payload), most recent first.
+
+        Items listed in ``exclude`` are left out before paging. Items with
+        the same timestamp come in insertion order.
+        """
+        exclude = list(exclude)
+        # The page is picked on the (mode, timestamp) index alone, so the
+        # skipped rows are never read from the table
+        page = "SELECT rowid FROM items WHERE mode = ?"
+        if exclude:
+            page += f" AND rowid NOT IN (SELECT rowid FROM items WHERE id IN ({','.join('?' * len(exclude))}))"
+        page += " ORDER BY timestamp DESC, rowid LIMIT ? OFFSET ?"
+        rows = self._conn().execute(
+            f"SELECT id, name, timestamp FROM items WHERE rowid IN ({page}) ORDER BY timestamp DESC, rowid",
+            [mode, *exclude, limit, offset],
+        )
+        return [dict(row) for row in rows]
+
+    def get_item_meta(self, mode: str, item_id: str) -> Optional[Dict]:
+        """Fetch the metadata of one item without its payload."""
+        row = self._conn().execute(
+            "SELECT id, name, timestamp FROM items WHERE id = ? AND mode = ?",
+            (item_id, mode),
+        ).fetchone()
+        return dict(row) if row else None
+
+    def has_item(self, mode: str, item_id: str) -> bool:
+        """Check whether an item exists without loading its payload."""
+        row = self._conn().execute(
+            "SELECT 1 FROM items WHERE id = ? AND mode = ?", (item_id, mode)
+        ).fetchone()
+        return row is not None
+
+    def get_items(self, mode: str) -> List[Dict]:
+        """Fetch all items of a mode, most recent first."""
+        rows = self._conn().execute(
+            "SELECT id, name, timestamp, data FROM items WHERE mode = ? ORDER BY timestamp DESC",
+            (mode,),
+        )
+        return [self._row_to_item(row) for row in rows]
+
+    @staticmethod
+    def _range_filter(
+        modes: Optional[List[str]], since: Optional[float], until: Optional[float]
+    ) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if modes:
+            clauses.append(f"mode IN ({','.join('?' * len(modes))})")
+            params.extend(modes)
+        if since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("timestamp < ?")
+            params.append(until)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def iter_items(
+        self,
+        modes: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        batch_size: int = 200,
+    ) -> Iterator[Dict]:
+        """Stream full items (with ``mode``) grouped by mode, oldest first.
+
+        Rows are fetched ``batch_size`` at a time so an export never holds
+        the whole history in memory.
+        """
+        where, params = self._range_filter(modes, since, until)
+        cur = self._conn().execute(
+            f"SELECT id, mode, name, timestamp, data FROM items{where} ORDER BY mode, timestamp",
+            params,
+        )
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                item = self._row_to_item(row)
+                item["mode"] = row["mode"]
+                yield item
+
+    def count_range(
+        self,
+        modes: Optional[List[str]] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+    ) -> int:
+        """Count the items ``iter_items`` would yield."""
+        where, params = self._range_filter(modes, since, until)
+        return self._conn().execute(f"SELECT COUNT(*) FROM items{where}", params).fetchone()[0]
+
+    def rename_item(self, mode: str, item_id: str, name: str) -> bool:
+        """Rename an item in place."""
+        with self.transaction() as conn:
+            rowid = self._rowid(conn, mode, item_id)
+            if rowid is None:
+                return False
+            conn.execute("UPDATE items SET name = ? WHERE rowid = ?", (name, rowid))
+            if self.fts_enabled:
+                self._unindex(conn, rowid, "name")
+                self._index_name(conn, rowid, name)
+        return True
+
+    def update_item_data(self, mode: str, item_id: str, data: Any, timestamp: float) -> bool:
+        """Replace the payload of an item."""
+        with self.transaction() as conn:
+            rowid = self._rowid(conn, mode, item_id)
+            if rowid is None:
+                return False
+            conn.execute(
+                "UPDATE items SET data = ?, timestamp = ? WHERE rowid = ?",
+                (self._encode(conn, data), timestamp, rowid),
+            )
+            self.blobs_dirty = True
+            if self.fts_enabled:
+                self._unindex(conn, rowid, "body")
+                self._index_body(conn, rowid, extract_text(data))
+        return True
+
+    def touch_item(self, mode: str, item_id: str, timestamp: float) -> bool:
+        """Bump the timestamp of an item."""
+        with self.transaction() as conn:
+            cur = conn.execute(
+                "UPDATE items SET timestamp = ? WHERE id = ? AND mode = ?",
+                (timestamp, item_id, mode),
+            )
+        return cur.rowcount > 0
+
+    def append_messages(self, mode: str, item_id: str, messages: List[Dict], timestamp: float) -> bool:
+        """Extend the ``messages`` list of an item's payload."""
+        with self.transaction() as conn:
+            row = conn.execute(
+                "SELECT rowid, data FROM items WHERE id = ? AND mode = ?", (item_id, mode)
+            ).fetchone()
+            if row is None:
+                return False
+            # Existing messages stay packed; only the new ones are encoded
+            data = json.loads(row["data"])
+            blobs: Dict[str, str] = {}
+            data.setdefault("messages", []).extend(pack_payload(messages, blobs))
+            if blobs:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO blobs (hash, data) VALUES (?, ?)",
+                    ((digest, compress_text(text)) for digest, text in blobs.items()),
+                )
+            conn.execute(
+                "UPDATE items SET data = ?, timestamp = ? WHERE rowid = ?",
+                (json.dumps(data), timestamp, row["rowid"]),
+            )
+            if self.fts_enabled:
+                # The batch gets an index row of its own, so the text
+                # already indexed for this item is never tokenized again
+                self._index_body(conn, row["rowid"], extract_messages_text(messages))
+        return True
+
+    def delete_item(self, mode: str, item_id: str) -> bool:
+        """Delete an item."""
+        with self.transaction() as conn:
+            rowid = self._rowid(conn, mode, item_id)
+            if rowid is None:
+                return False
+            conn.execute("DELETE FROM items WHERE rowid = ?", (rowid,))
+            self.blobs_dirty = True
+            if self.fts_enabled:
+                self._unindex(conn, rowid)
+        return True
+
+    def search(self, query: str, mode: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Rank items matching ``query``; titles weigh more than bodies.
+
+        Returns ``{id, mode, name, timestamp, name_highlight, snippet}`` dicts
+        with the matched words wrapped in highlight markers.
+        """
+        if self.fts_enabled:
+            match = build_match_query(query)
+            if not match:
+                return []
+            # An item ranks by its best index row. LIMIT -1 keeps the
+            # subquery from being flattened into the join, where bm25()
+            # cannot run.
+            sql = (
+                "SELECT i.id, i.mode, i.name, i.timestamp, i.data, MIN(hits.score) AS score "
+                "FROM (SELECT rowid, bm25(items_fts, 5.0, 1.0) AS score "
+                "FROM items_fts WHERE items_fts MATCH ? LIMIT -1) AS hits "
+                "JOIN fts_rows r ON r.id = hits.rowid JOIN items i ON i.rowid = r.item"
+            )
+            params: List[Any] = [match]
+            if mode is not None:
+                sql += " WHERE i.mode = ?"
+                params.append(mode)
+            sql += " GROUP BY r.item ORDER BY score LIMIT ?"
+            params.append(limit)
+            rows = self._conn().execute(sql, params).fetchall()
+        else:
+            pattern = f"%{query.strip()}%"
+            sql = (
+                "SELECT id, mode, name, timestamp, data FROM items "
+                "WHERE (name LIKE ? OR data LIKE ?)"
+            )
+            params = [pattern, pattern]
+            if mode is not None:
+                sql += " AND mode = ?"
+                params.append(mode)
+            sql += " ORDER BY timestamp DESC LIMIT ?"
+            params.append(limit)
+            rows = self._conn().execute(sql, params).fetchall()
+
+        terms = search_terms(query)
+        return [
+            {
+                "id": row["id"],
+                "mode": row["mode"],
+                "name": row["name"],
+                "timestamp": row["timestamp"],
+                "name_highlight": highlight(row["name"], terms),
+                "snippet": make_snippet(extract_text(self._decode(row["data"])), terms),
+            }
+            for row in rows
+        ]
+
+    def count(self, mode: Optional[str] = None) -> int:
+        """Count items, optionally for a single mode."""
+        if mode is None:
+            row = self._conn().execute("SELECT COUNT(*) FROM items").fetchone()
+        else:
+            row = self._conn().execute("SELECT COUNT(*) FROM items WHERE mode = ?", (mode,)).fetchone()
+        return row[0]
+
+    def collect_garbage(self) -> int:
+        """Delete blobs no longer referenced by any item; returns how many."""
+        with self.transaction() as conn:
+            referenced = set()
+            for row in conn.execute("SELECT data FROM items"):
+                collect_refs(json.loads(row["data"]), referenced)
+            stored = [row[0] for row in conn.execute("SELECT hash FROM blobs")]
+            orphans = [(digest,) for digest in stored if digest not in referenced]
+            conn.executemany("DELETE FROM blobs WHERE hash = ?", orphans)
+            self.blobs_dirty = False
+        return len(orphans)
+
+    def modes(self) -> List[str]:
+        """Modes that have at least one item."""
+        return [row[0] for row in self._conn().execute("SELECT DISTINCT mode FROM items")]
+
+    def ids_older_than(self, timestamp: float) -> List[Tuple[str, str]]:
+        """``(mode, id)`` of items last touched before ``timestamp``."""
+        rows = self._conn().execute("SELECT mode, id FROM items WHERE timestamp < ?", (timestamp,))
+        return [(row[0], row[1]) for row in rows]
+
+    def ids_beyond_count(self, mode: str, keep: int) -> List[str]:
+        """Ids of a mode's items past the ``keep`` most recent ones."""
+        rows = self._conn().execute(
+            "SELECT id FROM items WHERE mode = ? ORDER BY timestamp DESC LIMIT -1 OFFSET ?",
+            (mode, keep),
+        )
+        return [row[0] for row in rows]
+
+    def iter_item_sizes(self) -> Iterator[Tuple[str, str, int]]:
+        """Yield ``(mode, id, bytes)`` oldest first.
+
+        Sizes count the stored payload plus the compressed blobs it
+        references; shared blobs are counted for every item using them.
+        """
+        conn = self._conn()
+        blob_sizes = dict(conn.execute("SELECT hash, length(data) FROM blobs").fetchall())
+        cur = conn.execute("SELECT mode, id, data FROM items ORDER BY timestamp")
+        while True:
+            rows = cur.fetchmany(BLOB_FETCH_BATCH)
+            if not rows:
+                break
+            for row in rows:
+                refs = collect_refs(json.loads(row["data"]), set())
+                yield row["mode"], row["id"], len(row["data"]) + sum(blob_sizes.get(h, 0) for h in refs)
+
+    def vacuum(self, min_free_ratio: float = 0.25) -> bool:
+        """Rebuild the file once enough pages are free; returns whether it ran.
+
+        VACUUM may renumber the implicit rowids fts_rows points at, so the
+        index is rebuilt afterwards.
+        """
+        conn = self._conn()
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_count = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if not page_count or free_count / page_count < min_free_ratio:
+            return False
+        if self.fts_enabled:
+            # Rebuilt on the next open if we stop between the two steps
+            self.set_meta("fts_indexed", "0")
+        conn.execute("VACUUM")
+        if self.fts_enabled:
+            self._rebuild_fts()
+        return True
+
+    def compact_fts(self, max_stale_ratio: float = FTS_MAX_STALE_RATIO) -> bool:
+        """Rebuild the index once too many of its rows belong to deleted items.
+
+        Only needed where SQLite cannot delete from a contentless index;
+        returns whether it ran.
+        """
+        if not self.fts_enabled or self.fts_deletes:
+            return False
+        conn = self._conn()
+        total = conn.execute("SELECT COUNT(*) FROM items_fts").fetchone()[0]
+        live = conn.execute("SELECT COUNT(*) FROM fts_rows").fetchone()[0]
+        if not total or (total - live) / total < max_stale_ratio:
+            return False
+        self._rebuild_fts()
+        return True
+
+    def checkpoint(self) -> None:
+        """Fold the WAL back into the database file and truncate it."""
+        self._conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a bookkeeping value."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        """Write a bookkeeping value."""
+        with self.transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self) -> None:
+        """Close every connection opened by this store."""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.Error:
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
+
+def migrate_json_history(json_path: str, store: SQLiteHistoryStore) -> int:
+    """Import a legacy history.json into the store.
+
+    The JSON file is renamed to ``<name>.migrated`` afterwards so the import
+    only ever runs once. Returns the number of imported items.
+    """
+    if not os.path.exists(json_path):
+        return 0
+
+    try:
+        with open(json_path, "r", encoding="utf-8") as f:
+            history = json.load(f)
+    except (json.JSONDecodeError, OSError) as e:
+        print(f"Error reading legacy history: {e}")
+        return 0
+
+    count = 0
+    with store.transaction():
+        for mode, items in history.items():
+            for item in items:
+                if "id" not in item:
+                    continue
+                store.insert_item(mode, {
+                    "id": item["id"],
+                    "name": item.get("name", ""),
+                    "timestamp": item.get("timestamp", 0.0),
+                    "data": item.get("data", {}),
+                })
+                count += 1
+
+    try:
+        os.replace(json_path, json_path + ".migrated")
+    except OSError as e:
+        print(f"Error archiving legacy history: {e}")
+    return count
@@ -0,0 +1,50 @@
+"""Base class for network workers that run as coroutines."""
+
+import asyncio
+import concurrent.futures
+from typing import Optional
+
+from PyQt5.QtCore import QObject
+
+from ..api.async_runtime import get_async_runner
+
+
+class AsyncWorker(QObject):
+    """A request running on the shared asyncio loop instead of its own QThread.
+
+    Subclasses implement ``run_async`` and emit their signals from it; the
+    receivers live on the GUI thread, so delivery is queued either way.
+    ``start``/``isRunning``/``wait`` keep the QThread API the pages use.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._future: Optional[concurrent.futures.Future] = None
+
+    async def run_async(self):
+        raise NotImplementedError
+
+    async def _run_guarded(self):
+        try:
+            await self.run_async()
+        except asyncio.CancelledError:
+            pass
+
+    def start(self):
+        """Schedule the worker on the shared loop."""
+        self._future = get_async_runner().submit(self._run_guarded())
+
+    def cancel(self):
+        """Cancel the request; the coroutine stops at its next await."""
+        if self._future is not None:
+            self._future.cancel()
+
+    def isRunning(self) -> bool:
+        return self._future is not None and not self._future.done()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the worker finished (never call on the loop thread)."""
+        if self._future is None:
+            return True
+        done, _ = concurrent.futures.wait([self._future], timeout)
+        return bool(done)
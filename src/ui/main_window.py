@@ -4,11 +4,14 @@ from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, QStackedWidget,
     QLabel, QGraphicsOpacityEffect, QFrame
 )
-from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer, QPoint
+from PyQt5.QtCore import Qt, QPropertyAnimation, QEasingCurve, QTimer, QPoint, pyqtSignal
 
 from .styles import StyleSheet
 from .widgets.topbar import TopBar
 from .widgets.history_sidebar import HistorySidebar
+from .widgets.export_dialog import HistoryExportDialog
+from .widgets.model_selector import ModelSelector
+from .streaming import set_max_fps
 from .pages import (
     ChatPage,
     AIToAIPage,
@@ -22,7 +25,11 @@ from .pages import (
 from ..config import ConfigManager
 from ..api.llm_client import LLMClient
 from ..api.lumaai_client import LumaAIClient
-from ..history_manager import HistoryManager
+from ..history_manager import HistoryManager, RetentionPolicy
+from ..api.http_pool import get_http_pool
+from ..api.async_runtime import get_async_runner
+from ..api.response_cache import ResponseCache
+from ..storage import PersistenceWorker
 
 class ToastNotification(QLabel):
     """Simple toast notification."""
@@ -81,25 +88,51 @@ class ToastNotification(QLabel):
 class MainWindow(QMainWindow):
     """Main application window."""
     
+    # Re-emits HistoryManager notifications, queued onto the GUI thread
+    history_changed = pyqtSignal(str, str, dict)  # Event, mode, fields
+    
     def __init__(self):
         super().__init__()
-        self.config_manager = ConfigManager()
-        self.history_manager = HistoryManager()
+        # Disk writes for config and history happen on this worker thread
+        self.persistence = PersistenceWorker()
+        self.config_manager = ConfigManager(persistence=self.persistence)
+        self.persistence.window = self.config_manager.config.save_window_ms / 1000
+        self.history_manager = HistoryManager(persistence=self.persistence)
+        self.history_manager.add_listener(self.history_changed.emit)
+        self.apply_history_retention()
+        # One keep-alive pool shared by the SDKs, downloads and update checks
+        self.http_pool = get_http_pool()
+        self.http_pool.configure(self.config_manager.config.http_proxy)
         self.llm_client = None
         self.lumaai_client = None
+        self.response_cache = None
         
         self.init_clients()
         self.setup_ui()
         self.apply_theme(self.config_manager.config.theme)
         
+    def apply_history_retention(self):
+        """Pass the configured retention limits to the history manager."""
+        config = self.config_manager.config
+        self.history_manager.set_retention(RetentionPolicy(
+            max_items_per_mode=config.history_max_items_per_mode,
+            max_age_days=config.history_max_age_days,
+            max_total_mb=config.history_max_total_mb,
+        ))
+        
     def init_clients(self):
         """Initialize API clients."""
         config = self.config_manager.config
         
-        self.llm_client = LLMClient(config.openai_api_key, config.gemini_api_key)
+        self.llm_client = LLMClient(config.openai_api_key, config.gemini_api_key, http_pool=self.http_pool)
+        self.apply_response_cache()
+        self.llm_client.set_context_policy(config.context_policy, config.context_max_tokens)
+        self.llm_client.set_endpoints(config.custom_endpoints)
+        self.llm_client.set_fast_streaming(config.fast_streaming)
+        set_max_fps(config.stream_max_fps)
         
         try:
-            self.lumaai_client = LumaAIClient(config.lumaai_api_key)
+            self.lumaai_client = LumaAIClient(config.lumaai_api_key, http_pool=self.http_pool)
         except ImportError:
             self.lumaai_client = None
             
@@ -133,7 +166,10 @@ class MainWindow(QMainWindow):
         self.history_sidebar.item_renamed.connect(self.on_history_renamed)
         self.history_sidebar.item_deleted.connect(self.on_history_deleted)
         self.history_sidebar.item_export.connect(self.on_history_export)
+        self.history_sidebar.export_all_requested.connect(self.on_history_export_all)
+        self.history_sidebar.search_requested.connect(self.on_history_search)
         self.history_sidebar.settings_clicked.connect(self.open_settings)
+        self.history_changed.connect(self.on_history_changed)
         content_layout.addWidget(self.history_sidebar)
         
         # Stacked Widget
@@ -202,6 +238,7 @@ class MainWindow(QMainWindow):
         page.set_history_manager(self.history_manager)
         page.set_llm_client(self.llm_client)
         page.set_lumaai_client(self.lumaai_client)
+        page.set_http_pool(self.http_pool)
         
     def on_mode_changed(self, index: int):
         # Fade out
@@ -221,14 +258,35 @@ class MainWindow(QMainWindow):
         
         if index in mode_map:
             mode = mode_map[index]
-            items = self.history_manager.get_items(mode)
-            self.history_sidebar.update_history(mode.replace("_", " ").title(), items)
             self.history_sidebar.current_mode = mode
+            self.history_sidebar.clear_search()
+            self.refresh_history()
             self.history_sidebar.show()
         else:
              # Should not happen for topbar modes
              pass
              
+    def refresh_history(self):
+        """Point the sidebar at the current mode; rows load page by page."""
+        mode = self.history_sidebar.current_mode
+        self.history_sidebar.set_history_source(
+            mode.replace("_", " ").title(),
+            lambda offset, limit: self.history_manager.list_items(mode, offset, limit)
+        )
+        
+    def on_history_search(self, query: str):
+        """Show full-text hits for the current mode, or the plain list."""
+        if not query:
+            self.refresh_history()
+            return
+        results = self.history_manager.search(query, mode=self.history_sidebar.current_mode)
+        self.history_sidebar.show_search_results(results)
+        
+    def on_history_changed(self, event: str, mode: str, fields: dict):
+        """Apply a single history change to the sidebar without reloading it."""
+        if mode == self.history_sidebar.current_mode:
+            self.history_sidebar.apply_history_event(event, fields)
+             
     def fade_transition(self, callback):
         current = self.stack.currentWidget()
         if not current:
@@ -279,9 +337,6 @@ class MainWindow(QMainWindow):
     def on_history_deleted(self, item_id: str):
         mode = self.history_sidebar.current_mode
         if self.history_manager.delete_item(mode, item_id):
-            # Refresh list
-            items = self.history_manager.get_items(mode)
-            self.history_sidebar.update_history(mode.replace("_", " ").title(), items)
             self.toast.show_message("Item deleted")
     
     def on_history_export(self, item_id: str):
@@ -307,6 +362,14 @@ class MainWindow(QMainWindow):
             else:
                 self.toast.show_message("Export failed")
             
+    def on_history_export_all(self):
+        """Open the bulk export dialog with the current mode preselected."""
+        dialog = HistoryExportDialog(self.history_manager, self.history_sidebar.current_mode, self)
+        dialog.exported.connect(
+            lambda count, path: self.toast.show_message(f"Exported {count} items to {path}")
+        )
+        dialog.exec_()
+            
     def open_settings(self):
         # Hide history sidebar when opening settings
         self.history_sidebar.hide()
@@ -322,13 +385,39 @@ class MainWindow(QMainWindow):
     def on_settings_changed(self):
         config = self.config_manager.config
         
+        # Rebuilds the pooled transports only if the proxy changed
+        self.http_pool.configure(config.http_proxy)
+        
         if self.llm_client:
             self.llm_client.set_api_keys(config.openai_api_key, config.gemini_api_key)
+            self.llm_client.set_context_policy(config.context_policy, config.context_max_tokens)
+            self.llm_client.set_endpoints(config.custom_endpoints)
+            self.llm_client.set_fast_streaming(config.fast_streaming)
+            set_max_fps(config.stream_max_fps)
+            for selector in self.findChildren(ModelSelector):
+                selector.refresh()
         
         if self.lumaai_client:
             self.lumaai_client.set_api_key(config.lumaai_api_key)
             
         self.apply_theme(config.theme)
+        self.apply_history_retention()
+        self.apply_response_cache()
+        
+    def apply_response_cache(self):
+        """Attach the response cache to the LLM client if it is enabled."""
+        config = self.config_manager.config
+        if not config.response_cache_enabled:
+            self.llm_client.set_cache(None)
+            return
+        if self.response_cache is None:
+            self.response_cache = ResponseCache(
+                ttl_hours=config.response_cache_ttl_hours,
+                max_disk_mb=config.response_cache_max_mb,
+            )
+        else:
+            self.response_cache.configure(config.response_cache_ttl_hours, config.response_cache_max_mb)
+        self.llm_client.set_cache(self.response_cache)
         
     def apply_theme(self, theme: str):
         stylesheet = StyleSheet.get_theme(theme, self.config_manager.config.font_family)
@@ -341,6 +430,30 @@ class MainWindow(QMainWindow):
         if app:
             app.setFont(QFont(self.config_manager.config.font_family, 10))
 
+    def closeEvent(self, event):
+        # Write everything still pending, then fold the history journal
+        self.persistence.flush()
+        self.history_manager.close()
+        self.persistence.stop()
+        self._stop_async_runtime()
+        self.http_pool.close()
+        if self.response_cache:
+            self.response_cache.close()
+        super().closeEvent(event)
+
+    def _stop_async_runtime(self):
+        """Cancel in-flight requests and stop the network event loop."""
+        runner = get_async_runner()
+        if runner.integrated:
+            # The Qt loop itself; qasync cancels its tasks when it closes
+            return
+        if self.llm_client:
+            try:
+                runner.run(self.llm_client.aio.aclose(), timeout=2)
+            except Exception:
+                pass
+        runner.stop()
+
     def resizeEvent(self, event):
         # Reposition toast if visible
         if hasattr(self, 'toast') and self.toast.isVisible():
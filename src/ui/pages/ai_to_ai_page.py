@@ -4,16 +4,25 @@ from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QTextEdit, QGroupBox, QSpinBox
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 
 from .base_page import BasePage
+from ..streaming import StreamingWorker
+from ...api.scheduler import Priority
 from ..widgets.chat_widget import ChatWidget
+from ..widgets.model_selector import ModelSelector
 
 
-class AIConversationWorker(QThread):
-    """Worker thread for AI-to-AI conversation."""
+class AIConversationWorker(StreamingWorker):
+    """Runs an AI-to-AI conversation on the shared event loop.
     
+    Each turn is one stream of the delta protocol, announced by
+    ``turn_started(stream, sender, is_ai2)``; ``message_received`` follows
+    its commit.
+    """
+    
+    turn_started = pyqtSignal(int, str, bool)
     message_received = pyqtSignal(str, str, bool)
     error_occurred = pyqtSignal(str)
     conversation_ended = pyqtSignal()
@@ -34,17 +43,13 @@ class AIConversationWorker(QThread):
         self.is_running = True
     
     def stop(self):
-        """Stop the conversation."""
+        """Stop the conversation, aborting the reply in flight."""
         self.is_running = False
+        self.cancel()
     
-    def run(self):
+    async def run_async(self):
         """Execute the AI-to-AI conversation."""
         try:
-            # We use non-streaming for AI-to-AI to keep turns clean, or we could stream.
-            # For simplicity, using non-streaming chat wrapper if available, or just consume stream.
-            
-            # Since LLMClient only exposes chat_stream, we consume it.
-            
             ai1_history = [
                 {"role": "system", "content": self.ai1_prompt},
                 {"role": "user", "content": f"Start a conversation about: {self.topic}"}
@@ -53,40 +58,56 @@ class AIConversationWorker(QThread):
                 {"role": "system", "content": self.ai2_prompt}
             ]
             
+            context = self.client.aio.context
+            
             for turn in range(self.turns):
                 if not self.is_running:
                     break
                 
                 # AI 1 Turn
-                ai1_response = ""
-                for chunk in self.client.chat_stream(
-                    messages=ai1_history,
+                self.turn_started.emit(self.new_stream(), self.ai1_name, False)
+                async for chunk in self.client.aio.chat_stream_async(
+                    messages=context.fit(
+                        ai1_history, self.model, self.provider, self.max_tokens,
+                        conversation=f"ai_to_ai:{id(self)}:1"
+                    ),
                     model=self.model,
                     provider=self.provider,
                     max_tokens=self.max_tokens,
-                    temperature=self.temperature
+                    temperature=self.temperature,
+                    priority=Priority.BACKGROUND,
+                    flow="ai_to_ai",
+                    conversation=f"ai_to_ai:{id(self)}:1"
                 ):
-                    ai1_response += chunk
+                    self.emit_delta(chunk)
                 
                 if not self.is_running: break
                 
+                ai1_response = self.commit()
                 self.message_received.emit(self.ai1_name, ai1_response, False)
                 ai1_history.append({"role": "assistant", "content": ai1_response})
                 ai2_history.append({"role": "user", "content": ai1_response})
                 
                 # AI 2 Turn
-                ai2_response = ""
-                for chunk in self.client.chat_stream(
-                    messages=ai2_history,
+                self.turn_started.emit(self.new_stream(), self.ai2_name, True)
+                async for chunk in self.client.aio.chat_stream_async(
+                    messages=context.fit(
+                        ai2_history, self.model, self.provider, self.max_tokens,
+                        conversation=f"ai_to_ai:{id(self)}:2"
+                    ),
                     model=self.model,
                     provider=self.provider,
                     max_tokens=self.max_tokens,
-                    temperature=self.temperature
+                    temperature=self.temperature,
+                    priority=Priority.BACKGROUND,
+                    flow="ai_to_ai",
+                    conversation=f"ai_to_ai:{id(self)}:2"
                 ):
-                    ai2_response += chunk
+                    self.emit_delta(chunk)
                     
                 if not self.is_running: break
                 
+                ai2_response = self.commit()
                 self.message_received.emit(self.ai2_name, ai2_response, True)
                 ai2_history.append({"role": "assistant", "content": ai2_response})
                 ai1_history.append({"role": "user", "content": ai2_response})
@@ -109,6 +130,8 @@ class AIToAIPage(BasePage):
         self.conversation_worker = None
         self.messages = []
         self.current_history_id = None
+        # Stream id and message fields of the turn being streamed
+        self._turn = None
         self.setup_ui()
     
     def setup_ui(self):
@@ -138,6 +161,12 @@ class AIToAIPage(BasePage):
         turns_layout.addWidget(self.turns_spinbox)
         config_layout.addWidget(turns_group)
         
+        model_group = QGroupBox("Model")
+        model_layout = QVBoxLayout(model_group)
+        self.model_selector = ModelSelector()
+        model_layout.addWidget(self.model_selector)
+        config_layout.addWidget(model_group)
+        
         layout.addLayout(config_layout)
         
         self.chat_widget = ChatWidget()
@@ -179,9 +208,9 @@ class AIToAIPage(BasePage):
         self.messages = data.get("messages", [])
         self.topic_input.setText(data.get("topic", ""))
         self.chat_widget.clear_messages()
-        
-        for msg in self.messages:
-            self.chat_widget.add_message(msg['content'], is_user=msg.get('is_ai2', False), sender_name=msg.get('sender', 'AI'))
+        self.chat_widget.add_messages(
+            (msg['content'], msg.get('is_ai2', False), msg.get('sender', 'AI')) for msg in self.messages
+        )
     
     def load_history_data(self, data):
         """Load history (compatibility method)."""
@@ -205,10 +234,12 @@ class AIToAIPage(BasePage):
         self.stop_button.setEnabled(True)
         self.topic_input.setEnabled(False)
         self.turns_spinbox.setEnabled(False)
+        self.model_selector.setEnabled(False)
         self.status_label.setText("Conversation in progress...")
         
         provider = self.config.chat_model_provider
         model = self.config.openai_model if provider == "openai" else self.config.gemini_model
+        provider, model = self.model_selector.selection(provider, model)
 
         self.conversation_worker = AIConversationWorker(
             client=self._llm_client,
@@ -223,6 +254,9 @@ class AIToAIPage(BasePage):
             temperature=self.config.temperature,
             turns=self.turns_spinbox.value()
         )
+        self.conversation_worker.turn_started.connect(self.on_turn_started)
+        self.conversation_worker.stream_delta.connect(self.on_turn_delta)
+        self.conversation_worker.stream_committed.connect(self.chat_widget.commit_stream)
         self.conversation_worker.message_received.connect(self.on_message_received)
         self.conversation_worker.error_occurred.connect(self.on_error)
         self.conversation_worker.conversation_ended.connect(self.on_conversation_ended)
@@ -235,29 +269,57 @@ class AIToAIPage(BasePage):
         """Stop the ongoing conversation."""
         if self.conversation_worker:
             self.conversation_worker.stop()
+        self._discard_turn()
+        self.chat_widget.end_stream()
         self.on_conversation_ended()
     
+    def on_turn_started(self, stream: int, sender: str, is_ai2: bool):
+        """Open a message for the turn that starts streaming."""
+        self._turn = (stream, {"sender": sender, "is_ai2": is_ai2})
+        self.chat_widget.begin_stream(stream, is_user=is_ai2, sender_name=sender)
+    
+    def on_turn_delta(self, stream: int, seq: int, text: str):
+        """Show a streamed chunk of a turn and checkpoint the turn so far."""
+        self.chat_widget.append_delta(stream, seq, text)
+        history = self._history_manager
+        history_id = self.current_history_id
+        if not history or history_id is None or not self._turn or self._turn[0] != stream:
+            return
+        if not history.partial_checkpoint_due("ai_to_ai", history_id):
+            return
+        content = self.chat_widget.stream_text()
+        if content:
+            history.checkpoint_partial("ai_to_ai", history_id, dict(self._turn[1], content=content))
+    
     def on_message_received(self, sender: str, message: str, is_ai2: bool):
-        """Handle received messages."""
-        self.chat_widget.add_message(message, is_user=is_ai2, sender_name=sender)
-        self.messages.append({
+        """Handle a completed turn (already shown through its stream)."""
+        new_message = {
             "sender": sender,
             "content": message,
             "is_ai2": is_ai2
-        })
-        self.save_history()
+        }
+        self.messages.append(new_message)
+        self.save_history(new_message)
     
     def on_error(self, error_message: str):
         """Handle errors."""
+        self._discard_turn()
+        self.chat_widget.end_stream()
         self.on_conversation_ended()
         self.show_error("Error", f"Conversation error: {error_message}")
     
+    def _discard_turn(self):
+        """Drop the checkpoint of a turn that stops streaming unfinished."""
+        if self._history_manager and self.current_history_id is not None:
+            self._history_manager.discard_partial("ai_to_ai", self.current_history_id)
+    
     def on_conversation_ended(self):
         """Handle conversation end."""
         self.start_button.setEnabled(True)
         self.stop_button.setEnabled(False)
         self.topic_input.setEnabled(True)
         self.turns_spinbox.setEnabled(True)
+        self.model_selector.setEnabled(True)
         self.status_label.setText("Conversation ended")
         self.save_history()
     
@@ -268,9 +330,14 @@ class AIToAIPage(BasePage):
         if clear_history:
             self.messages = []
             
-    def save_history(self):
+    def save_history(self, new_message=None):
         if not self._history_manager: return
         
+        if self.current_history_id is not None and new_message is not None:
+            # Only one message was added: journal it instead of rewriting the item
+            self._history_manager.append_message("ai_to_ai", self.current_history_id, new_message)
+            return
+        
         data = {
             "topic": self.topic_input.text(),
             "messages": self.messages
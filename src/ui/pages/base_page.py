@@ -17,6 +17,7 @@ class BasePage(QWidget):
         self._openai_client = None
         self._llm_client = None
         self._lumaai_client = None
+        self._http_pool = None
     
     def set_config_manager(self, config_manager):
         """Set the configuration manager."""
@@ -42,6 +43,18 @@ class BasePage(QWidget):
         """Set the LumaAI client."""
         self._lumaai_client = client
     
+    def set_http_pool(self, http_pool):
+        """Set the shared HTTP connection pool."""
+        self._http_pool = http_pool
+    
+    @property
+    def http_pool(self):
+        """Get the shared HTTP connection pool."""
+        if self._http_pool is None:
+            from ...api.http_pool import get_http_pool
+            self._http_pool = get_http_pool()
+        return self._http_pool
+    
     @property
     def config(self):
         """Get current configuration."""
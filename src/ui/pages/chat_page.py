@@ -4,45 +4,56 @@ from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QTextEdit, QPushButton,
     QLabel, QFrame
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
 
 from .base_page import BasePage
+from ..streaming import StreamingWorker
+from ...api.scheduler import Priority
 from ..widgets.chat_widget import ChatWidget
+from ..widgets.model_selector import ModelSelector
 
 
-class ChatWorker(QThread):
-    """Worker thread for chat API calls."""
+class ChatWorker(StreamingWorker):
+    """Streams a chat reply on the shared event loop with the delta protocol.
+    
+    ``history_id`` is the history item the reply belongs to, fixed when the
+    request is made even if the page moves on to another chat meanwhile.
+    """
     
-    response_chunk = pyqtSignal(str)
-    response_complete = pyqtSignal(str)
     error_occurred = pyqtSignal(str)
     
-    def __init__(self, client, messages, model, provider, max_tokens, temperature):
+    def __init__(self, client, messages, model, provider, max_tokens, temperature,
+                 conversation=None, history_id=None):
         super().__init__()
+        self.history_id = history_id
         self.client = client
         self.messages = messages
         self.model = model
         self.provider = provider
         self.max_tokens = max_tokens
         self.temperature = temperature
+        self.conversation = conversation
     
-    def run(self):
+    async def run_async(self):
         """Execute the chat request."""
         try:
-            full_response = ""
-            # Using LLMClient.chat_stream
-            for chunk in self.client.chat_stream(
-                messages=self.messages,
+            messages = self.client.aio.context.fit(
+                self.messages, self.model, self.provider, self.max_tokens, conversation=self.conversation
+            )
+            async for chunk in self.client.aio.chat_stream_async(
+                messages=messages,
                 model=self.model,
                 provider=self.provider,
                 max_tokens=self.max_tokens,
-                temperature=self.temperature
+                temperature=self.temperature,
+                priority=Priority.INTERACTIVE,
+                flow="chat",
+                conversation=self.conversation
             ):
-                full_response += chunk
-                self.response_chunk.emit(full_response)
+                self.emit_delta(chunk)
             
-            self.response_complete.emit(full_response)
+            self.commit()
         except Exception as e:
             self.error_occurred.emit(str(e))
 
@@ -70,6 +81,13 @@ class ChatPage(BasePage):
         header = self.create_header()
         layout.addLayout(header)
         
+        model_layout = QHBoxLayout()
+        model_layout.addWidget(QLabel("Model:"))
+        self.model_selector = ModelSelector()
+        model_layout.addWidget(self.model_selector)
+        model_layout.addStretch()
+        layout.addLayout(model_layout)
+        
         self.chat_widget = ChatWidget()
         layout.addWidget(self.chat_widget, 1)
         
@@ -132,9 +150,10 @@ class ChatPage(BasePage):
         self.conversation_history = item['data'].get("messages", [])
         
         self.chat_widget.clear_messages()
-        for msg in self.conversation_history:
-            is_user = msg["role"] == "user"
-            self.chat_widget.add_message(msg["content"], is_user=is_user, sender_name="You" if is_user else "AI")
+        self.chat_widget.add_messages(
+            (msg["content"], msg["role"] == "user", "You" if msg["role"] == "user" else "AI")
+            for msg in self.conversation_history
+        )
 
     def send_message(self):
         """Send a message to the AI."""
@@ -149,19 +168,17 @@ class ChatPage(BasePage):
         self.chat_widget.add_message(message, is_user=True, sender_name="You")
         self.message_input.clear()
         
-        self.conversation_history.append({"role": "user", "content": message})
-        self.save_history()
+        user_message = {"role": "user", "content": message}
+        self.conversation_history.append(user_message)
+        self.save_history(user_message)
         
         messages = [{"role": "system", "content": self.config.system_prompt}]
         messages.extend(self.conversation_history)
         
-        self.chat_widget.add_message("", is_user=False, sender_name="AI")
-        
         self.send_button.setEnabled(False)
         self.status_label.setText("AI is thinking...")
         
-        provider = self.config.chat_model_provider
-        model = self.config.openai_model if provider == "openai" else self.config.gemini_model
+        provider, model = self.current_model()
         
         self.chat_worker = ChatWorker(
             client=self._llm_client,
@@ -169,27 +186,64 @@ class ChatPage(BasePage):
             model=model,
             provider=provider,
             max_tokens=self.config.max_tokens,
-            temperature=self.config.temperature
+            temperature=self.config.temperature,
+            conversation=f"chat:{self.current_history_id}" if self.current_history_id else None,
+            history_id=self.current_history_id
         )
-        self.chat_worker.response_chunk.connect(self.on_response_chunk)
-        self.chat_worker.response_complete.connect(self.on_response_complete)
+        self.chat_widget.begin_stream(self.chat_worker.stream_id, is_user=False, sender_name="AI")
+        self.chat_worker.stream_delta.connect(self.on_response_delta)
+        self.chat_worker.stream_committed.connect(self.on_response_complete)
         self.chat_worker.error_occurred.connect(self.on_error)
         self.chat_worker.start()
     
-    def on_response_chunk(self, content: str):
-        """Handle streaming response chunks."""
-        self.chat_widget.update_last_message(content)
+    def current_model(self):
+        """``(provider, model)`` picked on this page, or the Settings default."""
+        provider = self.config.chat_model_provider
+        model = self.config.openai_model if provider == "openai" else self.config.gemini_model
+        return self.model_selector.selection(provider, model)
+    
+    def on_response_delta(self, stream: int, seq: int, text: str):
+        """Handle a streamed chunk of the reply."""
+        self.chat_widget.append_delta(stream, seq, text)
+        history = self._history_manager
+        history_id = self._reply_history_id(stream)
+        if not history or not history_id or not history.partial_checkpoint_due("chat", history_id):
+            return
+        # Empty once the chat was switched; the commit saves the whole reply then
+        content = self.chat_widget.stream_text()
+        if content:
+            history.checkpoint_partial("chat", history_id, {"role": "assistant", "content": content})
     
-    def on_response_complete(self, content: str):
+    def on_response_complete(self, stream: int, count: int, content: str):
         """Handle complete response."""
-        self.conversation_history.append({"role": "assistant", "content": content})
-        self.save_history()
-        
         self.send_button.setEnabled(True)
         self.status_label.setText("")
+        assistant_message = {"role": "assistant", "content": content}
+        history_id = self._reply_history_id(stream)
+        if not self.chat_widget.commit_stream(stream, count, content):
+            # The chat was cleared or switched while the reply streamed; the
+            # reply still completes the conversation it was asked in
+            if history_id and history_id == self.current_history_id:
+                self.chat_widget.add_message(content, is_user=False, sender_name="AI")
+                self.conversation_history.append(assistant_message)
+            if self._history_manager and history_id:
+                self._history_manager.append_message("chat", history_id, assistant_message)
+            return
+        self.conversation_history.append(assistant_message)
+        self.save_history(assistant_message)
+    
+    def _reply_history_id(self, stream: int):
+        """History item of the reply streamed as ``stream``."""
+        worker = self.chat_worker
+        return worker.history_id if worker is not None and worker.stream_id == stream else None
     
     def on_error(self, error_message: str):
         """Handle errors."""
+        worker = self.chat_worker
+        if self._history_manager and worker is not None and worker.history_id:
+            # The half reply must not come back as a message after a restart
+            self._history_manager.discard_partial("chat", worker.history_id)
+        self.chat_widget.end_stream()
         self.send_button.setEnabled(True)
         self.status_label.setText("")
         self.show_error("Error", f"Failed to get response: {error_message}")
@@ -202,15 +256,24 @@ class ChatPage(BasePage):
         self.conversation_history.clear()
         self.status_label.setText("New chat started")
         
-    def save_history(self):
-        """Save conversation to history."""
+    def save_history(self, new_message=None):
+        """Save conversation to history.
+        
+        When ``new_message`` is the only change since the last save, it is
+        appended through the history journal instead of rewriting the item.
+        """
         if not self._history_manager:
             return
+        
+        if self.current_history_id and new_message is not None:
+            self._history_manager.append_message("chat", self.current_history_id, new_message)
+            return
             
+        provider, model = self.current_model()
         data = {
             "messages": self.conversation_history,
-            "provider": self.config.chat_model_provider,
-            "model": self.config.openai_model if self.config.chat_model_provider == "openai" else self.config.gemini_model
+            "provider": provider,
+            "model": model
         }
         
         if self.current_history_id:
@@ -225,10 +288,4 @@ class ChatPage(BasePage):
                 
             item = self._history_manager.add_item("chat", title, data)
             self.current_history_id = item['id']
-            # Notify MainWindow to refresh Sidebar? 
-            # MainWindow doesn't listen to HistoryManager changes directly.
-            # I can emit a signal or call a method on MainWindow if I had a reference.
-            # Or use a global signal.
-            # But simpler: MainWindow reloads history when Sidebar is refreshed.
-            # But the Sidebar won't update automatically here.
-            # That's a minor issue.
+            # The sidebar picks the new item up from HistoryManager's change events
@@ -3,12 +3,15 @@
 import time
 from PyQt5.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame,
-    QPushButton, QTextEdit, QComboBox, QSplitter
+    QPushButton, QTextEdit, QSplitter
 )
 from PyQt5.QtCore import Qt, QThread, pyqtSignal
 
 from .base_page import BasePage
+from ..streaming import StreamingWorker
+from ...api.scheduler import Priority
 from ..widgets.chat_widget import ChatWidget
+from ..widgets.model_selector import ModelSelector
 from ...api.llm_client import LLMClient
 
 class CompareWorker(QThread):
@@ -32,9 +35,8 @@ class CompareWorker(QThread):
         # Given PyQt constraints, let's spawn two separate workers from the page instead.
         pass
 
-class SingleModelWorker(QThread):
-    """Worker for a single model."""
-    chunk_received = pyqtSignal(str)
+class SingleModelWorker(StreamingWorker):
+    """Streams one model's reply on the shared event loop with the delta protocol."""
     finished = pyqtSignal(float, int)
     error = pyqtSignal(str)
     
@@ -47,21 +49,24 @@ class SingleModelWorker(QThread):
         self.temperature = temperature
         self.max_tokens = max_tokens
         
-    def run(self):
+    async def run_async(self):
         start_time = time.time()
         token_count = 0
         try:
-            for chunk in self.client.chat_stream(
+            async for chunk in self.client.aio.chat_stream_async(
                 messages=self.message,
                 model=self.model,
                 provider=self.provider,
                 temperature=self.temperature,
-                max_tokens=self.max_tokens
+                max_tokens=self.max_tokens,
+                priority=Priority.BATCH,
+                flow=f"compare:{self.provider}:{self.model}"
             ):
-                self.chunk_received.emit(chunk)
+                self.emit_delta(chunk)
                 token_count += 1 # Very rough approximation
                 
             duration = time.time() - start_time
+            self.commit()
             self.finished.emit(duration, token_count)
             
         except Exception as e:
@@ -90,33 +95,18 @@ class CompareAIPage(BasePage):
         # Models Selection
         sel_layout = QHBoxLayout()
         
-        # Model 1
-        self.model1_provider = QComboBox()
-        self.model1_provider.addItems(["openai", "gemini"])
-        self.model1_model = QComboBox() # Populate based on provider
-        
-        # Model 2
-        self.model2_provider = QComboBox()
-        self.model2_provider.addItems(["openai", "gemini"])
-        self.model2_model = QComboBox()
+        # One provider/model picker per side; endpoints come from Settings
+        self.model1_selector = ModelSelector(allow_default=False)
+        self.model2_selector = ModelSelector(allow_default=False)
 
         sel_layout.addWidget(QLabel("Model 1:"))
-        sel_layout.addWidget(self.model1_provider)
-        sel_layout.addWidget(self.model1_model)
+        sel_layout.addWidget(self.model1_selector)
         sel_layout.addStretch()
         sel_layout.addWidget(QLabel("Model 2:"))
-        sel_layout.addWidget(self.model2_provider)
-        sel_layout.addWidget(self.model2_model)
+        sel_layout.addWidget(self.model2_selector)
         
         layout.addLayout(sel_layout)
         
-        self.model1_provider.currentTextChanged.connect(lambda t: self.update_models(1, t))
-        self.model2_provider.currentTextChanged.connect(lambda t: self.update_models(2, t))
-        
-        # Initial population
-        self.update_models(1, "openai")
-        self.update_models(2, "openai") # Default to openai for both initially
-        
         # Splitter for Chats
         splitter = QSplitter(Qt.Horizontal)
         
@@ -156,14 +146,6 @@ class CompareAIPage(BasePage):
         
         layout.addLayout(input_layout)
         
-    def update_models(self, index, provider):
-        combo = self.model1_model if index == 1 else self.model2_model
-        combo.clear()
-        if provider == "openai":
-            combo.addItems(["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"])
-        else:
-            combo.addItems(["gemini-2.0-flash", "gemini-1.5-pro", "gemini-1.5-flash"])
-            
     def start_comparison(self):
         message = self.input_field.toPlainText().strip()
         if not message:
@@ -175,8 +157,8 @@ class CompareAIPage(BasePage):
         self.input_field.clear()
         
         # Start Workers
-        self.start_worker(0, message, self.model1_provider.currentText(), self.model1_model.currentText())
-        self.start_worker(1, message, self.model2_provider.currentText(), self.model2_model.currentText())
+        self.start_worker(0, message, *self.model1_selector.selection())
+        self.start_worker(1, message, *self.model2_selector.selection())
         
     def start_worker(self, index, message, provider, model):
         if not self.llm_client:
@@ -193,19 +175,18 @@ class CompareAIPage(BasePage):
             chat_widget = self.chat1 if index == 0 else self.chat2
             stats_label = self.stats1 if index == 0 else self.stats2
             
-            # Add initial AI message
-            chat_widget.add_message("", is_user=False, sender_name=f"{model} ({provider})")
+            # Add initial AI message; deltas of this worker's stream fill it
+            chat_widget.begin_stream(worker.stream_id, is_user=False, sender_name=f"{model} ({provider})")
             
-            worker.chunk_received.connect(lambda c: chat_widget.update_last_message(
-                chat_widget.get_messages()[-1]["content"] + c
-            ))
+            worker.stream_delta.connect(chat_widget.append_delta)
+            worker.stream_committed.connect(chat_widget.commit_stream)
             
             worker.finished.connect(lambda d, t: self.update_stats(index, d, t))
             worker.error.connect(lambda e: self.on_worker_error(index, e))
             
             # Clean up existing worker if any
             if self.workers[index] and self.workers[index].isRunning():
-                self.workers[index].terminate()
+                self.workers[index].cancel()
                 
             self.workers[index] = worker
             worker.start()
@@ -216,6 +197,7 @@ class CompareAIPage(BasePage):
     def on_worker_error(self, index, error_message):
         """Handle worker error."""
         chat_widget = self.chat1 if index == 0 else self.chat2
+        chat_widget.end_stream()
         if chat_widget.get_messages() and not chat_widget.get_messages()[-1]["content"]:
             chat_widget.update_last_message(f"Connection error: {error_message}")
         else:
@@ -235,6 +217,10 @@ class CompareAIPage(BasePage):
         messages1 = data.get('messages1', [])
         messages2 = data.get('messages2', [])
         
+        for selector, key in ((self.model1_selector, 'model1'), (self.model2_selector, 'model2')):
+            choice = data.get(key) or {}
+            selector.select(choice.get('provider'), choice.get('model', ''))
+        
         self.chat1.clear_messages()
         self.chat2.clear_messages()
         
@@ -258,16 +244,18 @@ class CompareAIPage(BasePage):
         messages1 = self.chat1.get_messages()
         messages2 = self.chat2.get_messages()
         
+        provider1, model1 = self.model1_selector.selection()
+        provider2, model2 = self.model2_selector.selection()
         data = {
             "messages1": messages1,
             "messages2": messages2,
             "model1": {
-                "provider": self.model1_provider.currentText(),
-                "model": self.model1_model.currentText()
+                "provider": provider1,
+                "model": model1
             },
             "model2": {
-                "provider": self.model2_provider.currentText(),
-                "model": self.model2_model.currentText()
+                "provider": provider2,
+                "model": model2
             }
         }
         
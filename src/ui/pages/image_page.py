@@ -1,7 +1,6 @@
 """Image Generator page."""
 
 import os
-import requests
 from datetime import datetime
 
 from PyQt5.QtWidgets import (
@@ -9,15 +8,18 @@ from PyQt5.QtWidgets import (
     QTextEdit, QComboBox, QGroupBox, QFrame, QScrollArea,
     QGridLayout, QFileDialog, QSizePolicy, QWidget
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QSize
+from PyQt5.QtCore import Qt, pyqtSignal, QSize
 from PyQt5.QtGui import QFont, QPixmap, QImage, QColor, QPalette
 
 from .base_page import BasePage
+from ..async_worker import AsyncWorker
+from ...api.scheduler import Priority
+from ...api.http_pool import get_http_pool
 from ...config import AVAILABLE_IMAGE_SIZES
 
 
-class ImageGeneratorWorker(QThread):
-    """Worker thread for image generation."""
+class ImageGeneratorWorker(AsyncWorker):
+    """Generates an image on the shared event loop."""
     
     image_generated = pyqtSignal(str, str)
     error_occurred = pyqtSignal(str)
@@ -30,14 +32,16 @@ class ImageGeneratorWorker(QThread):
         self.size = size
         self.quality = quality
     
-    def run(self):
+    async def run_async(self):
         """Generate the image."""
         try:
-            urls = self.client.generate_image(
+            urls = await self.client.aio.generate_image_async(
                 prompt=self.prompt,
                 model=self.model,
                 size=self.size,
-                quality=self.quality
+                quality=self.quality,
+                priority=Priority.INTERACTIVE,
+                flow="image"
             )
             if urls:
                 self.image_generated.emit(urls[0], self.prompt)
@@ -48,10 +52,11 @@ class ImageGeneratorWorker(QThread):
 class ImageCard(QFrame):
     """Widget for displaying a generated image."""
     
-    def __init__(self, image_url: str, prompt: str, parent=None):
+    def __init__(self, image_url: str, prompt: str, http_pool=None, parent=None):
         super().__init__(parent)
         self.image_url = image_url
         self.prompt = prompt
+        self.http_pool = http_pool or get_http_pool()
         self.pixmap = None
         self.setup_ui()
         self.load_image()
@@ -94,7 +99,7 @@ class ImageCard(QFrame):
     def load_image(self):
         """Load image from URL."""
         try:
-            response = requests.get(self.image_url, timeout=30)
+            response = self.http_pool.get(self.image_url, timeout=30)
             if response.status_code == 200:
                 image = QImage()
                 image.loadFromData(response.content)
@@ -229,7 +234,7 @@ class ImageGeneratorPage(BasePage):
         for img_data in images:
             url = img_data.get("url")
             if url:
-                card = ImageCard(url, prompt)
+                card = ImageCard(url, prompt, self.http_pool)
                 self.generated_images.append(card)
                 row = (len(self.generated_images) - 1) // 3
                 col = (len(self.generated_images) - 1) % 3
@@ -266,7 +271,7 @@ class ImageGeneratorPage(BasePage):
         self.save_button.setEnabled(True)
         self.status_label.setText("Image generated successfully!")
         
-        card = ImageCard(url, prompt)
+        card = ImageCard(url, prompt, self.http_pool)
         self.generated_images.append(card)
         
         row = (len(self.generated_images) - 1) // 3
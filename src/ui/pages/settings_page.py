@@ -4,13 +4,43 @@ from PyQt5.QtWidgets import (
     QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QComboBox, QGroupBox, QSpinBox,
     QDoubleSpinBox, QTextEdit, QCheckBox, QScrollArea,
-    QWidget, QFormLayout, QFontComboBox
+    QWidget, QFormLayout, QFontComboBox, QTableWidget,
+    QTableWidgetItem, QHeaderView, QStyledItemDelegate
 )
 from PyQt5.QtCore import Qt, pyqtSignal
 from PyQt5.QtGui import QFont
 
 from .base_page import BasePage
 from ...config import AVAILABLE_MODELS
+from ...api.providers import registry
+
+# Columns of the custom endpoint table: (config key, header)
+ENDPOINT_COLUMNS = [
+    ("name", "Name"),
+    ("base_url", "Base URL"),
+    ("api_key", "API Key"),
+    ("models", "Models (comma-separated)"),
+    ("max_concurrency", "Max Concurrent"),
+]
+
+class PasswordDelegate(QStyledItemDelegate):
+    """Table cells holding secrets: shown as bullets, edited in a password field."""
+    
+    def displayText(self, value, locale):
+        # Fixed length, so the list does not give away how long a key is
+        return "\u2022" * 8 if value else ""
+    
+    def createEditor(self, parent, option, index):
+        editor = QLineEdit(parent)
+        editor.setEchoMode(QLineEdit.Password)
+        return editor
+
+
+CONTEXT_POLICY_LABELS = [
+    ("window", "Newest messages that fit"),
+    ("summary", "Newest messages + rolling summary"),
+    ("full", "Everything (no limit)"),
+]
 
 
 class SettingsPage(BasePage):
@@ -94,6 +124,17 @@ class SettingsPage(BasePage):
         self.temperature_spin.setDecimals(1)
         model_layout.addRow("Temperature:", self.temperature_spin)
         
+        self.context_policy_combo = QComboBox()
+        for policy, label in CONTEXT_POLICY_LABELS:
+            self.context_policy_combo.addItem(label, policy)
+        model_layout.addRow("Chat History:", self.context_policy_combo)
+        
+        self.context_max_tokens_spin = QSpinBox()
+        self.context_max_tokens_spin.setRange(0, 2000000)
+        self.context_max_tokens_spin.setSingleStep(1000)
+        self.context_max_tokens_spin.setSpecialValueText("Model limit")
+        model_layout.addRow("Max Prompt Tokens:", self.context_max_tokens_spin)
+        
         layout.addWidget(model_group)
         
         # System Prompts
@@ -151,6 +192,99 @@ class SettingsPage(BasePage):
         
         layout.addWidget(appearance_group)
         
+        # History retention
+        history_group = QGroupBox("History")
+        history_layout = QFormLayout(history_group)
+        history_layout.setSpacing(15)
+        
+        self.history_max_items_spin = QSpinBox()
+        self.history_max_items_spin.setRange(0, 100000)
+        self.history_max_items_spin.setSingleStep(100)
+        self.history_max_items_spin.setSpecialValueText("Unlimited")
+        history_layout.addRow("Max Items per Mode:", self.history_max_items_spin)
+        
+        self.history_max_age_spin = QSpinBox()
+        self.history_max_age_spin.setRange(0, 3650)
+        self.history_max_age_spin.setSuffix(" days")
+        self.history_max_age_spin.setSpecialValueText("Unlimited")
+        history_layout.addRow("Max Age:", self.history_max_age_spin)
+        
+        self.history_max_size_spin = QSpinBox()
+        self.history_max_size_spin.setRange(0, 100000)
+        self.history_max_size_spin.setSingleStep(50)
+        self.history_max_size_spin.setSuffix(" MB")
+        self.history_max_size_spin.setSpecialValueText("Unlimited")
+        history_layout.addRow("Max Total Size:", self.history_max_size_spin)
+        
+        history_note = QLabel("Older items move to a searchable archive when the app is idle.")
+        history_note.setStyleSheet("color: #8a8a8a;")
+        history_layout.addRow(history_note)
+        
+        layout.addWidget(history_group)
+        
+        # Response cache
+        cache_group = QGroupBox("Response Cache")
+        cache_layout = QFormLayout(cache_group)
+        cache_layout.setSpacing(15)
+        
+        self.response_cache_check = QCheckBox("Reuse replies to identical requests at temperature 0")
+        cache_layout.addRow(self.response_cache_check)
+        
+        self.response_cache_ttl_spin = QSpinBox()
+        self.response_cache_ttl_spin.setRange(1, 24 * 365)
+        self.response_cache_ttl_spin.setSuffix(" hours")
+        cache_layout.addRow("Keep Replies For:", self.response_cache_ttl_spin)
+        
+        self.response_cache_size_spin = QSpinBox()
+        self.response_cache_size_spin.setRange(1, 10000)
+        self.response_cache_size_spin.setSingleStep(10)
+        self.response_cache_size_spin.setSuffix(" MB")
+        cache_layout.addRow("Max Disk Size:", self.response_cache_size_spin)
+        
+        self.response_cache_stats_label = QLabel("")
+        self.response_cache_stats_label.setStyleSheet("color: #8a8a8a;")
+        cache_layout.addRow(self.response_cache_stats_label)
+        
+        layout.addWidget(cache_group)
+        
+        # OpenAI-compatible endpoints
+        endpoints_group = QGroupBox("Custom Endpoints")
+        endpoints_layout = QVBoxLayout(endpoints_group)
+        
+        endpoints_note = QLabel(
+            "OpenAI-compatible servers (vLLM, llama.cpp server, ...). "
+            "Each gets its own connection pool and can be picked on the Chat, AI-to-AI and Compare pages."
+        )
+        endpoints_note.setWordWrap(True)
+        endpoints_note.setStyleSheet("color: #8a8a8a;")
+        endpoints_layout.addWidget(endpoints_note)
+        
+        self.endpoints_table = QTableWidget(0, len(ENDPOINT_COLUMNS))
+        self.endpoints_table.setHorizontalHeaderLabels([header for _, header in ENDPOINT_COLUMNS])
+        self.endpoints_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.endpoints_table.verticalHeader().setVisible(False)
+        self.endpoints_table.setMinimumHeight(140)
+        key_column = [key for key, _ in ENDPOINT_COLUMNS].index("api_key")
+        self.endpoints_table.setItemDelegateForColumn(key_column, PasswordDelegate(self.endpoints_table))
+        endpoints_layout.addWidget(self.endpoints_table)
+        
+        endpoint_buttons = QHBoxLayout()
+        add_endpoint_button = QPushButton("Add Endpoint")
+        add_endpoint_button.setObjectName("secondaryButton")
+        add_endpoint_button.setCursor(Qt.PointingHandCursor)
+        add_endpoint_button.clicked.connect(lambda: self.add_endpoint_row())
+        endpoint_buttons.addWidget(add_endpoint_button)
+        
+        remove_endpoint_button = QPushButton("Remove Selected")
+        remove_endpoint_button.setObjectName("secondaryButton")
+        remove_endpoint_button.setCursor(Qt.PointingHandCursor)
+        remove_endpoint_button.clicked.connect(self.remove_endpoint_row)
+        endpoint_buttons.addWidget(remove_endpoint_button)
+        endpoint_buttons.addStretch()
+        endpoints_layout.addLayout(endpoint_buttons)
+        
+        layout.addWidget(endpoints_group)
+        
         # Misc
         misc_group = QGroupBox("Miscellaneous")
         misc_layout = QVBoxLayout(misc_group)
@@ -158,6 +292,24 @@ class SettingsPage(BasePage):
         self.auto_update_check = QCheckBox("Automatically check for updates on startup")
         misc_layout.addWidget(self.auto_update_check)
         
+        self.fast_streaming_check = QCheckBox("Fast streaming: read replies over plain SSE instead of the SDKs")
+        misc_layout.addWidget(self.fast_streaming_check)
+        
+        fps_layout = QHBoxLayout()
+        fps_layout.addWidget(QLabel("Streaming refresh rate:"))
+        self.stream_fps_spin = QSpinBox()
+        self.stream_fps_spin.setRange(5, 240)
+        self.stream_fps_spin.setSuffix(" fps")
+        self.stream_fps_spin.setToolTip("Streamed replies are redrawn at most this often; tokens in between are batched.")
+        fps_layout.addWidget(self.stream_fps_spin)
+        fps_layout.addStretch()
+        misc_layout.addLayout(fps_layout)
+        
+        misc_layout.addWidget(QLabel("HTTP Proxy (optional):"))
+        self.http_proxy_input = QLineEdit()
+        self.http_proxy_input.setPlaceholderText("http://127.0.0.1:8080")
+        misc_layout.addWidget(self.http_proxy_input)
+        
         layout.addWidget(misc_group)
         
         layout.addStretch()
@@ -194,10 +346,8 @@ class SettingsPage(BasePage):
         current_model = self.model_combo.currentText()
         self.model_combo.clear()
         
-        if provider == "openai":
-            self.model_combo.addItems(["gpt-4o", "gpt-4o-mini", "gpt-4-turbo", "gpt-3.5-turbo"])
-        elif provider == "gemini":
-            self.model_combo.addItems(["gemini-2.0-flash", "gemini-1.5-pro", "gemini-1.5-flash", "gemini-1.0-pro"])
+        if provider in registry.names("chat"):
+            self.model_combo.addItems(registry.get(provider).models)
             
     def load_settings(self):
         """Load current settings into the UI."""
@@ -223,6 +373,8 @@ class SettingsPage(BasePage):
         
         self.max_tokens_spin.setValue(self.config.max_tokens)
         self.temperature_spin.setValue(self.config.temperature)
+        self.set_context_policy(self.config.context_policy)
+        self.context_max_tokens_spin.setValue(self.config.context_max_tokens)
         
         self.system_prompt_input.setPlainText(self.config.system_prompt)
         self.ai1_prompt_input.setPlainText(self.config.ai1_system_prompt)
@@ -238,6 +390,20 @@ class SettingsPage(BasePage):
         self.font_combo.setCurrentFont(font)
         
         self.auto_update_check.setChecked(self.config.auto_check_updates)
+        self.http_proxy_input.setText(self.config.http_proxy)
+        self.fast_streaming_check.setChecked(self.config.fast_streaming)
+        self.stream_fps_spin.setValue(self.config.stream_max_fps)
+        
+        self.history_max_items_spin.setValue(self.config.history_max_items_per_mode)
+        self.history_max_age_spin.setValue(self.config.history_max_age_days)
+        self.history_max_size_spin.setValue(self.config.history_max_total_mb)
+        
+        self.response_cache_check.setChecked(self.config.response_cache_enabled)
+        self.response_cache_ttl_spin.setValue(self.config.response_cache_ttl_hours)
+        self.response_cache_size_spin.setValue(self.config.response_cache_max_mb)
+        self.update_cache_stats()
+        
+        self.set_endpoints(self.config.custom_endpoints)
     
     def save_settings(self):
         """Save settings to configuration."""
@@ -259,6 +425,8 @@ class SettingsPage(BasePage):
             gemini_model=gemini_model,
             max_tokens=self.max_tokens_spin.value(),
             temperature=self.temperature_spin.value(),
+            context_policy=self.context_policy_combo.currentData(),
+            context_max_tokens=self.context_max_tokens_spin.value(),
             system_prompt=self.system_prompt_input.toPlainText().strip(),
             ai1_system_prompt=self.ai1_prompt_input.toPlainText().strip(),
             ai2_system_prompt=self.ai2_prompt_input.toPlainText().strip(),
@@ -266,7 +434,17 @@ class SettingsPage(BasePage):
             ai2_name=self.ai2_name_input.text().strip(),
             theme=self.theme_combo.currentText(),
             font_family=self.font_combo.currentFont().family(),
-            auto_check_updates=self.auto_update_check.isChecked()
+            auto_check_updates=self.auto_update_check.isChecked(),
+            http_proxy=self.http_proxy_input.text().strip(),
+            fast_streaming=self.fast_streaming_check.isChecked(),
+            stream_max_fps=self.stream_fps_spin.value(),
+            history_max_items_per_mode=self.history_max_items_spin.value(),
+            history_max_age_days=self.history_max_age_spin.value(),
+            history_max_total_mb=self.history_max_size_spin.value(),
+            response_cache_enabled=self.response_cache_check.isChecked(),
+            response_cache_ttl_hours=self.response_cache_ttl_spin.value(),
+            response_cache_max_mb=self.response_cache_size_spin.value(),
+            custom_endpoints=self.get_endpoints()
         )
         
         self.settings_changed.emit()
@@ -293,6 +471,8 @@ class SettingsPage(BasePage):
         
         self.max_tokens_spin.setValue(defaults.max_tokens)
         self.temperature_spin.setValue(defaults.temperature)
+        self.set_context_policy(defaults.context_policy)
+        self.context_max_tokens_spin.setValue(defaults.context_max_tokens)
         
         self.system_prompt_input.setPlainText(defaults.system_prompt)
         self.ai1_prompt_input.setPlainText(defaults.ai1_system_prompt)
@@ -307,9 +487,74 @@ class SettingsPage(BasePage):
         self.font_combo.setCurrentFont(QFont("Segoe UI"))
         
         self.auto_update_check.setChecked(defaults.auto_check_updates)
+        self.http_proxy_input.setText(defaults.http_proxy)
+        self.fast_streaming_check.setChecked(defaults.fast_streaming)
+        self.stream_fps_spin.setValue(defaults.stream_max_fps)
+        
+        self.history_max_items_spin.setValue(defaults.history_max_items_per_mode)
+        self.history_max_age_spin.setValue(defaults.history_max_age_days)
+        self.history_max_size_spin.setValue(defaults.history_max_total_mb)
+        self.response_cache_check.setChecked(defaults.response_cache_enabled)
+        self.response_cache_ttl_spin.setValue(defaults.response_cache_ttl_hours)
+        self.response_cache_size_spin.setValue(defaults.response_cache_max_mb)
+        self.set_endpoints(defaults.custom_endpoints)
         
         self.status_label.setText("Settings reset to defaults (not saved yet)")
     
+    def add_endpoint_row(self, endpoint=None):
+        """Append an endpoint row, empty or filled from ``endpoint``."""
+        endpoint = endpoint or {}
+        row = self.endpoints_table.rowCount()
+        self.endpoints_table.insertRow(row)
+        for column, (key, _) in enumerate(ENDPOINT_COLUMNS):
+            value = endpoint.get(key, "")
+            if isinstance(value, (list, tuple)):
+                value = ", ".join(value)
+            self.endpoints_table.setItem(row, column, QTableWidgetItem(str(value) if value else ""))
+    
+    def remove_endpoint_row(self):
+        """Remove the selected endpoint rows."""
+        rows = sorted({index.row() for index in self.endpoints_table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            self.endpoints_table.removeRow(row)
+    
+    def set_endpoints(self, endpoints):
+        """Fill the endpoint table from ``AppConfig.custom_endpoints``."""
+        self.endpoints_table.setRowCount(0)
+        for endpoint in endpoints:
+            self.add_endpoint_row(endpoint)
+    
+    def get_endpoints(self):
+        """Endpoint rows with a name and base URL, as config entries."""
+        endpoints = []
+        for row in range(self.endpoints_table.rowCount()):
+            values = {}
+            for column, (key, _) in enumerate(ENDPOINT_COLUMNS):
+                item = self.endpoints_table.item(row, column)
+                values[key] = item.text().strip() if item else ""
+            if not values["name"] or not values["base_url"]:
+                continue
+            values["models"] = [m.strip() for m in values["models"].split(",") if m.strip()]
+            values["max_concurrency"] = int(values["max_concurrency"]) if values["max_concurrency"].isdigit() else 0
+            endpoints.append(values)
+        return endpoints
+    
+    def set_context_policy(self, policy: str):
+        index = self.context_policy_combo.findData(policy)
+        self.context_policy_combo.setCurrentIndex(max(index, 0))
+    
+    def update_cache_stats(self):
+        """Show the response cache's hit and miss counts."""
+        cache = self._llm_client.cache if self._llm_client else None
+        if cache is None:
+            self.response_cache_stats_label.setText("Cache is off.")
+            return
+        stats = cache.stats()
+        self.response_cache_stats_label.setText(
+            f"{stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['disk_items']} replies ({stats['disk_bytes'] / (1024 * 1024):.1f} MB) on disk"
+        )
+    
     def on_theme_changed(self, theme: str):
         """Handle theme change."""
         self.theme_changed.emit(theme)
@@ -22,10 +22,14 @@ class UpdateCheckerWorker(QThread):
     no_update = pyqtSignal()
     error_occurred = pyqtSignal(str)
     
+    def __init__(self, http_pool):
+        super().__init__()
+        self.http_pool = http_pool
+    
     def run(self):
         """Check for updates."""
         try:
-            response = requests.get(GITHUB_REPO_URL, timeout=10)
+            response = self.http_pool.get(GITHUB_REPO_URL, timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -163,7 +167,7 @@ class UpdatesPage(BasePage):
         self.release_notes.setVisible(False)
         self.download_button.setVisible(False)
         
-        self.update_worker = UpdateCheckerWorker()
+        self.update_worker = UpdateCheckerWorker(self.http_pool)
         self.update_worker.update_found.connect(self.on_update_found)
         self.update_worker.no_update.connect(self.on_no_update)
         self.update_worker.error_occurred.connect(self.on_error)
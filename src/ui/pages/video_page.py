@@ -1,7 +1,6 @@
 """Video Generator page."""
 
 import os
-import requests
 import webbrowser
 from datetime import datetime
 
@@ -10,14 +9,15 @@ from PyQt5.QtWidgets import (
     QTextEdit, QComboBox, QGroupBox, QProgressBar,
     QCheckBox, QListWidget, QListWidgetItem, QFileDialog
 )
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer
 from PyQt5.QtGui import QFont
 
 from .base_page import BasePage
+from ..async_worker import AsyncWorker
 
 
-class VideoGeneratorWorker(QThread):
-    """Worker thread for video generation."""
+class VideoGeneratorWorker(AsyncWorker):
+    """Generates a video and polls for it on the shared event loop."""
     
     status_update = pyqtSignal(str, str)
     video_ready = pyqtSignal(str, str, str)
@@ -30,10 +30,10 @@ class VideoGeneratorWorker(QThread):
         self.aspect_ratio = aspect_ratio
         self.loop = loop
     
-    def run(self):
+    async def run_async(self):
         """Generate the video."""
         try:
-            result = self.client.generate_video(
+            result = await self.client.generate_video_async(
                 prompt=self.prompt,
                 aspect_ratio=self.aspect_ratio,
                 loop=self.loop
@@ -46,7 +46,7 @@ class VideoGeneratorWorker(QThread):
             generation_id = result.id
             self.status_update.emit(generation_id, "Video generation started...")
             
-            final_result = self.client.wait_for_completion(
+            final_result = await self.client.wait_for_completion_async(
                 generation_id=generation_id,
                 timeout=600,
                 poll_interval=10,
@@ -289,7 +289,7 @@ class VideoGeneratorPage(BasePage):
         if file_path:
             try:
                 self.status_label.setText("Downloading video...")
-                response = requests.get(current_item.url, timeout=120)
+                response = self.http_pool.get(current_item.url, timeout=120)
                 with open(file_path, "wb") as f:
                     f.write(response.content)
                 self.show_info("Success", f"Video saved to: {file_path}")
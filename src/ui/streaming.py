@@ -0,0 +1,197 @@
+"""Delta protocol for streamed replies between workers and chat widgets.
+
+A worker sends each reply as a numbered sequence of appended chunks
+followed by one commit:
+
+- ``stream_delta(stream, seq, text)``: ``text`` extends the reply;
+  ``seq`` counts 0, 1, 2, ... within the reply.
+- ``stream_committed(stream, count, text)``: the reply is complete after
+  ``count`` deltas and ``text`` is all of it.
+
+``stream`` identifies the reply, so chunks still queued from a cancelled
+worker never land in a newer message. Each signal carries only new text;
+the receiver keeps the chunks in a StreamBuffer and joins them only when
+it needs the whole string. The commit's text is authoritative if a delta
+went missing.
+
+Both ends are paced to the display: a worker merges chunks into at most
+one delta per frame and holds further text while the GUI has not yet
+handled the deltas already queued, and a FrameCoalescer repaints a
+widget at most once per frame however many deltas arrive.
+"""
+
+import asyncio
+import itertools
+import threading
+import time
+from typing import Callable, List, Optional
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from .async_worker import AsyncWorker
+
+DEFAULT_MAX_FPS = 60
+MAX_UNACKED_DELTAS = 2  # deltas queued for the GUI before a worker holds back
+
+_stream_ids = itertools.count(1)
+_max_fps = DEFAULT_MAX_FPS
+
+
+def set_max_fps(fps: int) -> None:
+    """Cap on streamed-text updates per second, for workers and widgets."""
+    global _max_fps
+    _max_fps = max(1, int(fps))
+
+
+def frame_interval() -> float:
+    """Seconds between two streamed-text updates."""
+    return 1.0 / _max_fps
+
+
+class StreamBuffer:
+    """Append-only text kept as a list of chunks, joined when read."""
+
+    __slots__ = ("stream", "next_seq", "gap", "_chunks", "_length")
+
+    def __init__(self, stream: int):
+        self.stream = stream
+        self.next_seq = 0
+        self.gap = False  # a delta was skipped; wait for the commit's text
+        self._chunks: List[str] = []
+        self._length = 0
+
+    def append(self, seq: int, text: str) -> bool:
+        """Add delta ``seq``; False for a duplicate that was already applied."""
+        if seq < self.next_seq:
+            return False
+        if seq > self.next_seq:
+            self.gap = True
+        self._chunks.append(text)
+        self._length += len(text)
+        self.next_seq = seq + 1
+        return True
+
+    def text(self) -> str:
+        """The whole text; joined chunks are kept so the next read is cheaper."""
+        if len(self._chunks) > 1:
+            self._chunks[:] = ["".join(self._chunks)]
+        return self._chunks[0] if self._chunks else ""
+
+    def __len__(self) -> int:
+        return self._length
+
+
+class FrameCoalescer(QObject):
+    """Calls ``apply`` at most once per frame while requests keep coming."""
+
+    def __init__(self, apply: Callable[[], None], parent=None):
+        super().__init__(parent)
+        self._apply = apply
+        self._last = 0.0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._fire)
+
+    def request(self) -> None:
+        """Ask for an ``apply`` at the next frame."""
+        if self._timer.isActive():
+            return
+        wait = frame_interval() - (time.monotonic() - self._last)
+        self._timer.start(max(0, int(wait * 1000)))
+
+    def flush(self) -> None:
+        """Run a pending ``apply`` now."""
+        if self._timer.isActive():
+            self._timer.stop()
+            self._fire()
+
+    def cancel(self) -> None:
+        self._timer.stop()
+
+    def _fire(self) -> None:
+        self._last = time.monotonic()
+        self._apply()
+
+
+class StreamingWorker(AsyncWorker):
+    """AsyncWorker that reports replies with the delta protocol.
+
+    ``stream_id`` is valid from construction, so a page can open the
+    receiving stream before starting the worker; workers producing several
+    replies call ``new_stream`` before each. ``emit_delta`` and ``commit``
+    must be called on the shared loop, i.e. from ``run_async``.
+    """
+
+    stream_delta = pyqtSignal(int, int, str)  # stream, seq, text
+    stream_committed = pyqtSignal(int, int, str)  # stream, delta count, full text
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._unacked = 0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        # Runs on the GUI thread once the receivers got the delta
+        self.stream_delta.connect(self._delivered)
+        self.new_stream()
+
+    def new_stream(self) -> int:
+        """Start a new reply and return its stream id."""
+        self._cancel_flush()
+        self.stream_id = next(_stream_ids)
+        self._seq = 0
+        self._chunks: List[str] = []
+        self._pending: List[str] = []
+        self._last_flush = 0.0
+        return self.stream_id
+
+    def emit_delta(self, text: str) -> None:
+        """Queue ``text``; it is sent merged with its neighbours at frame rate."""
+        self._chunks.append(text)
+        self._pending.append(text)
+        self._maybe_flush()
+
+    def commit(self) -> str:
+        """Send what is still pending, then the commit event; return the reply."""
+        self._cancel_flush()
+        if self._pending:
+            self._flush()
+        text = "".join(self._chunks)
+        self.stream_committed.emit(self.stream_id, self._seq, text)
+        return text
+
+    def _maybe_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        wait = frame_interval() - (time.monotonic() - self._last_flush)
+        with self._lock:
+            backlog = self._unacked >= MAX_UNACKED_DELTAS
+        if wait <= 0 and not backlog:
+            self._flush()
+            return
+        # Too soon, or the GUI is behind: try again a frame later
+        self._flush_handle = asyncio.get_running_loop().call_later(
+            max(wait, frame_interval()) if backlog else wait, self._deferred_flush
+        )
+
+    def _deferred_flush(self) -> None:
+        self._flush_handle = None
+        if self._pending and not (self._future is not None and self._future.done()):
+            self._maybe_flush()
+
+    def _flush(self) -> None:
+        text = "".join(self._pending)
+        self._pending.clear()
+        self._last_flush = time.monotonic()
+        with self._lock:
+            self._unacked += 1
+        self.stream_delta.emit(self.stream_id, self._seq, text)
+        self._seq += 1
+
+    def _cancel_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+    def _delivered(self, stream: int, seq: int, text: str) -> None:
+        with self._lock:
+            self._unacked = max(0, self._unacked - 1)
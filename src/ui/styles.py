@@ -58,25 +58,29 @@ class StyleSheet:
             text-transform: uppercase;
         }
 
-        QPushButton#historyItem {
+        QListView#historyList {
+            background: transparent;
+            border: none;
+            outline: none;
+        }
+        
+        QListView#historyList::item {
             background-color: transparent;
             color: #b0b0b0;
             border: none;
             padding: 8px 12px;
-            text-align: left;
             border-radius: 4px;
             margin: 2px 5px;
         }
         
-        QPushButton#historyItem:hover {
+        QListView#historyList::item:hover {
             background-color: #0f3460;
             color: #eaeaea;
         }
         
-        QPushButton#historyItem:checked {
+        QListView#historyList::item:selected {
             background-color: #0f3460;
             color: #e94560;
-            font-weight: bold;
         }
         
         /* Settings Button in Sidebar */
@@ -347,25 +351,29 @@ class StyleSheet:
             text-transform: uppercase;
         }
 
-        QPushButton#historyItem {
+        QListView#historyList {
+            background: transparent;
+            border: none;
+            outline: none;
+        }
+        
+        QListView#historyList::item {
             background-color: transparent;
             color: #636e72;
             border: none;
             padding: 8px 12px;
-            text-align: left;
             border-radius: 4px;
             margin: 2px 5px;
         }
         
-        QPushButton#historyItem:hover {
+        QListView#historyList::item:hover {
             background-color: #e0e0e0;
             color: #2d3436;
         }
         
-        QPushButton#historyItem:checked {
+        QListView#historyList::item:selected {
             background-color: #e0e0e0;
             color: #e94560;
-            font-weight: bold;
         }
         
         /* Settings Button in Sidebar */
@@ -1,7 +1,9 @@
 """Custom widgets for RoleAI."""
 
-from .chat_widget import ChatWidget, MessageBubble
+from .chat_widget import ChatWidget
 from .topbar import TopBar
 from .history_sidebar import HistorySidebar
+from .export_dialog import HistoryExportDialog
+from .model_selector import ModelSelector
 
-__all__ = ["ChatWidget", "MessageBubble", "TopBar", "HistorySidebar"]
+__all__ = ["ChatWidget", "TopBar", "HistorySidebar", "HistoryExportDialog", "ModelSelector"]
@@ -1,189 +1,766 @@
 """Chat widget components."""
 
 import re
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
 import markdown
 import pyperclip
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QFrame,
-    QScrollArea, QSizePolicy, QTextBrowser, QPushButton, QApplication
+    QApplication, QWidget, QVBoxLayout, QFrame, QTextBrowser, QMenu, QStyledItemDelegate,
+    QStyleOptionViewItem, QAbstractScrollArea
+)
+from PyQt5.QtCore import (
+    Qt, pyqtSignal, QAbstractListModel, QModelIndex, QPointF, QRect, QRectF, QSize, QUrl
+)
+from PyQt5.QtGui import (
+    QFont, QFontMetrics, QTextCursor, QTextBlockFormat, QTextCharFormat, QTextDocument,
+    QAbstractTextDocumentLayout, QColor, QPalette, QPainter, QPainterPath, QPen, QDesktopServices,
+    QMouseEvent, QRegion
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QPropertyAnimation, QEasingCurve
-from PyQt5.QtGui import QFont, QTextCursor
 
-class CodeBlock(QFrame):
-    """Widget for displaying code blocks with copy button."""
+from ..streaming import FrameCoalescer, StreamBuffer
+
+CODE_FENCE = re.compile(r"```(\w+)?\n(.*?)```", re.DOTALL)
+OPEN_FENCE = re.compile(r"```(\w+)?\n")
+# A blank line followed by a line that cannot continue a list or indented block
+MARKDOWN_BREAK = re.compile(r"\n[ \t]*\n(?=[^\s\-*+\d])")
+# Reference-style link definitions apply to the whole text
+REFERENCE_DEFINITION = re.compile(r"^ {0,3}\[[^\]]+\]:", re.M)
+MARKDOWN_EXTENSIONS = ['fenced_code', 'nl2br']
+
+
+def split_parts(text: str):
+    """Split ``text`` into text and code parts.
+
+    Returns ``(parts, closed, closed_end)``: the first ``closed`` parts end
+    at offset ``closed_end`` with a closing fence and are final. The parts
+    after them, some text and a code block whose fence is still open, may
+    change as more text is appended.
+    """
+    parts = []
+    last_end = 0
+    for match in CODE_FENCE.finditer(text):
+        start, end = match.span()
+        if text[last_end:start].strip():
+            parts.append({"type": "text", "content": text[last_end:start]})
+        parts.append({"type": "code", "language": match.group(1) or "text", "content": match.group(2)})
+        last_end = end
+    closed = len(parts)
+    
+    tail = text[last_end:]
+    opening = OPEN_FENCE.search(tail)
+    if opening:
+        if tail[:opening.start()].strip():
+            parts.append({"type": "text", "content": tail[:opening.start()]})
+        # Backticks at the end may be the start of the closing fence
+        code = tail[opening.end():].rstrip("`")
+        parts.append({"type": "code", "language": opening.group(1) or "text", "content": code})
+    elif tail.strip():
+        parts.append({"type": "text", "content": tail})
+    return parts, closed, last_end
+
+
+class MarkdownDocument(QTextDocument):
+    """Markdown text whose document grows as the source is appended to.
+
+    Blocks before the last paragraph break are converted once and stay in
+    the document; only the text after that break is converted again and
+    replaced when more arrives. Text with reference-style link definitions
+    is always converted as a whole.
+    """
     
-    def __init__(self, code: str, language: str = "", parent=None):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.code = code
-        self.language = language
-        self.setup_ui()
-        
-    def setup_ui(self):
-        self.setStyleSheet("""
-            QFrame {
-                background-color: #0d1117;
-                border-radius: 6px;
-                border: 1px solid #30363d;
-            }
-        """)
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(0, 0, 0, 0)
-        layout.setSpacing(0)
-        
-        # Header
-        header = QFrame()
-        header.setStyleSheet("background-color: #161b22; border-top-left-radius: 6px; border-top-right-radius: 6px; border-bottom: 1px solid #30363d;")
-        header_layout = QHBoxLayout(header)
-        header_layout.setContentsMargins(10, 5, 10, 5)
+        self.source = ""
+        self._settled = 0  # characters of source whose HTML is final
+        self._settled_pos = 0  # document position where that HTML ends
+    
+    def set_markdown(self, text: str):
+        """Show markdown ``text``."""
+        if text == self.source:
+            return
+        whole = REFERENCE_DEFINITION.search(text) is not None
+        if not text.startswith(self.source[:self._settled]) or whole and self._settled:
+            self.clear()
+            self._settled = self._settled_pos = 0
         
-        lang_label = QLabel(self.language or "text")
-        lang_label.setStyleSheet("color: #8b949e; font-family: 'Segoe UI', sans-serif; font-size: 12px; font-weight: bold; border: none;")
-        header_layout.addWidget(lang_label)
+        cursor = QTextCursor(self)
+        cursor.setPosition(self._settled_pos)
+        cursor.movePosition(QTextCursor.End, QTextCursor.KeepAnchor)
+        cursor.removeSelectedText()
         
-        header_layout.addStretch()
+        settle = self._settled
+        if not whole:
+            for match in MARKDOWN_BREAK.finditer(text, self._settled + 1):
+                settle = match.start()
+        if settle > self._settled:
+            self._insert(cursor, text[self._settled:settle])
+            self._settled, self._settled_pos = settle, cursor.position()
+        self._insert(cursor, text[self._settled:])
+        self.source = text
+    
+    def _insert(self, cursor: QTextCursor, source: str):
+        html = markdown.markdown(source, extensions=MARKDOWN_EXTENSIONS)
+        if not html:
+            return
+        if cursor.position() > 0:
+            # A plain block, so the new HTML does not continue a list or heading
+            cursor.insertBlock(QTextBlockFormat(), QTextCharFormat())
+        cursor.insertHtml(html)
+
+
+class CodeDocument(QTextDocument):
+    """Plain-text code; appended code is inserted at the end of the document."""
+    
+    def __init__(self, code: str = "", parent=None):
+        super().__init__(parent)
+        self.code = ""
+        self.set_code(code)
+    
+    def set_code(self, code: str) -> bool:
+        """Show ``code``; False if it was already shown."""
+        if code == self.code:
+            return False
+        if code.startswith(self.code):
+            cursor = QTextCursor(self)
+            cursor.movePosition(QTextCursor.End)
+            cursor.insertText(code[len(self.code):])
+        else:
+            self.setPlainText(code)
+        self.code = code
+        return True
+
+
+MessageRole = Qt.UserRole + 1
+
+# AI bubble background and border per theme; user bubbles are the accent colour
+AI_BUBBLE_COLORS = {
+    "dark": ("#1f2a48", "#0f3460"),
+    "light": ("#f1f2f6", "#dfe6e9"),
+}
+USER_BUBBLE_COLOR = "#e94560"
+LINK_COLOR = "#58a6ff"
+# Code block text and background
+CODE_COLORS = ("#c9d1d9", "#0d1117")
+CODE_RADIUS = 6
+
+
+@dataclass(eq=False)
+class TranscriptMessage:
+    """One row of a TranscriptModel."""
+    
+    content: str
+    is_user: bool = False
+    sender_name: str = ""
+    heights: Dict[int, int] = field(default_factory=dict)  # row width -> painted height
+    estimates: Dict[int, int] = field(default_factory=dict)  # row width -> guess before painting
+
+
+class TranscriptModel(QAbstractListModel):
+    """Messages of a chat transcript; the view paints only the visible rows."""
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._messages = []
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._messages)
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        message = self._messages[index.row()]
+        if role == Qt.DisplayRole:
+            return message.content
+        if role == MessageRole:
+            return message
+        return None
+    
+    def append(self, messages: Iterable[TranscriptMessage]) -> int:
+        """Add messages at the end in one insert; returns the last row."""
+        messages = list(messages)
+        if messages:
+            first = len(self._messages)
+            self.beginInsertRows(QModelIndex(), first, first + len(messages) - 1)
+            self._messages.extend(messages)
+            self.endInsertRows()
+        return len(self._messages) - 1
+    
+    def message(self, row: int) -> TranscriptMessage:
+        return self._messages[row]
+    
+    def set_content(self, row: int, content: str):
+        """Change the text of a row (a streamed reply)."""
+        message = self._messages[row]
+        if content == message.content:
+            return
+        message.content = content
+        message.heights.clear()
+        message.estimates.clear()
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+    
+    def clear(self):
+        self.beginResetModel()
+        self._messages = []
+        self.endResetModel()
+
+
+class MessageLayout:
+    """Documents for the parts of one message, painted without widgets.
+
+    Parts closed by a code fence are final; when text is appended only the
+    parts after them are split again, and their documents are updated in
+    place while their type stays the same.
+    """
+    
+    PART_SPACING = 10
+    CODE_HEADER = 28
+    CODE_PADDING = 10
+    
+    def __init__(self, text_font: QFont, code_font: QFont):
+        self.text_font = text_font
+        self.code_font = code_font
+        self.text = None
+        self.positions = []  # (type, document, top, height) from the last layout()
+        self._reset_parts()
+    
+    def set_text(self, text: str):
+        """Show ``text``; appended text only re-renders the parts still open."""
+        if text == self.text:
+            return
+        if self.text is None or not text.startswith(self.text):
+            self._reset_parts()
+        self.text = text
         
-        copy_btn = QPushButton("Copy")
-        copy_btn.setCursor(Qt.PointingHandCursor)
-        copy_btn.setStyleSheet("""
-            QPushButton {
-                background-color: transparent;
-                color: #8b949e;
-                border: none;
-                font-size: 12px;
-            }
-            QPushButton:hover {
-                color: #58a6ff;
-            }
-        """)
-        copy_btn.clicked.connect(self.copy_code)
-        header_layout.addWidget(copy_btn)
+        parts, closed, closed_end = split_parts(text[self._closed_end:])
+        del self._parts[self._closed + len(parts):]
+        for index, part in enumerate(parts, self._closed):
+            key = (part["type"], part.get("language"))
+            if index < len(self._parts) and self._parts[index][0] == key:
+                doc = self._parts[index][1]
+            else:
+                del self._parts[index:]
+                doc = self._create_part(part)
+                self._parts.append((key, doc))
+            if part["type"] == "code":
+                doc.set_code(part["content"])
+            else:
+                doc.set_markdown(part["content"])
+        self._closed += closed
+        self._closed_end += closed_end
+    
+    def layout(self, width: int) -> int:
+        """Lay the parts out ``width`` pixels wide; returns their height."""
+        self.positions = []
+        top = 0
+        for (kind, _), doc in self._parts:
+            if self.positions:
+                top += self.PART_SPACING
+            doc.setTextWidth(width)
+            height = int(doc.size().height()) + (self.CODE_HEADER if kind == "code" else 0)
+            self.positions.append((kind, doc, top, height))
+            top += height
+        return top
+    
+    def _reset_parts(self):
+        self._parts = []  # ((type, language), document) per part
+        self._closed = 0  # leading parts that can no longer change
+        self._closed_end = 0  # offset in the text where those parts end
+    
+    def _create_part(self, part):
+        if part["type"] == "code":
+            doc = CodeDocument()
+            doc.setDefaultFont(self.code_font)
+            doc.setDocumentMargin(self.CODE_PADDING)
+            doc.language = part["language"]
+        else:
+            doc = MarkdownDocument()
+            doc.setDefaultFont(self.text_font)
+            doc.setDefaultStyleSheet(f"a {{ color: {LINK_COLOR}; }}")
+        return doc
+
+
+class MessageDelegate(QStyledItemDelegate):
+    """Paints TranscriptModel rows as chat bubbles.
+    
+    Documents are built only for rows that get painted, and only the most
+    recently painted ones are kept. A row's height is measured when it is
+    painted and cached per width on its message; rows not painted at a
+    width yet use an estimate from the text length.
+    """
+    
+    MARGIN_X = 20
+    SPACING = 15
+    PADDING = 12
+    NAME_SPACING = 8
+    RADIUS = 12
+    MIN_BUBBLE_WIDTH = 300
+    BUBBLE_SHARE = 0.8
+    CACHED_LAYOUTS = 64
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.name_font = QFont("Segoe UI", 10, QFont.Bold)
+        self.text_font = QFont("Segoe UI", 11)
+        self.code_font = QFont("Consolas")
+        self.code_font.setStyleHint(QFont.Monospace)
+        self.code_font.setPixelSize(13)
+        self.label_font = QFont("Segoe UI")
+        self.label_font.setPixelSize(12)
+        self.label_font.setBold(True)
+        self._layouts = OrderedDict()  # TranscriptMessage -> MessageLayout, oldest first
+    
+    def clear(self):
+        """Drop the cached layouts (the transcript was cleared)."""
+        self._layouts.clear()
+    
+    def layout_for(self, message: TranscriptMessage) -> MessageLayout:
+        layout = self._layouts.pop(message, None)
+        if layout is None:
+            layout = MessageLayout(self.text_font, self.code_font)
+            if len(self._layouts) >= self.CACHED_LAYOUTS:
+                self._layouts.popitem(last=False)
+        self._layouts[message] = layout
+        layout.set_text(message.content)
+        return layout
+    
+    def sizeHint(self, option, index):
+        message = index.data(MessageRole)
+        width = option.rect.width()
+        height = message.heights.get(width) or self._estimate(message, width)
+        return QSize(width, height)
+    
+    def paint(self, painter, option, index):
+        message = index.data(MessageRole)
+        width = option.rect.width()
+        layout = self.layout_for(message)
+        height = self._measure(message, layout, width)
+        if height != option.rect.height():
+            self.sizeHintChanged.emit(index)
         
-        layout.addWidget(header)
+        bubble = self._bubble_rect(option.rect, message.is_user, height)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        self._draw_bubble(painter, bubble, message, option.palette)
         
-        # Code Content
-        content = QTextBrowser()
-        content.setPlainText(self.code)
-        content.setReadOnly(True)
-        content.setStyleSheet("""
-            QTextBrowser {
-                background-color: transparent;
-                color: #c9d1d9;
-                font-family: 'Consolas', 'Monaco', monospace;
-                font-size: 13px;
-                border: none;
-                padding: 10px;
-            }
-        """)
-        content.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        # Adjust height to fit content
-        doc_height = content.document().size().height()
-        content.setFixedHeight(int(doc_height + 20))
+        if message.sender_name:
+            painter.setFont(self.name_font)
+            painter.setPen(QColor("#ffffff" if message.is_user else USER_BUBBLE_COLOR))
+            name_rect = QRectF(bubble.left() + self.PADDING, bubble.top() + self.PADDING,
+                               bubble.width() - 2 * self.PADDING, QFontMetrics(self.name_font).height())
+            painter.drawText(name_rect, Qt.AlignLeft, message.sender_name)
         
-        layout.addWidget(content)
+        for kind, doc, area in self._part_areas(bubble, message, layout):
+            text_color = self.part_colors(message, kind, option.palette)[0]
+            if kind == "code":
+                self._draw_code(painter, doc, area.adjusted(0, -MessageLayout.CODE_HEADER, 0, 0))
+            self._draw_document(painter, doc, area.left(), area.top(), text_color)
+        painter.restore()
+    
+    def part_areas(self, rect, message: TranscriptMessage) -> Iterator[Tuple[str, QTextDocument, QRectF]]:
+        """``(type, document, area)`` per part of a row at ``rect``.
         
-    def copy_code(self):
-        pyperclip.copy(self.code)
-        # Optional: Feedback (Change button text temporarily)
-
-class MessageBubble(QFrame):
-    """A chat message bubble widget."""
+        ``area`` is where the document is drawn; for code that is below
+        the header with the language and "Copy".
+        """
+        layout = self.layout_for(message)
+        height = self._measure(message, layout, rect.width())
+        return self._part_areas(self._bubble_rect(rect, message.is_user, height), message, layout)
     
-    def __init__(self, message: str, is_user: bool = False, sender_name: str = "", parent=None):
-        super().__init__(parent)
-        self.is_user = is_user
-        self.sender_name = sender_name
-        self.full_text = message
-        self.setup_ui()
-        self.render_content(message)
+    def part_colors(self, message: TranscriptMessage, kind: str, palette: QPalette) -> Tuple[QColor, QColor]:
+        """Text and background colour of a part."""
+        if kind == "code":
+            return QColor(CODE_COLORS[0]), QColor(CODE_COLORS[1])
+        if message.is_user:
+            return QColor("white"), QColor(USER_BUBBLE_COLOR)
+        return palette.color(QPalette.Text), QColor(self._ai_colors(palette)[0])
     
-    def setup_ui(self):
-        """Initialize the UI layout."""
-        self.layout = QVBoxLayout(self)
-        self.layout.setContentsMargins(12, 12, 12, 12)
-        self.layout.setSpacing(8)
-        
-        if self.is_user:
-            self.setObjectName("chatBubbleUser")
+    def hit_test(self, rect, message: TranscriptMessage, pos) -> Optional[Tuple[str, str]]:
+        """``("link", url)`` or ``("copy", code)`` under ``pos`` in a row at ``rect``."""
+        for kind, doc, area in self.part_areas(rect, message):
+            if kind == "code":
+                copy = QRectF(area.right() - 60, area.top() - MessageLayout.CODE_HEADER, 60, MessageLayout.CODE_HEADER)
+                if copy.contains(QPointF(pos)):
+                    return "copy", doc.code
+            else:
+                anchor = doc.documentLayout().anchorAt(QPointF(pos) - area.topLeft())
+                if anchor:
+                    return "link", anchor
+        return None
+    
+    def _part_areas(self, bubble: QRectF, message: TranscriptMessage, layout: MessageLayout):
+        x = bubble.left() + self.PADDING
+        y = bubble.top() + self.PADDING
+        if message.sender_name:
+            y += QFontMetrics(self.name_font).height() + self.NAME_SPACING
+        for kind, doc, top, part_height in layout.positions:
+            header = MessageLayout.CODE_HEADER if kind == "code" else 0
+            yield kind, doc, QRectF(x, y + top + header, doc.textWidth(), part_height - header)
+    
+    @staticmethod
+    def _ai_colors(palette: QPalette) -> Tuple[str, str]:
+        # Themes set the text colour; light text means a dark theme
+        dark = palette.color(QPalette.Text).lightness() > 128
+        return AI_BUBBLE_COLORS["dark" if dark else "light"]
+    
+    def _bubble_width(self, width: int) -> int:
+        available = width - 2 * self.MARGIN_X
+        return max(min(available, self.MIN_BUBBLE_WIDTH), int(available * self.BUBBLE_SHARE))
+    
+    def _bubble_rect(self, rect, is_user: bool, height: int) -> QRectF:
+        bubble_width = self._bubble_width(rect.width())
+        left = rect.right() + 1 - self.MARGIN_X - bubble_width if is_user else rect.left() + self.MARGIN_X
+        return QRectF(left, rect.top() + self.SPACING // 2, bubble_width, height - self.SPACING)
+    
+    def _chrome(self, message: TranscriptMessage) -> int:
+        """Height of a row apart from its parts."""
+        height = 2 * self.PADDING + self.SPACING
+        if message.sender_name:
+            height += QFontMetrics(self.name_font).height() + self.NAME_SPACING
+        return height
+    
+    def _measure(self, message: TranscriptMessage, layout: MessageLayout, width: int) -> int:
+        height = self._chrome(message) + layout.layout(self._bubble_width(width) - 2 * self.PADDING)
+        message.heights[width] = height
+        return height
+    
+    def _estimate(self, message: TranscriptMessage, width: int) -> int:
+        height = message.estimates.get(width)
+        if height is None:
+            metrics = QFontMetrics(self.text_font)
+            per_line = max(1, (self._bubble_width(width) - 2 * self.PADDING) // max(1, metrics.averageCharWidth()))
+            lines = sum(len(line) // per_line + 1 for line in message.content.split("\n"))
+            height = message.estimates[width] = self._chrome(message) + lines * metrics.lineSpacing()
+        return height
+    
+    def _draw_bubble(self, painter, bubble: QRectF, message: TranscriptMessage, palette: QPalette):
+        path = QPainterPath()
+        path.setFillRule(Qt.WindingFill)
+        path.addRoundedRect(bubble, self.RADIUS, self.RADIUS)
+        # The corner next to the sender is nearly square
+        corner_x = bubble.right() - self.RADIUS if message.is_user else bubble.left()
+        path.addRoundedRect(QRectF(corner_x, bubble.top(), self.RADIUS, self.RADIUS), 2, 2)
+        path = path.simplified()
+        if message.is_user:
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(QColor(USER_BUBBLE_COLOR))
         else:
-            self.setObjectName("chatBubbleAI")
-            
-        if self.sender_name:
-            name_label = QLabel(self.sender_name)
-            name_label.setFont(QFont("Segoe UI", 10, QFont.Bold))
-            name_label.setStyleSheet("color: #e94560;" if not self.is_user else "color: #ffffff; border: none;")
-            self.layout.addWidget(name_label)
-            
-        self.content_container = QVBoxLayout()
-        self.content_container.setSpacing(10)
-        self.layout.addLayout(self.content_container)
+            background, border = self._ai_colors(palette)
+            painter.setPen(QPen(QColor(border), 1))
+            painter.setBrush(QColor(background))
+        painter.drawPath(path)
+    
+    def _draw_code(self, painter, doc: CodeDocument, rect: QRectF):
+        """The frame and header of a code block; the code is drawn separately."""
+        frame = QPainterPath()
+        frame.addRoundedRect(rect, CODE_RADIUS, CODE_RADIUS)
+        painter.setPen(QPen(QColor("#30363d"), 1))
+        painter.setBrush(QColor(CODE_COLORS[1]))
+        painter.drawPath(frame)
         
-        self.setMinimumWidth(300)
-        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Minimum)
+        header = QRectF(rect.left(), rect.top(), rect.width(), MessageLayout.CODE_HEADER)
+        painter.save()
+        painter.setClipPath(frame)
+        painter.fillRect(header, QColor("#161b22"))
+        painter.restore()
+        painter.setPen(QColor("#30363d"))
+        painter.drawLine(header.bottomLeft(), header.bottomRight())
+        
+        painter.setFont(self.label_font)
+        painter.setPen(QColor("#8b949e"))
+        text_rect = header.adjusted(10, 0, -10, 0)
+        painter.drawText(text_rect, Qt.AlignLeft | Qt.AlignVCenter, doc.language)
+        painter.drawText(text_rect, Qt.AlignRight | Qt.AlignVCenter, "Copy")
+    
+    def _draw_document(self, painter, doc: QTextDocument, x: float, y: float, color: QColor):
+        painter.save()
+        painter.translate(x, y)
+        context = QAbstractTextDocumentLayout.PaintContext()
+        context.palette.setColor(QPalette.Text, color)
+        context.clip = QRectF(0, 0, doc.textWidth(), doc.size().height())
+        doc.documentLayout().draw(painter, context)
+        painter.restore()
+
 
-    def render_content(self, text: str):
-        """Parse and render content (text/markdown/code)."""
-        # Clear existing content
-        while self.content_container.count():
-            item = self.content_container.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+class TranscriptView(QAbstractScrollArea):
+    """Scrolling view of a TranscriptModel painted by a MessageDelegate.
+
+    A QListView lays every row out again whenever any row changes, which
+    a streamed reply does every frame. This view keeps the row offsets
+    itself: a height change only moves the offsets after that row, and
+    only the rows in view are painted.
+    
+    Painted text cannot be selected, so pressing on a part of a message
+    opens a read-only QTextBrowser with a copy of that part right over it.
+    It stays open until the next press elsewhere.
+    """
+    
+    def __init__(self, model: TranscriptModel, delegate: MessageDelegate, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.delegate = delegate
+        self._heights = []  # per row, at the current width
+        self._tops = None  # offsets of the rows (and the total), rebuilt when stale
+        self._width = 0
+        # Keep the newest message in view until the user scrolls up
+        self.follow = True
+        self._selection = None  # (row, part, QTextBrowser) open for selecting text
+        self._selecting = False  # the press that opened it is still held
         
-        # Simple parser for code blocks
-        parts = []
-        last_end = 0
-        pattern = re.compile(r"```(\w+)?\n(.*?)```", re.DOTALL)
+        self.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.verticalScrollBar().setSingleStep(20)
+        self.verticalScrollBar().valueChanged.connect(self._on_scrolled)
+        self.viewport().setMouseTracking(True)
         
-        for match in pattern.finditer(text):
-            start, end = match.span()
-            if start > last_end:
-                parts.append({"type": "text", "content": text[last_end:start]})
-            
-            lang = match.group(1) or "text"
-            code = match.group(2)
-            parts.append({"type": "code", "language": lang, "content": code})
-            last_end = end
-            
-        if last_end < len(text):
-            parts.append({"type": "text", "content": text[last_end:]})
-            
-        for part in parts:
-            if part["type"] == "code":
-                code_block = CodeBlock(part["content"], part["language"])
-                self.content_container.addWidget(code_block)
-            else:
-                # Render Markdown
-                html = markdown.markdown(part["content"], extensions=['fenced_code', 'nl2br'])
-                browser = QTextBrowser()
-                browser.setHtml(html)
-                browser.setOpenExternalLinks(True)
-                browser.setStyleSheet("background-color: transparent; border: none; color: " + ("white" if self.is_user else "#eaeaea") + ";")
-                browser.setFont(QFont("Segoe UI", 11))
-                
-                # Auto-resize height
-                doc = browser.document()
-                doc.setTextWidth(self.width() - 40) # Approximate width
-                height = doc.size().height()
-                browser.setFixedHeight(int(height + 20))
-                
-                self.content_container.addWidget(browser)
+        model.rowsInserted.connect(self._on_rows_inserted)
+        model.dataChanged.connect(self._on_data_changed)
+        model.modelReset.connect(self._relayout)
+        delegate.sizeHintChanged.connect(self._on_size_hint_changed)
+    
+    def scroll_to_bottom(self):
+        self.follow = True
+        self._update_range()
+    
+    def row_at(self, y: int) -> Optional[int]:
+        """Row at viewport position ``y``."""
+        row = bisect_right(self._row_tops(), y + self.verticalScrollBar().value()) - 1
+        return row if 0 <= row < len(self._heights) else None
+    
+    def row_rect(self, row: int) -> QRect:
+        """Viewport rectangle of ``row``."""
+        top = self._row_tops()[row] - self.verticalScrollBar().value()
+        return QRect(0, top, self._width, self._heights[row])
+    
+    def hit_test(self, pos) -> Optional[Tuple[str, str]]:
+        row = self.row_at(pos.y())
+        if row is None:
+            return None
+        return self.delegate.hit_test(self.row_rect(row), self.model.message(row), pos)
+    
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        option = self._option()
+        bottom = event.rect().bottom()
+        row = self.row_at(event.rect().top())
+        while row is not None and row < len(self._heights):
+            option.rect = self.row_rect(row)
+            if option.rect.top() > bottom:
+                break
+            self.delegate.paint(painter, option, self.model.index(row))
+            row += 1
+    
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.viewport().width() != self._width:
+            self._relayout()
+        else:
+            self._update_range()
+    
+    def scrollContentsBy(self, dx, dy):
+        self._place_selection()
+        self.viewport().update()
+    
+    def mousePressEvent(self, event):
+        self._close_selection()
+        if event.button() == Qt.LeftButton and self.hit_test(event.pos()) is None:
+            self._open_selection(event.pos())
+            if self._selection is not None:
+                # The viewport keeps the mouse until release, so this drag
+                # is handed on to the browser
+                self._selecting = True
+                self._forward(event)
+                return
+        super().mousePressEvent(event)
+    
+    def mouseMoveEvent(self, event):
+        if self._selecting:
+            self._forward(event)
+            return
+        # Links and code "Copy" labels are painted, so set their cursor here
+        self.viewport().setCursor(Qt.PointingHandCursor if self.hit_test(event.pos()) else Qt.ArrowCursor)
+        super().mouseMoveEvent(event)
+    
+    def mouseReleaseEvent(self, event):
+        if self._selecting:
+            self._selecting = False
+            self._forward(event)
+            return
+        hit = self.hit_test(event.pos()) if event.button() == Qt.LeftButton else None
+        if hit is None:
+            super().mouseReleaseEvent(event)
+            return
+        kind, value = hit
+        if kind == "copy":
+            pyperclip.copy(value)
+        else:
+            QDesktopServices.openUrl(QUrl(value))
+    
+    def contextMenuEvent(self, event):
+        row = self.row_at(event.pos().y())
+        if row is None:
+            return
+        menu = QMenu(self)
+        copy_action = menu.addAction("Copy Message")
+        if menu.exec_(event.globalPos()) == copy_action:
+            pyperclip.copy(self.model.message(row).content)
+    
+    def _open_selection(self, pos):
+        row = self.row_at(pos.y())
+        if row is None:
+            return
+        message = self.model.message(row)
+        for part, (kind, doc, area) in enumerate(self.delegate.part_areas(self.row_rect(row), message)):
+            if not area.contains(QPointF(pos)):
+                continue
+            browser = QTextBrowser(self.viewport())
+            browser.setFrameShape(QFrame.NoFrame)
+            browser.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+            browser.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+            browser.setOpenExternalLinks(True)
+            copy = doc.clone(browser)
+            copy.setDocumentMargin(doc.documentMargin())
+            browser.setDocument(copy)
+            # Opaque, so the painted text underneath does not show through
+            text, background = self.delegate.part_colors(message, kind, self.viewport().palette())
+            browser.setStyleSheet(
+                f"QTextBrowser {{ color: {text.name()}; background-color: {background.name()}; border: none; }}"
+            )
+            browser.setGeometry(area.toAlignedRect())
+            if kind == "code":
+                # Leave the rounded bottom corners of the frame visible
+                corners = QPainterPath()
+                corners.addRoundedRect(QRectF(0, -CODE_RADIUS, browser.width(), browser.height() + CODE_RADIUS),
+                                       CODE_RADIUS, CODE_RADIUS)
+                browser.setMask(QRegion(corners.toFillPolygon().toPolygon()))
+            browser.show()
+            browser.setFocus()
+            self._selection = (row, part, browser)
+            return
+    
+    def _place_selection(self):
+        """Move the open browser along with its part, or close it if that is gone."""
+        if self._selection is None:
+            return
+        row, part, browser = self._selection
+        if row >= len(self._heights):
+            self._close_selection()
+            return
+        areas = list(self.delegate.part_areas(self.row_rect(row), self.model.message(row)))
+        if part >= len(areas):
+            self._close_selection()
+            return
+        browser.setGeometry(areas[part][2].toAlignedRect())
+    
+    def _close_selection(self):
+        if self._selection is not None:
+            self._selection[2].hide()
+            self._selection[2].deleteLater()
+            self._selection = None
+            self._selecting = False
+    
+    def _forward(self, event):
+        target = self._selection[2].viewport()
+        pos = target.mapFrom(self.viewport(), event.pos())
+        QApplication.sendEvent(target, QMouseEvent(
+            event.type(), QPointF(pos), event.windowPos(), event.screenPos(),
+            event.button(), event.buttons(), event.modifiers(),
+        ))
+    
+    def _option(self, width: Optional[int] = None) -> QStyleOptionViewItem:
+        option = QStyleOptionViewItem()
+        option.initFrom(self.viewport())
+        option.rect = QRect(0, 0, self._width if width is None else width, 0)
+        return option
+    
+    def _row_height(self, row: int, option: QStyleOptionViewItem) -> int:
+        return self.delegate.sizeHint(option, self.model.index(row)).height()
+    
+    def _row_tops(self):
+        if self._tops is None:
+            self._tops = [0]
+            self._tops.extend(accumulate(self._heights))
+        return self._tops
+    
+    def _relayout(self):
+        """Heights of every row (new width or a new transcript)."""
+        self._width = self.viewport().width()
+        option = self._option()
+        self._heights = [self._row_height(row, option) for row in range(self.model.rowCount())]
+        self._tops = None
+        self._close_selection()
+        self._update_range()
+        self.viewport().update()
+    
+    def _update_range(self):
+        scrollbar = self.verticalScrollBar()
+        scrollbar.setPageStep(self.viewport().height())
+        scrollbar.setRange(0, max(0, self._row_tops()[-1] - self.viewport().height()))
+        if self.follow:
+            scrollbar.setValue(scrollbar.maximum())
+        self._place_selection()
+    
+    def _on_scrolled(self, value):
+        self.follow = value >= self.verticalScrollBar().maximum()
+    
+    def _on_rows_inserted(self, _parent, first, last):
+        option = self._option()
+        self._heights[first:first] = [self._row_height(row, option) for row in range(first, last + 1)]
+        self._tops = None
+        self._update_range()
+        self.viewport().update()
+    
+    def _on_data_changed(self, top_left, bottom_right, _roles=()):
+        # Rows in view are measured when painted; others fall back to an estimate
+        if self._selection is not None and top_left.row() <= self._selection[0] <= bottom_right.row():
+            # The copy being selected from is stale now
+            self._close_selection()
+        view = self.viewport().rect()
+        for row in range(top_left.row(), bottom_right.row() + 1):
+            if not self.row_rect(row).intersects(view):
+                self._on_size_hint_changed(self.model.index(row))
+        self.viewport().update()
+    
+    def _on_size_hint_changed(self, index):
+        row = index.row()
+        if row >= len(self._heights):
+            return
+        delta = self._row_height(row, self._option()) - self._heights[row]
+        if not delta:
+            return
+        scrollbar = self.verticalScrollBar()
+        above = self._row_tops()[row] < scrollbar.value()
+        self._heights[row] += delta
+        self._tops = None
+        self._update_range()
+        if above and not self.follow:
+            # Keep the rows in view where they are
+            scrollbar.setValue(scrollbar.value() + delta)
+        self.viewport().update()
 
-    def update_text(self, text: str):
-        """Update text (optimized for streaming - currently just re-renders)."""
-        # For true fade-in streaming, we would need to append to the last text widget.
-        # But switching to complex rendering makes that hard.
-        # We will just re-render for now, but maybe optimize if only appending text.
-        self.full_text = text
-        self.render_content(text)
 
 class ChatWidget(QWidget):
-    """Widget for displaying chat messages."""
+    """Widget for displaying chat messages.
+    
+    Messages live in a TranscriptModel shown by a TranscriptView, so
+    opening a long conversation builds no widgets per message and only the
+    rows in view are laid out and painted.
+    """
     
     message_sent = pyqtSignal(str)
     
     def __init__(self, parent=None):
         super().__init__(parent)
         self.messages = []
+        # The reply being streamed into the last row (see ``streaming``)
+        self._stream = None
+        self._stream_row = None
+        # Deltas are buffered and the row redrawn at most once per frame
+        self._stream_frames = FrameCoalescer(self._apply_stream, self)
         self.setup_ui()
     
     def setup_ui(self):
@@ -192,112 +769,91 @@ class ChatWidget(QWidget):
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
         
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
-        self.scroll_area.setStyleSheet("background-color: transparent; border: none;")
-        
-        self.messages_container = QWidget()
-        self.messages_layout = QVBoxLayout(self.messages_container)
-        self.messages_layout.setContentsMargins(20, 20, 20, 20)
-        self.messages_layout.setSpacing(15)
-        self.messages_layout.addStretch()
-        
-        self.scroll_area.setWidget(self.messages_container)
-        layout.addWidget(self.scroll_area)
+        self.model = TranscriptModel(self)
+        self.delegate = MessageDelegate(self)
+        self.transcript = TranscriptView(self.model, self.delegate)
+        self.transcript.setStyleSheet("background-color: transparent; border: none;")
+        layout.addWidget(self.transcript)
     
-    def add_message(self, message: str, is_user: bool = False, sender_name: str = ""):
-        """Add a message to the chat."""
-        bubble = MessageBubble(message, is_user, sender_name)
-        
-        container = QWidget()
-        container_layout = QHBoxLayout(container)
-        container_layout.setContentsMargins(0, 0, 0, 0)
-        
-        if is_user:
-            container_layout.addStretch()
-            container_layout.addWidget(bubble)
-        else:
-            container_layout.addWidget(bubble)
-            container_layout.addStretch()
-        
-        # Add opacity effect for fade-in
-        opacity_effect = QGraphicsOpacityEffect(bubble)
-        bubble.setGraphicsEffect(opacity_effect)
-        
-        anim = QPropertyAnimation(opacity_effect, b"opacity")
-        anim.setDuration(500)
-        anim.setStartValue(0)
-        anim.setEndValue(1)
-        anim.setEasingCurve(QEasingCurve.OutQuad)
-        anim.start()
-        
-        # Keep reference to animation to prevent GC
-        bubble.anim = anim
-        bubble.message_container = container
-        
-        self.messages_layout.insertWidget(self.messages_layout.count() - 1, container)
-        self.messages.append({"role": "user" if is_user else "assistant", "content": message})
-        
-        QTimer.singleShot(100, self.scroll_to_bottom)
+    def add_message(self, message: str, is_user: bool = False, sender_name: str = "") -> int:
+        """Add a message to the chat; returns its row."""
+        return self.add_messages([(message, is_user, sender_name)])
+    
+    def add_messages(self, messages: Iterable[Tuple[str, bool, str]]) -> int:
+        """Add ``(message, is_user, sender_name)`` tuples at once (loading history)."""
+        rows = []
+        for message, is_user, sender_name in messages:
+            rows.append(TranscriptMessage(message, is_user, sender_name))
+            self.messages.append({"role": "user" if is_user else "assistant", "content": message})
+        row = self.model.append(rows)
+        self.scroll_to_bottom()
+        return row
+    
+    def begin_stream(self, stream: int, is_user: bool = False, sender_name: str = ""):
+        """Add an empty message that deltas of ``stream`` will fill."""
+        self.end_stream()
+        self._stream_row = self.add_message("", is_user, sender_name)
+        self._stream = StreamBuffer(stream)
+    
+    def append_delta(self, stream: int, seq: int, text: str):
+        """Append delta ``seq`` of ``stream``; the row catches up on the next frame."""
+        buffer = self._stream
+        if buffer is None or buffer.stream != stream or not buffer.append(seq, text):
+            # Left over from a cancelled reply, or already applied
+            return
+        self._stream_frames.request()
+    
+    def _apply_stream(self):
+        """Redraw the streaming row with everything buffered since the last frame."""
+        if self._stream is not None:
+            self.model.set_content(self._stream_row, self._stream.text())
+    
+    def commit_stream(self, stream: int, count: int, text: str) -> bool:
+        """Finish ``stream`` with its complete text; False if it is not the open one."""
+        buffer = self._stream
+        if buffer is None or buffer.stream != stream:
+            return False
+        self._stream_frames.flush()
+        if buffer.gap or buffer.next_seq != count:
+            # A delta went missing; the commit carries the whole reply
+            self.model.set_content(self._stream_row, text)
+        self.messages[-1]["content"] = text
+        self._stream = None
+        self._stream_row = None
+        return True
+    
+    def end_stream(self):
+        """Close the open stream with what arrived so far (after an error)."""
+        self._stream_frames.flush()
+        if self._stream is not None:
+            self.messages[-1]["content"] = self._stream.text()
+        self._stream = None
+        self._stream_row = None
+    
+    def stream_text(self) -> str:
+        """Text received so far on the open stream."""
+        return self._stream.text() if self._stream is not None else ""
     
     def update_last_message(self, content: str):
         """Update the content of the last message (for streaming)."""
-        if self.messages_layout.count() > 1:
-            last_container = self.messages_layout.itemAt(self.messages_layout.count() - 2).widget()
-            if last_container:
-                bubble = last_container.findChild(MessageBubble)
-                if bubble:
-                    bubble.update_text(content)
-                    self.animate_word_fade(bubble, content)
-        
         if self.messages:
+            self.model.set_content(len(self.messages) - 1, content)
             self.messages[-1]["content"] = content
-        
-        self.scroll_to_bottom()
-    
-    def animate_word_fade(self, bubble, content: str):
-        """Add fade animation to the last word in the message."""
-        if not bubble.content_container or bubble.content_container.count() == 0:
-            return
-        
-        last_item = bubble.content_container.itemAt(bubble.content_container.count() - 1)
-        if not last_item or not last_item.widget():
-            return
-        
-        last_widget = last_item.widget()
-        
-        opacity_effect = last_widget.graphicsEffect()
-        if not opacity_effect or not isinstance(opacity_effect, QGraphicsOpacityEffect):
-            opacity_effect = QGraphicsOpacityEffect()
-            last_widget.setGraphicsEffect(opacity_effect)
-        
-        if opacity_effect.opacity() < 1.0:
-            anim = QPropertyAnimation(opacity_effect, b"opacity")
-            anim.setDuration(300)
-            anim.setStartValue(0.3)
-            anim.setEndValue(1.0)
-            anim.setEasingCurve(QEasingCurve.InOutQuad)
-            anim.start()
-            if not hasattr(last_widget, 'fade_anims'):
-                last_widget.fade_anims = []
-            last_widget.fade_anims.append(anim)
     
     def scroll_to_bottom(self):
         """Scroll to the bottom of the chat."""
-        scrollbar = self.scroll_area.verticalScrollBar()
-        scrollbar.setValue(scrollbar.maximum())
+        self.transcript.scroll_to_bottom()
     
     def clear_messages(self):
         """Clear all messages."""
-        while self.messages_layout.count() > 1:
-            item = self.messages_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
+        self._stream_frames.cancel()
+        self._stream = None
+        self._stream_row = None
+        self.model.clear()
+        self.delegate.clear()
         self.messages.clear()
+        self.transcript.follow = True
     
     def get_messages(self):
         """Get all messages."""
         return self.messages.copy()
-
-from PyQt5.QtWidgets import QGraphicsOpacityEffect
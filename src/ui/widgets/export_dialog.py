@@ -0,0 +1,195 @@
+"""Bulk history export dialog."""
+
+import time
+from datetime import datetime, time as dt_time
+
+from PyQt5.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QFormLayout, QPushButton, QLabel,
+    QCheckBox, QComboBox, QDateEdit, QProgressBar, QFileDialog, QGroupBox
+)
+from PyQt5.QtCore import QThread, QDate, pyqtSignal
+
+from ...history_export import ExportCancelled, HistoryExporter, FORMAT_EXTENSIONS
+
+EXPORT_MODES = [
+    ("chat", "Chat"),
+    ("ai_to_ai", "AI to AI"),
+    ("compare_ai", "Compare AI"),
+    ("image", "Image"),
+    ("video", "Video"),
+]
+FORMAT_LABELS = [
+    ("md", "Markdown (*.md)"),
+    ("html", "HTML (*.html)"),
+    ("jsonl", "JSON Lines (*.jsonl)"),
+]
+
+
+class ExportWorker(QThread):
+    """Worker thread that streams the export to disk."""
+
+    progress = pyqtSignal(int, int)  # done, total
+    finished_export = pyqtSignal(int, str)  # items written, path
+    error_occurred = pyqtSignal(str)
+
+    def __init__(self, history_manager, path, fmt, modes, since, until):
+        super().__init__()
+        self.history_manager = history_manager
+        self.path = path
+        self.fmt = fmt
+        self.modes = modes
+        self.since = since
+        self.until = until
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def run(self):
+        """Run the export."""
+        try:
+            count = HistoryExporter(self.history_manager).export(
+                self.path, self.fmt, self.modes, self.since, self.until,
+                progress=self.progress.emit,
+                cancelled=lambda: self._cancelled,
+            )
+            self.finished_export.emit(count, self.path)
+        except ExportCancelled:
+            # Only reject() cancels, and the dialog is already closing
+            pass
+        except Exception as e:
+            self.error_occurred.emit(str(e))
+
+
+class HistoryExportDialog(QDialog):
+    """Pick modes, a date range and a format, then export in the background."""
+
+    exported = pyqtSignal(int, str)  # items written, path
+
+    def __init__(self, history_manager, current_mode=None, parent=None):
+        super().__init__(parent)
+        self.history_manager = history_manager
+        self.worker = None
+        self.setWindowTitle("Export History")
+        self.setMinimumWidth(380)
+        self.setup_ui(current_mode)
+
+    def setup_ui(self, current_mode):
+        """Initialize the UI."""
+        layout = QVBoxLayout(self)
+        layout.setSpacing(12)
+
+        modes_group = QGroupBox("Modes")
+        modes_layout = QVBoxLayout(modes_group)
+        self.mode_checks = {}
+        for mode, label in EXPORT_MODES:
+            check = QCheckBox(label)
+            check.setChecked(current_mode is None or mode == current_mode)
+            modes_layout.addWidget(check)
+            self.mode_checks[mode] = check
+        layout.addWidget(modes_group)
+
+        form = QFormLayout()
+        self.format_combo = QComboBox()
+        for fmt, label in FORMAT_LABELS:
+            self.format_combo.addItem(label, fmt)
+        form.addRow("Format:", self.format_combo)
+
+        self.since_check = QCheckBox("From")
+        self.since_edit = QDateEdit(QDate.currentDate().addMonths(-1))
+        self.since_edit.setCalendarPopup(True)
+        self.since_edit.setEnabled(False)
+        self.since_check.toggled.connect(self.since_edit.setEnabled)
+        form.addRow(self.since_check, self.since_edit)
+
+        self.until_check = QCheckBox("To")
+        self.until_edit = QDateEdit(QDate.currentDate())
+        self.until_edit.setCalendarPopup(True)
+        self.until_edit.setEnabled(False)
+        self.until_check.toggled.connect(self.until_edit.setEnabled)
+        form.addRow(self.until_check, self.until_edit)
+        layout.addLayout(form)
+
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        layout.addWidget(self.progress_bar)
+
+        self.status_label = QLabel("")
+        layout.addWidget(self.status_label)
+
+        buttons = QHBoxLayout()
+        buttons.addStretch()
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.setObjectName("secondaryButton")
+        self.cancel_btn.clicked.connect(self.reject)
+        buttons.addWidget(self.cancel_btn)
+        self.export_btn = QPushButton("Export")
+        self.export_btn.setObjectName("primaryButton")
+        self.export_btn.clicked.connect(self.start_export)
+        buttons.addWidget(self.export_btn)
+        layout.addLayout(buttons)
+
+    def start_export(self):
+        """Ask for a target file and start the worker."""
+        modes = [mode for mode, check in self.mode_checks.items() if check.isChecked()]
+        if not modes:
+            self.status_label.setText("Select at least one mode.")
+            return
+
+        fmt = self.format_combo.currentData()
+        file_path, _ = QFileDialog.getSaveFileName(
+            self,
+            "Export History",
+            f"history{FORMAT_EXTENSIONS[fmt]}",
+            f"{self.format_combo.currentText()};;All Files (*)"
+        )
+        if not file_path:
+            return
+
+        since = _day_start(self.since_edit.date()) if self.since_check.isChecked() else None
+        until = _day_start(self.until_edit.date().addDays(1)) if self.until_check.isChecked() else None
+
+        self.export_btn.setEnabled(False)
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, 0)
+        self.status_label.setText("Exporting...")
+
+        self.worker = ExportWorker(self.history_manager, file_path, fmt, modes, since, until)
+        self.worker.progress.connect(self.on_progress)
+        self.worker.finished_export.connect(self.on_finished)
+        self.worker.error_occurred.connect(self.on_error)
+        self.worker.start()
+
+    def on_progress(self, done: int, total: int):
+        self.progress_bar.setRange(0, max(total, 1))
+        self.progress_bar.setValue(done)
+        self.status_label.setText(f"Exported {done} of {total} items")
+
+    def on_finished(self, count: int, path: str):
+        self.worker = None
+        self.exported.emit(count, path)
+        self.accept()
+
+    def on_error(self, message: str):
+        self.worker = None
+        self.export_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.status_label.setText(f"Export failed: {message}")
+
+    def reject(self):
+        """Cancel a running export and close.
+
+        The export stops between items and deletes its partial file; a
+        file already at the target path is left as it was.
+        """
+        if self.worker:
+            self.worker.finished_export.disconnect()
+            self.worker.cancel()
+            self.worker.wait()
+            self.worker = None
+        super().reject()
+
+
+def _day_start(date: QDate) -> float:
+    """Local midnight of a QDate as a Unix timestamp."""
+    return time.mktime(datetime.combine(date.toPyDate(), dt_time.min).timetuple())
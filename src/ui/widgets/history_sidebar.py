@@ -1,111 +1,373 @@
 """Sidebar history widget."""
 
+import html
+from typing import Callable, Dict, List, Optional
+
 from PyQt5.QtWidgets import (
-    QFrame, QVBoxLayout, QPushButton, QLabel, QScrollArea,
-    QWidget, QMenu, QInputDialog, QLineEdit
+    QFrame, QVBoxLayout, QPushButton, QLabel, QListView, QMenu,
+    QInputDialog, QLineEdit, QStyledItemDelegate, QStyleOptionViewItem,
+    QStyle, QApplication, QAbstractItemView
+)
+from PyQt5.QtCore import (
+    pyqtSignal, Qt, QTimer, QAbstractListModel, QModelIndex, QPoint, QSize
 )
-from PyQt5.QtCore import pyqtSignal, Qt
-from PyQt5.QtGui import QFont
+from PyQt5.QtGui import QFont, QTextDocument, QPalette
+
+from ...history_manager import ITEM_ADDED, ITEM_UPDATED, ITEM_RENAMED, ITEM_DELETED, ITEM_ARCHIVED
+
+SEARCH_DEBOUNCE_MS = 200
+PAGE_SIZE = 100
+
+ItemIdRole = Qt.UserRole + 1
+NameHtmlRole = Qt.UserRole + 2
+SnippetHtmlRole = Qt.UserRole + 3
+
+
+class HistoryListModel(QAbstractListModel):
+    """List model over history metadata, loaded page by page on scroll.
+
+    Rows are dicts {'id', 'name', 'timestamp'}; search hits additionally
+    carry 'name_html' and 'snippet_html'.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: List[Dict] = []
+        self._row_of: Optional[Dict[str, int]] = {}
+        self._fetch_page: Optional[Callable[[int, int], List[Dict]]] = None
+        self._exhausted = True
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self._rows[index.row()]
+        if role in (Qt.DisplayRole, Qt.ToolTipRole):
+            return row['name']
+        if role == ItemIdRole:
+            return row['id']
+        if role == NameHtmlRole:
+            return row.get('name_html')
+        if role == SnippetHtmlRole:
+            return row.get('snippet_html')
+        return None
+
+    def set_source(self, fetch_page: Callable[[int, int], List[Dict]]):
+        """Show a paged listing; ``fetch_page(offset, limit)`` returns rows."""
+        self.beginResetModel()
+        self._rows = []
+        self._row_of = {}
+        self._fetch_page = fetch_page
+        self._exhausted = False
+        self.endResetModel()
+
+    def set_results(self, results: List[Dict]):
+        """Show a fixed list of rows (search hits), without paging."""
+        self.beginResetModel()
+        self._rows = list(results)
+        self._row_of = None
+        self._fetch_page = None
+        self._exhausted = True
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted or not self._fetch_page:
+            return
+        page = self._fetch_page(len(self._rows), PAGE_SIZE)
+        if len(page) < PAGE_SIZE:
+            self._exhausted = True
+
+        # Rows inserted locally may already be loaded
+        known = self._row_map()
+        page = [row for row in page if row['id'] not in known]
+        if not page:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        self._rows.extend(page)
+        for offset, row in enumerate(page):
+            self._row_of[row['id']] = first + offset
+        self.endInsertRows()
+
+    def row_of(self, item_id: str) -> Optional[int]:
+        """Row currently showing ``item_id``, if it is loaded."""
+        return self._row_map().get(item_id)
+
+    def item_at(self, row: int) -> Dict:
+        return self._rows[row]
+
+    def insert_item(self, item: Dict, row: int = 0):
+        """Insert a single row (new items go on top)."""
+        if self.row_of(item['id']) is not None:
+            return
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._rows.insert(row, {'id': item['id'], 'name': item['name'], 'timestamp': item['timestamp']})
+        self._row_of = None
+        self.endInsertRows()
+
+    def insert_sorted(self, item: Dict) -> bool:
+        """Insert a row where its timestamp places it (newest first).
+
+        A row that falls past the loaded rows is left for ``fetchMore``, so
+        the paging offset stays in step with the listing.
+        """
+        if self.row_of(item['id']) is not None:
+            return False
+        low, high = 0, len(self._rows)
+        while low < high:
+            middle = (low + high) // 2
+            if self._rows[middle]['timestamp'] >= item['timestamp']:
+                low = middle + 1
+            else:
+                high = middle
+        if low == len(self._rows) and not self._exhausted:
+            return False
+        self.insert_item(item, low)
+        return True
+
+    def remove_item(self, item_id: str) -> bool:
+        """Remove a single row."""
+        row = self.row_of(item_id)
+        if row is None:
+            return False
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self._rows[row]
+        self._row_of = None
+        self.endRemoveRows()
+        return True
+
+    def update_item(self, item_id: str, **fields) -> bool:
+        """Change fields of a single row in place."""
+        row = self.row_of(item_id)
+        if row is None:
+            return False
+        self._rows[row].update(fields)
+        index = self.index(row)
+        self.dataChanged.emit(index, index)
+        return True
+
+    def move_to_top(self, item_id: str) -> bool:
+        """Move a single row to the top (most recently updated first)."""
+        row = self.row_of(item_id)
+        if row is None:
+            return False
+        if row > 0:
+            self.beginMoveRows(QModelIndex(), row, row, QModelIndex(), 0)
+            self._rows.insert(0, self._rows.pop(row))
+            self._row_of = None
+            self.endMoveRows()
+        return True
+
+    @property
+    def is_paged(self) -> bool:
+        """Whether the model shows the plain listing rather than search hits."""
+        return self._fetch_page is not None
+
+    def _row_map(self) -> Dict[str, int]:
+        # Rebuilt lazily after inserts/removals shift the rows
+        if self._row_of is None:
+            self._row_of = {row['id']: i for i, row in enumerate(self._rows)}
+        return self._row_of
+
+
+class HistoryItemDelegate(QStyledItemDelegate):
+    """Paints search hits as rich text; plain rows use the default painting."""
+
+    MARGIN_X = 12
+    MARGIN_Y = 6
+
+    def paint(self, painter, option, index):
+        name_html = index.data(NameHtmlRole)
+        if name_html is None:
+            super().paint(painter, option, index)
+            return
+
+        opt = QStyleOptionViewItem(option)
+        self.initStyleOption(opt, index)
+        opt.text = ""
+        style = opt.widget.style() if opt.widget else QApplication.style()
+        style.drawControl(QStyle.CE_ItemViewItem, opt, painter, opt.widget)
+
+        doc = self._document(index, opt.rect.width(), opt.palette)
+        painter.save()
+        painter.translate(opt.rect.topLeft() + QPoint(self.MARGIN_X, self.MARGIN_Y))
+        doc.drawContents(painter)
+        painter.restore()
+
+    def sizeHint(self, option, index):
+        if index.data(NameHtmlRole) is None:
+            return super().sizeHint(option, index)
+        width = option.rect.width() or 240
+        doc = self._document(index, width, option.palette)
+        return QSize(width, int(doc.size().height()) + 2 * self.MARGIN_Y)
+
+    def _document(self, index, width: int, palette) -> QTextDocument:
+        color = palette.color(QPalette.Text).name()
+        doc = QTextDocument()
+        doc.setDefaultStyleSheet(f"body {{ color: {color}; }} .snippet {{ color: #8a8a8a; font-size: 11px; }}")
+        snippet = index.data(SnippetHtmlRole) or ""
+        doc.setHtml(f"<body><div>{index.data(NameHtmlRole)}</div><div class='snippet'>{snippet}</div></body>")
+        doc.setTextWidth(max(width - 2 * self.MARGIN_X, 50))
+        return doc
 
 
 class HistorySidebar(QFrame):
     """Sidebar history widget."""
-    
+
     item_clicked = pyqtSignal(str)  # Returns item ID
     item_renamed = pyqtSignal(str, str)  # ID, new name
     item_deleted = pyqtSignal(str)  # ID
     item_export = pyqtSignal(str)  # ID
+    export_all_requested = pyqtSignal()
+    search_requested = pyqtSignal(str)  # Query ("" when cleared)
     settings_clicked = pyqtSignal()
-    
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setObjectName("historySidebar")
         self.setFixedWidth(260)
         self.current_mode = 0
         self.setup_ui()
-    
+
     def setup_ui(self):
         """Initialize the UI."""
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
         layout.setSpacing(0)
-        
+
         # History Section Title
         self.title_label = QLabel("HISTORY")
         self.title_label.setObjectName("sectionTitle")
         self.title_label.setAlignment(Qt.AlignCenter)
         layout.addWidget(self.title_label)
-        
-        # Scroll Area for History Items
-        self.scroll_area = QScrollArea()
-        self.scroll_area.setWidgetResizable(True)
-        self.scroll_area.setStyleSheet("background: transparent; border: none;")
-        
-        self.history_container = QWidget()
-        self.history_layout = QVBoxLayout(self.history_container)
-        self.history_layout.setContentsMargins(5, 5, 5, 5)
-        self.history_layout.setSpacing(2)
-        self.history_layout.addStretch()
-        
-        self.scroll_area.setWidget(self.history_container)
-        layout.addWidget(self.scroll_area)
-        
+
+        # Search box; queries fire once typing pauses
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search history...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.textChanged.connect(lambda _: self.search_timer.start())
+        layout.addWidget(self.search_input)
+
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(
+            lambda: self.search_requested.emit(self.search_input.text().strip())
+        )
+
+        # History list: only visible rows are painted, pages load on scroll
+        self.model = HistoryListModel(self)
+        self.list_view = QListView()
+        self.list_view.setObjectName("historyList")
+        self.list_view.setModel(self.model)
+        self.list_view.setItemDelegate(HistoryItemDelegate(self.list_view))
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.list_view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.list_view.setHorizontalScrollBarPolicy(Qt.ScrollBarAlwaysOff)
+        self.list_view.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.list_view.setCursor(Qt.PointingHandCursor)
+        self.list_view.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.list_view.customContextMenuRequested.connect(self.show_context_menu)
+        self.list_view.clicked.connect(lambda index: self.item_clicked.emit(index.data(ItemIdRole)))
+        layout.addWidget(self.list_view)
+
         # Settings Button at the Bottom
         self.settings_btn = QPushButton("⚙️ Settings")
         self.settings_btn.setObjectName("settingsButton")
         self.settings_btn.setCursor(Qt.PointingHandCursor)
         self.settings_btn.clicked.connect(self.settings_clicked.emit)
         layout.addWidget(self.settings_btn)
-        
-    def update_history(self, mode_name: str, items: list):
-        """Update history items for the current mode.
-        items: list of dicts {'id': str, 'name': str}
+
+    def set_history_source(self, mode_name: str, fetch_page: Callable[[int, int], List[Dict]]):
+        """Show the history of a mode.
+        fetch_page(offset, limit) returns dicts {'id': str, 'name': str, 'timestamp': float}
         """
         self.title_label.setText(f"{mode_name} HISTORY")
-        
-        # Clear existing items
-        while self.history_layout.count() > 1:  # Keep the stretch
-            item = self.history_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-                
-        # Add new items
-        for item in items:
-            btn = QPushButton(item['name'])
-            btn.setObjectName("historyItem")
-            btn.setCursor(Qt.PointingHandCursor)
-            btn.setCheckable(True)
-            btn.setAutoExclusive(True)
-            
-            # Context Menu
-            btn.setContextMenuPolicy(Qt.CustomContextMenu)
-            btn.customContextMenuRequested.connect(
-                lambda pos, b=btn, i=item: self.show_context_menu(pos, b, i)
-            )
-            
-            btn.clicked.connect(lambda checked, i=item: self.item_clicked.emit(i['id']))
-            self.history_layout.insertWidget(self.history_layout.count() - 1, btn)
-            
-    def show_context_menu(self, pos, button, item):
+        self.list_view.setUniformItemSizes(True)
+        self.model.set_source(fetch_page)
+
+    def show_search_results(self, results: list):
+        """Replace the list with ranked search hits."""
+        self.list_view.setUniformItemSizes(False)
+        self.model.set_results(results)
+
+    def clear_search(self):
+        """Reset the search box without triggering a search."""
+        self.search_input.blockSignals(True)
+        self.search_input.clear()
+        self.search_input.blockSignals(False)
+        self.search_timer.stop()
+
+    def insert_item(self, item: dict):
+        """Add a single entry at the top of the list."""
+        self.model.insert_item(item)
+
+    def remove_item(self, item_id: str):
+        """Remove a single entry."""
+        self.model.remove_item(item_id)
+
+    def rename_item(self, item_id: str, new_name: str):
+        """Change the title of a single entry."""
+        fields = {'name': new_name}
+        row = self.model.row_of(item_id)
+        if row is not None and self.model.item_at(row).get('name_html') is not None:
+            fields['name_html'] = html.escape(new_name)
+        self.model.update_item(item_id, **fields)
+
+    def apply_history_event(self, event: str, fields: dict):
+        """Apply a HistoryManager change notification to the loaded rows."""
+        item_id = fields['id']
+        if event == ITEM_ADDED:
+            # Search hits are ranked; new items show up once the search is cleared.
+            # Restored archive items keep their old timestamp, so not always on top
+            if self.model.is_paged:
+                self.model.insert_sorted(fields)
+        elif event == ITEM_UPDATED:
+            if self.model.update_item(item_id, timestamp=fields['timestamp']) and self.model.is_paged:
+                self.model.move_to_top(item_id)
+        elif event == ITEM_RENAMED:
+            self.rename_item(item_id, fields['name'])
+        elif event in (ITEM_DELETED, ITEM_ARCHIVED):
+            self.remove_item(item_id)
+
+    def show_context_menu(self, pos):
         """Show context menu for history item."""
+        index = self.list_view.indexAt(pos)
         menu = QMenu(self)
-        rename_action = menu.addAction("Rename")
-        export_action = menu.addAction("Export to TXT")
-        delete_action = menu.addAction("Delete")
-        
-        action = menu.exec_(button.mapToGlobal(pos))
-        
-        if action == rename_action:
+        if index.isValid():
+            item = self.model.item_at(index.row())
+            rename_action = menu.addAction("Rename")
+            export_action = menu.addAction("Export to TXT")
+            delete_action = menu.addAction("Delete")
+            menu.addSeparator()
+        else:
+            item = None
+            rename_action = export_action = delete_action = None
+        export_all_action = menu.addAction("Export History...")
+
+        action = menu.exec_(self.list_view.viewport().mapToGlobal(pos))
+        if action is None:
+            return
+
+        if action == export_all_action:
+            self.export_all_requested.emit()
+
+        elif action == rename_action:
             new_name, ok = QInputDialog.getText(
-                self, "Rename", "Enter new name:", 
+                self, "Rename", "Enter new name:",
                 QLineEdit.Normal, item['name']
             )
             if ok and new_name:
                 self.item_renamed.emit(item['id'], new_name)
-                button.setText(new_name)
-        
+
         elif action == export_action:
             self.item_export.emit(item['id'])
-                
+
         elif action == delete_action:
             self.item_deleted.emit(item['id'])
@@ -0,0 +1,70 @@
+"""Provider and model picker for the chat pages."""
+
+from PyQt5.QtWidgets import QWidget, QHBoxLayout, QComboBox
+
+from ...api.providers import registry
+
+
+class ModelSelector(QWidget):
+    """A provider combo plus a model combo fed from the provider registry.
+
+    With ``allow_default`` the first entry stands for the provider and
+    model chosen in Settings. The model combo is editable, so models an
+    endpoint serves but does not list can still be typed in.
+    """
+
+    def __init__(self, allow_default: bool = True, parent=None):
+        super().__init__(parent)
+        self.allow_default = allow_default
+
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        self.provider_combo = QComboBox()
+        self.provider_combo.currentIndexChanged.connect(self.update_models)
+        layout.addWidget(self.provider_combo)
+
+        self.model_combo = QComboBox()
+        self.model_combo.setEditable(True)
+        self.model_combo.setMinimumWidth(180)
+        layout.addWidget(self.model_combo)
+
+        self.refresh()
+
+    def refresh(self):
+        """Reload providers (after endpoints changed), keeping the selection."""
+        provider, model = self.provider_combo.currentData(), self.model_combo.currentText()
+
+        self.provider_combo.blockSignals(True)
+        self.provider_combo.clear()
+        if self.allow_default:
+            self.provider_combo.addItem("Default (Settings)", None)
+        for name in registry.names("chat"):
+            self.provider_combo.addItem(registry.get(name).label, name)
+        self.provider_combo.blockSignals(False)
+
+        self.select(provider, model)
+
+    def update_models(self, _index=None):
+        """List the selected provider's models."""
+        provider = self.provider_combo.currentData()
+        self.model_combo.clear()
+        self.model_combo.setEnabled(provider is not None)
+        if provider is not None:
+            self.model_combo.addItems(registry.get(provider).models)
+
+    def select(self, provider, model=""):
+        """Select ``provider`` and ``model`` if the provider is registered."""
+        index = self.provider_combo.findData(provider)
+        self.provider_combo.setCurrentIndex(max(index, 0))
+        self.update_models()
+        if model and self.provider_combo.currentData() == provider:
+            self.model_combo.setCurrentText(model)
+
+    def selection(self, default_provider: str = "", default_model: str = ""):
+        """``(provider, model)`` to use, falling back to the given defaults."""
+        provider = self.provider_combo.currentData()
+        if provider is None:
+            return default_provider, default_model
+        return provider, self.model_combo.currentText().strip() or default_model